@@ -0,0 +1,122 @@
+import logging
+from typing import List
+
+from django.conf import settings
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from django_elasticsearch_dsl.registries import registry
+from rest_framework.request import Request
+
+from api.jobs import JobRunner
+from api.views.message import RECORD_STATUS_EFFECTS, MessageDocumentView
+from core.models import BulkAction, IndexOutbox, Message, MessageAudit
+from core.outbox import drain_outbox
+
+
+logger = logging.getLogger(__name__)
+
+
+def message_search(query: dict):
+    """The Search of MessageDocumentView for query, without facets.
+
+    query holds the view's search and filter parameters as lists of values.
+    """
+    view = MessageDocumentView()
+    view.request = Request(RequestFactory().get("/", data=query))
+    view.args, view.kwargs, view.format_kwarg = (), {}, None
+    view.aggregate_facets = False
+    return view.filter_queryset(view.get_queryset())
+
+
+def search_message_ids(query: dict) -> List[int]:
+    """Scan the ids of every message MessageDocumentView matches with query."""
+    search = message_search(query).source(False)
+    return [int(hit.meta.id) for hit in search.scan()]
+
+
+class BulkActionRunner(JobRunner):
+    """
+    Apply a BulkAction's effect to every message matching its search.
+
+    Matching message ids are scanned from Elasticsearch, then their audits are
+    updated `chunk_size` at a time: one bulk_update() and one bulk insert of
+    history records per chunk. The chunk's documents are then partially updated in
+    bulk, via the index outbox when SEARCH_INDEX_OUTBOX is set. Progress is saved on
+    the BulkAction after every chunk.
+    """
+
+    def __init__(self, bulk_action: BulkAction, chunk_size: int = None):
+        super().__init__(bulk_action)
+        self.bulk_action = bulk_action
+        self.chunk_size = chunk_size or settings.BULK_ACTION_CHUNK_SIZE
+        self.effect = RECORD_STATUS_EFFECTS[bulk_action.effect]
+
+    def run(self) -> None:
+        bulk_action = self.bulk_action
+        try:
+            message_ids = search_message_ids(bulk_action.query)
+            self.save_progress(status=BulkAction.RUNNING, total=len(message_ids))
+            for start in range(0, len(message_ids), self.chunk_size):
+                end = start + self.chunk_size
+                self.apply(message_ids[start:end])
+                self.save_progress(processed=min(end, len(message_ids)))
+            for document in registry.get_documents([Message]):
+                document._index.refresh()
+        except Exception as e:
+            logger.exception(f"BulkAction[{bulk_action.pk}] failed")
+            self.save_progress(
+                status=BulkAction.FAILED, error=str(e), finished=timezone.now()
+            )
+            raise
+        self.save_progress(status=BulkAction.COMPLETE, finished=timezone.now())
+
+    def apply(self, message_ids: List[int]) -> None:
+        now = timezone.now()
+        with transaction.atomic():
+            audits = list(
+                MessageAudit.objects.select_for_update().filter(
+                    message__pk__in=message_ids
+                )
+            )
+            for audit in audits:
+                for field, value in self.effect.items():
+                    setattr(audit, field, value)
+                audit.processed = True
+                audit.date_processed = now
+                audit.updated_by = self.bulk_action.user
+            MessageAudit.objects.bulk_update(
+                audits, [*self.effect, "processed", "date_processed", "updated_by"]
+            )
+            self.create_history(audits, now)
+            if settings.SEARCH_INDEX_OUTBOX:
+                IndexOutbox.objects.bulk_create(
+                    [IndexOutbox(audit_id=audit.pk) for audit in audits]
+                )
+        if settings.SEARCH_INDEX_OUTBOX:
+            # Left in the outbox for drain_index_outbox_task if this fails
+            drain_outbox()
+            return
+        messages = Message.objects.filter(pk__in=message_ids).select_related("audit")
+        for document in registry.get_documents([Message]):
+            document().update_audits(messages, refresh=False)
+
+    def create_history(self, audits: List[MessageAudit], now) -> None:
+        """Bulk insert the "changed" history records save() would have created."""
+        History = MessageAudit.history.model
+        reason = f"BulkAction[{self.bulk_action.pk}]"
+        History.objects.bulk_create(
+            [
+                History(
+                    history_date=now,
+                    history_user=self.bulk_action.user,
+                    history_change_reason=reason,
+                    history_type="~",
+                    **{
+                        field.attname: getattr(audit, field.attname)
+                        for field in MessageAudit._meta.fields
+                    },
+                )
+                for audit in audits
+            ]
+        )
@@ -1,8 +1,19 @@
+import logging
+import re
+from itertools import islice
+from typing import List
+
 from django.conf import settings
+from django.db.models import QuerySet, prefetch_related_objects
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
 from django_elasticsearch_dsl import Document, Index, fields
-from elasticsearch_dsl import analyzer
+from elasticsearch_dsl import analyzer, tokenizer
+from core.index_version import bump_index_version
 from core.models import Message
 
+logger = logging.getLogger(__name__)
+
 INDEX = Index(settings.ELASTICSEARCH_INDEX_NAMES[__name__])
 INDEX.settings(number_of_shards=1, number_of_replicas=1)
 
@@ -17,17 +28,92 @@ lowercase_analyzer = analyzer(
     "lowercase_analyzer", tokenizer="keyword", filter=["lowercase"]
 )
 
+# Every 3 character substring, in order, so a match_phrase finds any substring
+trigram_analyzer = analyzer(
+    "trigram_analyzer",
+    tokenizer=tokenizer("trigram", "ngram", min_gram=3, max_gram=3),
+    filter=["lowercase"],
+)
+
+# Characters of the body stored as its preview
+PREVIEW_LENGTH = 200
+
+ANGLE_ADDRESS = re.compile(r"<([^<>]*)>")
+
+
+def split_addresses(value: str) -> List[str]:
+    """Split an address header on commas and semicolons outside quotes and <>."""
+    parts, current = [], []
+    quoted = bracketed = False
+    for char in value:
+        if char == '"':
+            quoted = not quoted
+        elif char == "<":
+            bracketed = True
+        elif char == ">":
+            bracketed = False
+        elif char in ",;" and not quoted and not bracketed:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_addresses(value: str) -> List[dict]:
+    """Parse an address header into unique {"email", "name", "domain"} dicts.
+
+    Emails and domains are lowercased. Parts without an address (e.g. Exchange
+    distinguished names) are kept as names.
+    """
+    addresses = {}
+    for part in split_addresses(value):
+        name, email = part, ""
+        match = ANGLE_ADDRESS.search(part)
+        if match:
+            email = match.group(1).strip()
+            start, end = match.span()
+            name = part[:start] + part[end:]
+        elif "@" in part and " " not in part:
+            name, email = "", part
+        name = name.strip().strip("\"'").strip()
+        email = email.lower()
+        domain = email.rpartition("@")[2] if "@" in email else ""
+        addresses[(email, name)] = {
+            "email": email or None,
+            "name": name or None,
+            "domain": domain or None,
+        }
+    return list(addresses.values())
+
 
 @INDEX.doc_type
 class MessageDocument(Document):
     """Message Elasticsearch Document"""
 
     id = fields.IntegerField(attr="id")
-    source_id = fields.TextField(fielddata=True)
+    # Sorted on .raw, with doc values rather than fielddata on the ES heap
+    source_id = fields.TextField(fields={"raw": fields.KeywordField()})
     msg_to = fields.StringField()
     msg_from = fields.StringField()
+    # Parsed from msg_from and msg_to, for the email filter
+    addresses = fields.ObjectField(
+        properties={
+            "email": fields.KeywordField(
+                fields={"ngram": fields.TextField(analyzer=trigram_analyzer)}
+            ),
+            "name": fields.TextField(
+                fields={"ngram": fields.TextField(analyzer=trigram_analyzer)}
+            ),
+            "domain": fields.KeywordField(),
+        },
+        multi=True,
+    )
     subject = fields.TextField(analyzer=html_strip)
     body = fields.TextField(analyzer=html_strip)
+    # Returned instead of the body by ?preview=true searches, not searchable
+    preview = fields.TextField(index=False)
     sent_date = fields.DateField()
     directory = fields.KeywordField()
 
@@ -60,8 +146,137 @@ class MessageDocument(Document):
     )
 
     file = fields.ObjectField(
-        properties={"filename": fields.StringField(), "sha256": fields.StringField(),},
+        properties={
+            # Exports are sorted by file
+            "id": fields.IntegerField(),
+            "filename": fields.StringField(),
+            "sha256": fields.StringField(),
+        },
     )
 
     class Django(object):
         model = Message
+        # Messages are prepared (and their relations fetched) in chunks of this size
+        queryset_pagination = 500
+
+    # Everything prepare() reads from other tables
+    select_related = ("audit", "account", "file")
+    prefetch_related = ("audit__labels",)
+
+    def prepare_preview(self, instance):
+        text = " ".join(strip_tags(instance.body).split())
+        return Truncator(text).chars(PREVIEW_LENGTH)
+
+    def prepare_addresses(self, instance):
+        return parse_addresses(f"{instance.msg_from},{instance.msg_to}")
+
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .select_related(*self.select_related)
+            .prefetch_related(*self.prefetch_related)
+        )
+
+    def get_indexing_queryset(self):
+        """Page through the queryset by primary key.
+
+        QuerySet.iterator() ignores prefetch_related(), so each page is fetched
+        with a fixed number of queries instead.
+        """
+        queryset = self.get_queryset().order_by("pk")
+        last_pk = 0
+        while True:
+            page = list(
+                queryset.filter(pk__gt=last_pk)[: self.django.queryset_pagination]
+            )
+            if not page:
+                return
+            yield from page
+            last_pk = page[-1].pk
+
+    def prepare_batch(self, messages):
+        """Prepare messages, fetching their relations with one query each."""
+        messages = list(messages)
+        prefetch_related_objects(messages, *self.select_related, *self.prefetch_related)
+        return [self.prepare(message) for message in messages]
+
+    def _get_actions(self, object_list, action):
+        """Prepare bulk actions a chunk of messages at a time."""
+        if action == "delete":
+            yield from super()._get_actions(object_list, action)
+            return
+        object_list = iter(object_list)
+        while True:
+            chunk = list(islice(object_list, self.django.queryset_pagination))
+            if not chunk:
+                return
+            for message, source in zip(chunk, self.prepare_batch(chunk)):
+                yield {
+                    "_op_type": action,
+                    "_index": self._index._name,
+                    "_id": message.pk,
+                    "_source": source,
+                }
+
+    def _get_audit_actions(self, messages):
+        prepare_audit = {name: prep for name, _, prep in self._prepared_fields}["audit"]
+        prefetch_related_objects(messages, "audit__labels")
+        for message in messages:
+            yield {
+                "_op_type": "update",
+                "_index": self._index._name,
+                "_id": message.pk,
+                "doc": {"audit": prepare_audit(message)},
+            }
+
+    def update_audits(self, messages, refresh=None):
+        """Partially update only the audit of each message's document.
+
+        All messages are sent in one bulk request. Documents that aren't indexed
+        yet are indexed in full instead.
+
+        Returns: ids of the messages whose update failed (e.g. rejected with 429)
+        """
+        messages = list(messages)
+        if not messages:
+            return set()
+        kwargs = {}
+        if refresh is True or (refresh is None and self.django.auto_refresh):
+            kwargs["refresh"] = True
+        _, errors = self.bulk(
+            self._get_audit_actions(messages), raise_on_error=False, **kwargs
+        )
+        missing = set()
+        failed = set()
+        for error in errors:
+            if error["update"]["status"] == 404:
+                missing.add(error["update"]["_id"])
+            else:
+                failed.add(int(error["update"]["_id"]))
+                logger.error(f"Failed to update audit: {error}")
+        if missing:
+            self.update(
+                [message for message in messages if str(message.pk) in missing],
+                refresh=refresh,
+            )
+        bump_index_version({message.account_id for message in messages})
+        return failed
+
+    def update(self, thing, refresh=None, action="index", **kwargs):
+        account_ids = self.account_ids(thing)
+        result = super().update(thing, refresh=refresh, action=action, **kwargs)
+        # Invalidates cached search results
+        bump_index_version(account_ids)
+        return result
+
+    @staticmethod
+    def account_ids(thing):
+        """Accounts of the messages in thing, or None if it can only be iterated once."""
+        if isinstance(thing, Message):
+            return {thing.account_id}
+        if isinstance(thing, QuerySet):
+            return set(thing.order_by().values_list("account_id", flat=True).distinct())
+        if isinstance(thing, (list, tuple, set)):
+            return {message.account_id for message in thing}
+        return None
@@ -0,0 +1,285 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Iterator, List, Tuple
+
+from django import db
+from django.db.models import Max
+from django.utils import timezone
+from elasticsearch.helpers import scan, streaming_bulk
+
+from api.documents.message import MessageDocument
+from core.index_version import bump_index_version
+from core.models import Message, MessageAudit
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReindexError(Exception):
+    pass
+
+
+def id_ranges(
+    start_after: int, last_id: int, batch_size: int
+) -> Iterator[Tuple[int, int]]:
+    """Split (start_after, last_id] into keyset ranges of up to batch_size ids."""
+    for lower in range(start_after, last_id, batch_size):
+        yield lower, min(lower + batch_size, last_id)
+
+
+def prepare_messages(start_after: int, last_id: int) -> Tuple[int, List[dict]]:
+    """Prepare the documents of messages with start_after < id <= last_id.
+
+    Runs in a reindex worker process. Rows are streamed with a server-side cursor.
+
+    Returns: (last_id, bulk index actions, sent to the new index by send())
+    """
+    return (
+        last_id,
+        prepare_actions(Message.objects.filter(id__gt=start_after, id__lte=last_id)),
+    )
+
+
+def prepare_actions(messages) -> List[dict]:
+    # _get_actions() prefetches each chunk's relations in a fixed number of queries
+    document = MessageDocument()
+    messages = messages.select_related(*document.select_related).order_by("id")
+    return list(document._get_actions(messages.iterator(), "index"))
+
+
+class MessageReindexer:
+    """
+    Rebuild the message index without taking search down.
+
+    MessageDocument's index name is used as an alias. Messages are indexed into a
+    new versioned index (e.g. message-20201201120000) in keyset ranges of Message.id,
+    prepared by a pool of `workers` processes and bulk loaded in id order. The last
+    loaded id is checkpointed in the new index's mapping _meta, so an interrupted
+    reindex can be resumed.
+
+    Once every message is loaded, messages created or audited since the reindex
+    started are indexed again, messages deleted since are removed, and the alias
+    is swapped to the new index in one atomic request. The first reindex replaces
+    the original concrete index (named like the alias) in the same request. The
+    catch up runs again after the swap, for changes made since the first one
+    started. Previous versions are kept for rollback unless delete_old is set.
+
+    Usage:
+        >>> MessageReindexer(workers=4).run()
+    """
+
+    def __init__(self, workers: int = 1, batch_size: int = 1000, max_retries: int = 5):
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.max_retries = max_retries
+        self.alias = MessageDocument._index._name
+        self.connection = MessageDocument._get_connection()
+        self.index_name = None
+        self.started = None
+        self.last_id = 0
+        self.indexed = 0
+        self.failed = 0
+
+    def run(self, resume: bool = False, delete_old: bool = False) -> str:
+        """Reindex every message and point the alias at the new index.
+
+        Returns: name of the new index
+        """
+        if resume:
+            self.resume_index()
+        else:
+            self.create_index()
+        started = time.monotonic()
+        self.load(self.last_id, self.max_id())
+        # Before the first catch up, whose queries miss changes made while it runs
+        cutoff = timezone.now()
+        self.catch_up(self.started)
+        self.finish_index()
+        previous = self.swap_alias()
+        self.catch_up(cutoff)
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"Indexed {self.indexed} messages into {self.index_name} in "
+            f"{elapsed:.1f}s ({self.failed} failed)"
+        )
+        if delete_old:
+            for index in previous:
+                logger.info(f"Deleting {index}")
+                self.connection.indices.delete(index=index)
+        return self.index_name
+
+    def create_index(self) -> None:
+        self.started = timezone.now()
+        self.index_name = f"{self.alias}-{self.started:%Y%m%d%H%M%S}"
+        index = MessageDocument._index.clone(name=self.index_name)
+        # Restored by finish_index()
+        index.settings(number_of_replicas=0, refresh_interval="-1")
+        index.create()
+        self.save_checkpoint()
+        logger.info(f"Created {self.index_name}")
+
+    def resume_index(self) -> None:
+        """Continue loading the newest versioned index that isn't aliased yet."""
+        indices = self.connection.indices.get(index=f"{self.alias}-*")
+        unaliased = sorted(
+            name
+            for name, index in indices.items()
+            if self.alias not in index["aliases"]
+        )
+        if not unaliased:
+            raise ReindexError(f"No unfinished {self.alias} index to resume")
+        self.index_name = unaliased[-1]
+        mapping = self.connection.indices.get_mapping(index=self.index_name)
+        meta = mapping[self.index_name]["mappings"].get("_meta", {})
+        self.last_id = meta.get("last_id", 0)
+        self.started = datetime.fromisoformat(meta["started"])
+        logger.info(f"Resuming {self.index_name} after Message[{self.last_id}]")
+
+    def save_checkpoint(self) -> None:
+        self.connection.indices.put_mapping(
+            index=self.index_name,
+            body={
+                "_meta": {"last_id": self.last_id, "started": self.started.isoformat()}
+            },
+        )
+
+    @staticmethod
+    def max_id() -> int:
+        return Message.objects.aggregate(Max("id"))["id__max"] or 0
+
+    def load(self, start_after: int, last_id: int) -> None:
+        """Index messages with start_after < id <= last_id, checkpointing each range."""
+        ranges = id_ranges(start_after, last_id, self.batch_size)
+        if self.workers == 1:
+            for id_range in ranges:
+                self.bulk_load(*prepare_messages(*id_range))
+            return
+        # Forked workers must not share the parent's database connection
+        db.connections.close_all()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for id_range in ranges:
+                pending.append(executor.submit(prepare_messages, *id_range))
+                if len(pending) >= self.workers * 2:
+                    self.bulk_load(*pending.popleft().result())
+            while pending:
+                self.bulk_load(*pending.popleft().result())
+
+    def bulk_load(self, last_id: int, actions: List[dict]) -> None:
+        """Send a range's prepared documents to the new index and checkpoint it."""
+        self.send(actions)
+        self.last_id = last_id
+        self.save_checkpoint()
+        logger.info(f"Indexed {self.indexed} messages, up to Message[{last_id}]")
+
+    def send(self, actions: List[dict]) -> None:
+        for action in actions:
+            action["_index"] = self.index_name
+        for _, item in streaming_bulk(
+            self.connection,
+            actions,
+            max_retries=self.max_retries,
+            raise_on_error=False,
+            yield_ok=False,
+        ):
+            self.failed += 1
+            logger.error(f"Failed to index {item}")
+        self.indexed += len(actions)
+
+    def delete(self, message_ids: List[int]) -> None:
+        actions = (
+            {"_op_type": "delete", "_index": self.index_name, "_id": message_id}
+            for message_id in message_ids
+        )
+        for _, item in streaming_bulk(
+            self.connection,
+            actions,
+            max_retries=self.max_retries,
+            raise_on_error=False,
+            yield_ok=False,
+        ):
+            if item["delete"].get("status") != 404:
+                self.failed += 1
+                logger.error(f"Failed to delete {item}")
+
+    def removed_ids(self) -> Iterator[int]:
+        """Yield the ids of indexed messages that are no longer in the database."""
+        self.connection.indices.refresh(index=self.index_name)
+        hits = (
+            int(hit["_id"])
+            for hit in scan(
+                self.connection,
+                index=self.index_name,
+                query={"_source": False},
+                size=self.batch_size,
+            )
+        )
+        while True:
+            chunk = list(islice(hits, self.batch_size))
+            if not chunk:
+                break
+            existing = set(
+                Message.objects.filter(id__in=chunk).values_list("id", flat=True)
+            )
+            yield from (
+                message_id for message_id in chunk if message_id not in existing
+            )
+
+    def catch_up(self, since: datetime) -> None:
+        """Index messages created, or whose audit changed, after since.
+
+        Messages deleted from the database since they were loaded are deleted
+        from the new index too.
+        """
+        self.load(self.last_id, self.max_id())
+        audit_ids = (
+            MessageAudit.history.filter(history_date__gte=since)
+            .values_list("id", flat=True)
+            .distinct()
+        )
+        messages = Message.objects.filter(audit_id__in=audit_ids, id__lte=self.last_id)
+        actions = prepare_actions(messages)
+        if actions:
+            logger.info(f"Indexing {len(actions)} messages audited since {since}")
+            self.send(actions)
+        removed = list(self.removed_ids())
+        if removed:
+            logger.info(
+                f"Deleting {len(removed)} messages deleted since they were indexed"
+            )
+            self.delete(removed)
+        bump_index_version()
+
+    def finish_index(self) -> None:
+        replicas = MessageDocument._index._settings.get("number_of_replicas", 1)
+        self.connection.indices.put_settings(
+            index=self.index_name,
+            body={"index": {"number_of_replicas": replicas, "refresh_interval": None}},
+        )
+        self.connection.indices.refresh(index=self.index_name)
+
+    def swap_alias(self) -> List[str]:
+        """Atomically point the alias at the new index.
+
+        Returns: names of the indices the alias pointed to before
+        """
+        indices = self.connection.indices
+        actions = []
+        previous = []
+        if indices.exists_alias(name=self.alias):
+            previous = list(indices.get_alias(name=self.alias))
+            actions = [
+                {"remove": {"index": index, "alias": self.alias}} for index in previous
+            ]
+        elif indices.exists(index=self.alias):
+            # The original index has the alias' name, replace it
+            actions = [{"remove_index": {"index": self.alias}}]
+        actions.append({"add": {"index": self.index_name, "alias": self.alias}})
+        indices.update_aliases(body={"actions": actions})
+        bump_index_version()
+        logger.info(f"Pointed {self.alias} at {self.index_name} (was {previous})")
+        return previous
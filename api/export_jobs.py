@@ -0,0 +1,150 @@
+import csv
+import gzip
+import json
+import logging
+import tempfile
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from elasticsearch_dsl import Search
+
+from api.bulk_actions import message_search
+from api.exports import manifest_chunks, scan_by_file
+from api.jobs import JobRunner
+from core.models import ExportJob, Message
+
+
+logger = logging.getLogger(__name__)
+
+# Columns of JSONL and CSV exports, and the Message lookups they're read from
+EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("source_id", "source_id"),
+    ("account", "account__title"),
+    ("filename", "file__filename"),
+    ("sha256", "file__sha256"),
+    ("sent_date", "sent_date"),
+    ("msg_from", "msg_from"),
+    ("msg_to", "msg_to"),
+    ("msg_cc", "msg_cc"),
+    ("msg_bcc", "msg_bcc"),
+    ("subject", "subject"),
+    ("directory", "directory"),
+    ("processed", "audit__processed"),
+    ("is_record", "audit__is_record"),
+    ("is_restricted", "audit__is_restricted"),
+    ("needs_redaction", "audit__needs_redaction"),
+    ("body", "body"),
+]
+
+EXTENSIONS = {
+    ExportJob.MANIFEST: "json",
+    ExportJob.JSONL: "jsonl",
+    ExportJob.CSV: "csv",
+}
+
+
+def message_rows(message_ids: List[int]) -> Iterator[dict]:
+    """Yield the export columns of message_ids, in id order.
+
+    The rows are fetched in one query, so callers bound the memory long bodies
+    take by the number of ids they pass. Messages deleted since they were
+    indexed are left out. Dates are ISO 8601 strings.
+    """
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    rows = (
+        Message.objects.filter(pk__in=message_ids)
+        .order_by("pk")
+        .values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+    )
+    for row in rows:
+        yield {
+            column: value.isoformat() if isinstance(value, datetime) else value
+            for column, value in zip(columns, row)
+        }
+
+
+class ExportJobRunner(JobRunner):
+    """
+    Write every message matching an ExportJob's search to a gzipped artifact.
+
+    The JSON id manifest is built from the hits scanned from Elasticsearch,
+    grouped by file as ExportDocumentView streams it. JSONL and CSV exports scan
+    the matching ids, then read the messages' metadata and bodies from Postgres
+    `chunk_size` ids at a time. The export is compressed into a temporary file,
+    which is saved to the artifact's storage once it's complete. Progress is
+    saved on the ExportJob after every chunk.
+    """
+
+    def __init__(self, export_job: ExportJob, chunk_size: int = None):
+        super().__init__(export_job)
+        self.export_job = export_job
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        self.processed = 0
+
+    def run(self) -> None:
+        export_job = self.export_job
+        try:
+            search = message_search(export_job.query)
+            self.save_progress(status=ExportJob.RUNNING, total=search.count())
+            with tempfile.TemporaryFile() as output:
+                # Closing the text stream ends the gzip member, not output
+                with gzip.open(
+                    output, "wt", compresslevel=6, encoding="utf-8", newline=""
+                ) as text:
+                    self.write(search, text)
+                size = output.tell()
+                export_job.artifact.save(self.file_name(), File(output), save=False)
+        except Exception as e:
+            logger.exception(f"ExportJob[{export_job.pk}] failed")
+            self.save_progress(
+                status=ExportJob.FAILED, error=str(e), finished=timezone.now()
+            )
+            raise
+        self.save_progress(
+            status=ExportJob.COMPLETE,
+            artifact=export_job.artifact.name,
+            size=size,
+            processed=self.processed,
+            finished=timezone.now(),
+        )
+
+    def write(self, search: Search, output) -> None:
+        if self.export_job.format == ExportJob.MANIFEST:
+            for chunk in manifest_chunks(self.count_progress(scan_by_file(search))):
+                output.write(chunk)
+            return
+        write_row = self.row_writer(output)
+        message_ids = (int(hit.meta.id) for hit in search.source(False).scan())
+        while True:
+            chunk = list(islice(message_ids, self.chunk_size))
+            if not chunk:
+                break
+            for row in message_rows(chunk):
+                write_row(row)
+                self.processed += 1
+            self.save_progress(processed=self.processed)
+
+    def row_writer(self, output) -> Callable[[dict], None]:
+        if self.export_job.format == ExportJob.JSONL:
+            return lambda row: output.write(f"{json.dumps(row)}\n")
+        writer = csv.DictWriter(output, fieldnames=[name for name, _ in EXPORT_COLUMNS])
+        writer.writeheader()
+        return writer.writerow
+
+    def count_progress(self, hits: Iterable) -> Iterator:
+        """Pass hits through, saving progress every chunk_size hits."""
+        for hit in hits:
+            yield hit
+            self.processed += 1
+            if self.processed % self.chunk_size == 0:
+                self.save_progress(processed=self.processed)
+
+    def file_name(self) -> str:
+        created = self.export_job.created.strftime("%Y-%m-%dT%H%M%S")
+        extension = EXTENSIONS[self.export_job.format]
+        return f"rr-{self.export_job.pk}-{created}.{extension}.gz"
@@ -0,0 +1,93 @@
+import gzip
+import io
+import json
+import logging
+from typing import Iterable, Iterator
+
+from elasticsearch_dsl import Search
+from elasticsearch_dsl.connections import get_connection
+
+
+logger = logging.getLogger(__name__)
+
+# Compressed bytes gzip_stream() buffers before yielding them
+GZIP_CHUNK_SIZE = 64 * 1024
+
+
+def file_id_mapped(search: Search) -> bool:
+    """Whether every index search reads has the file.id field exports sort on."""
+    mappings = get_connection(search._using).indices.get_field_mapping(
+        fields="file.id", index=search._index
+    )
+    return all("file.id" in index["mappings"] for index in mappings.values())
+
+
+def scan_by_file(search: Search, fields=("source_id", "file")) -> Iterator:
+    """Scroll through every hit of search, ordered by file then message id.
+
+    Indices created before file.id was mapped can't be sorted by file. Their hits
+    are grouped by file in memory instead, until reindex_messages is run.
+    """
+    search = search.source(list(fields))
+    if not file_id_mapped(search):
+        logger.warning(
+            "file.id isn't mapped, grouping the export in memory. "
+            "Run reindex_messages to stream exports."
+        )
+        return group_by_file(search.scan())
+    return (
+        search.sort({"file.id": {"order": "asc"}}, {"id": {"order": "asc"}})
+        .params(preserve_order=True)
+        .scan()
+    )
+
+
+def group_by_file(hits: Iterable) -> Iterator:
+    """Collect hits, then yield them grouped by file, in the order files appear."""
+    files = {}
+    for hit in hits:
+        files.setdefault((hit.file["filename"], hit.file["sha256"]), []).append(hit)
+    for file_hits in files.values():
+        yield from file_hits
+
+
+def manifest_chunks(hits: Iterable) -> Iterator[str]:
+    """Yield the JSON id manifest of hits ordered by file, a piece at a time.
+
+    The manifest lists each file's source ids:
+        [{"filename": "...", "sha256": "...", "id_list": ["1", "2"]}, ...]
+    """
+    yield "["
+    current = None
+    for hit in hits:
+        file = (hit.file["filename"], hit.file["sha256"])
+        if file == current:
+            yield f", {json.dumps(hit.source_id)}"
+            continue
+        if current is not None:
+            yield "]}, "
+        header = json.dumps({"filename": file[0], "sha256": file[1]})
+        # Open the file's id_list, its ids are added as they arrive
+        yield f'{header[:-1]}, "id_list": [{json.dumps(hit.source_id)}'
+        current = file
+    yield "]}]" if current is not None else "]"
+
+
+def gzip_stream(chunks: Iterable[str], chunk_size: int = GZIP_CHUNK_SIZE):
+    """Gzip chunks of text as they arrive, yielding the compressed bytes.
+
+    The gzip header is yielded right away, then compressed data whenever at
+    least chunk_size bytes are buffered.
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=6) as compressor:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        for chunk in chunks:
+            compressor.write(chunk.encode("utf-8"))
+            if buffer.tell() >= chunk_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue()
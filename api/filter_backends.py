@@ -2,22 +2,42 @@ import operator
 from functools import reduce
 from elasticsearch_dsl.query import Q
 
+from django_elasticsearch_dsl_drf.filter_backends import FacetedSearchFilterBackend
 from django_elasticsearch_dsl_drf.filter_backends.filtering.common import (
     FilteringFilterBackend,
 )
 
+# Length of the grams in MessageDocument's addresses.*.ngram subfields
+EMAIL_NGRAM_LENGTH = 3
+
+
+def email_queries(value):
+    """Queries for messages from or to addresses containing value.
+
+    Matches the email or display name containing value, or the exact domain.
+    Values shorter than a trigram match the start of an email or name word.
+    """
+    value = value.strip().lower()
+    queries = [
+        Q("term", **{"addresses.email": value}),
+        Q("term", **{"addresses.domain": value}),
+    ]
+    if len(value) >= EMAIL_NGRAM_LENGTH:
+        queries.append(Q("match_phrase", **{"addresses.email.ngram": value}))
+        queries.append(Q("match_phrase", **{"addresses.name.ngram": value}))
+    else:
+        queries.append(Q("prefix", **{"addresses.email": value}))
+        queries.append(Q("prefix", **{"addresses.name": value}))
+    return queries
+
 
 class CustomFilteringFilterBackend(FilteringFilterBackend):
     def _email_search_backend(cls, queryset, options, value):
         values = value.split(",")
         queries = []
         for _value in values:
-            queries.append(
-                Q("wildcard", **{"msg_to": {"value": "*{}*".format(_value)}})
-            )
-            queries.append(
-                Q("wildcard", **{"msg_from": {"value": "*{}*".format(_value)}})
-            )
+            if _value.strip():
+                queries.extend(email_queries(_value))
 
         if queries:
             queryset = cls.apply_query(
@@ -31,3 +51,12 @@ class CustomFilteringFilterBackend(FilteringFilterBackend):
             return cls._email_search_backend(cls, queryset, options, value)
 
         return super().apply_query_contains(queryset, options, value)
+
+
+class OptionalFacetedSearchFilterBackend(FacetedSearchFilterBackend):
+    """Aggregate facets unless the view's aggregate_facets is false."""
+
+    def filter_queryset(self, request, queryset, view):
+        if not getattr(view, "aggregate_facets", True):
+            return queryset
+        return super().filter_queryset(request, queryset, view)
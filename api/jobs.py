@@ -0,0 +1,28 @@
+from typing import Optional
+
+from api.search_cache import PAGE_PARAMS
+from core.models import Job
+
+
+def job_query(query_params) -> Optional[dict]:
+    """The search and filter parameters a Job runs on, as lists of values.
+
+    Page parameters are left out. Returns None if there are none left.
+    """
+    query = {
+        key: query_params.getlist(key) for key in query_params if key not in PAGE_PARAMS
+    }
+    return query or None
+
+
+class JobRunner:
+    """Base of the classes running a Job, which save its progress as they go."""
+
+    def __init__(self, job: Job):
+        self.job = job
+
+    def save_progress(self, **fields) -> None:
+        """Set fields on the job, and update only them in the database."""
+        for name, value in fields.items():
+            setattr(self.job, name, value)
+        type(self.job).objects.filter(pk=self.job.pk).update(**fields)
@@ -0,0 +1,88 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.documents.message import MessageDocument
+
+
+class Command(BaseCommand):
+    help = "Measure the latency and heap usage of paging message searches by a field"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--field",
+            default="source_id.raw",
+            help="Field to sort on, e.g. source_id on an index mapped with fielddata",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=100, help="Number of searches to time",
+        )
+        parser.add_argument(
+            "--size", type=int, default=25, help="Number of hits per search"
+        )
+        parser.add_argument(
+            "--clear_cache",
+            default=False,
+            action="store_true",
+            help="Clear the index's fielddata cache first, to include loading it",
+        )
+
+    def handle(self, *args, **options):
+        field = options["field"]
+        connection = MessageDocument._get_connection()
+        index = MessageDocument._index._name
+        if options["clear_cache"]:
+            connection.indices.clear_cache(index=index, fielddata=True)
+        heap_before = self.heap_used(connection)
+
+        took, elapsed = [], []
+        after = None
+        for _ in range(max(options["requests"], 1)):
+            # Page through the index with search_after, like cursor pagination
+            search = (
+                MessageDocument.search()
+                .sort({field: {"order": "asc"}}, {"id": {"order": "asc"}})
+                .source(False)
+                .params(request_cache=False)
+            )
+            if after:
+                search = search.extra(search_after=after)
+            started = time.monotonic()
+            response = search[: options["size"]].execute()
+            elapsed.append((time.monotonic() - started) * 1000)
+            took.append(response.took)
+            hits = list(response)
+            after = list(hits[-1].meta.sort) if hits else None
+
+        stats = connection.indices.stats(
+            index=index, metric="fielddata", fielddata_fields=field
+        )
+        fielddata = stats["_all"]["total"]["fielddata"]["memory_size_in_bytes"]
+        heap_after = self.heap_used(connection)
+
+        self.stdout.write(f"Sorted {index} by {field}, {len(took)} searches:")
+        self.stdout.write(f"  took (ms):    {self.summary(took)}")
+        self.stdout.write(f"  elapsed (ms): {self.summary(elapsed)}")
+        self.stdout.write(f"  fielddata:    {fielddata / 2 ** 20:.1f} MiB")
+        self.stdout.write(
+            f"  heap used:    {heap_before / 2 ** 20:.1f} MiB before, "
+            f"{heap_after / 2 ** 20:.1f} MiB after"
+        )
+
+    @staticmethod
+    def heap_used(connection) -> int:
+        """Heap used by every node of the cluster, in bytes."""
+        stats = connection.nodes.stats(metric="jvm")
+        return sum(
+            node["jvm"]["mem"]["heap_used_in_bytes"] for node in stats["nodes"].values()
+        )
+
+    @staticmethod
+    def summary(timings) -> str:
+        timings = sorted(timings)
+        p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+        return (
+            f"median {statistics.median(timings):.1f}, p95 {p95:.1f}, "
+            f"max {timings[-1]:.1f}"
+        )
@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.documents.reindex import MessageReindexer, ReindexError
+
+
+class Command(BaseCommand):
+    help = "Rebuild the message index into a new index and swap the alias to it"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of processes to prepare documents with (default: CPU count)",
+        )
+        parser.add_argument(
+            "--batch_size",
+            type=int,
+            default=1000,
+            help="Number of message ids per range (and checkpoint)",
+        )
+        parser.add_argument(
+            "--resume",
+            default=False,
+            action="store_true",
+            help="Continue the newest unfinished reindex from its last indexed id",
+        )
+        parser.add_argument(
+            "--delete_old",
+            default=False,
+            action="store_true",
+            help="Delete the indices the alias pointed to before",
+        )
+
+    def handle(self, *args, **options):
+        reindexer = MessageReindexer(
+            workers=options["workers"], batch_size=options["batch_size"]
+        )
+        try:
+            index_name = reindexer.run(
+                resume=options["resume"], delete_old=options["delete_old"]
+            )
+        except ReindexError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"{reindexer.alias} now points to {index_name}")
@@ -0,0 +1,180 @@
+import base64
+import binascii
+import json
+import uuid
+from typing import List, Optional
+
+from django_elasticsearch_dsl_drf.pagination import LimitOffsetPagination
+from elasticsearch.exceptions import RequestError
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# Unique field appended to every sort, so hits with equal sort values keep
+# a stable order between pages
+TIEBREAKER = "id"
+
+
+def normalize_sort(sort: list) -> List[dict]:
+    """Rewrite a Search's sort as [{field: {"order": ..., "missing": ...}}, ...].
+
+    Missing values are explicitly sorted last, so reverse_sort() can put them first.
+    """
+    normalized = []
+    for entry in sort:
+        if isinstance(entry, str):
+            field, options = entry, {}
+        else:
+            ((field, options),) = entry.items()
+            if isinstance(options, str):
+                options = {"order": options}
+        options = dict(options)
+        # Elasticsearch sorts _score descending and other fields ascending by default
+        options.setdefault("order", "desc" if field == "_score" else "asc")
+        if field != "_score":
+            options.setdefault("missing", "_last")
+        normalized.append({field: options})
+    if not any(TIEBREAKER in entry for entry in normalized):
+        normalized.append({TIEBREAKER: {"order": "asc", "missing": "_last"}})
+    return normalized
+
+
+def reverse_sort(sort: List[dict]) -> List[dict]:
+    """Reverse a normalized sort, to read the page before a cursor."""
+    reversed_sort = []
+    for entry in sort:
+        ((field, options),) = entry.items()
+        options = dict(options)
+        options["order"] = "asc" if options["order"] == "desc" else "desc"
+        if "missing" in options:
+            options["missing"] = "_first" if options["missing"] == "_last" else "_last"
+        reversed_sort.append({field: options})
+    return reversed_sort
+
+
+def sort_key(sort: List[dict]) -> str:
+    """Describe a normalized sort, e.g. "-_score,sent_date,id", to check cursors with."""
+    return ",".join(
+        f"{'-' if options['order'] == 'desc' else ''}{field}"
+        for entry in sort
+        for field, options in entry.items()
+    )
+
+
+def encode_cursor(cursor: dict) -> str:
+    data = json.dumps(cursor, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(encoded: str) -> dict:
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise NotFound(SearchAfterPagination.invalid_cursor_message)
+    if not isinstance(cursor, dict) or not isinstance(cursor.get("after"), list):
+        raise NotFound(SearchAfterPagination.invalid_cursor_message)
+    return cursor
+
+
+class SearchAfterPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with a cursor mode for deep paging.
+
+    Requests with a `cursor` parameter (empty for the first page) are paginated
+    with search_after on the view's sort, plus the unique `id` as a tiebreaker,
+    instead of from/size. Each page costs the same however deep it is, and isn't
+    limited by the index's max_result_window. next and previous links carry
+    opaque cursors: the sort values of the page's last (or first) hit, read in
+    the opposite direction for the previous page.
+
+    Elasticsearch 7.5 has no point-in-time API. Instead, every page of a cursor
+    is searched with the same `preference`, so it's served by the same shard
+    copies and scores and ties don't shift between pages. Changes refreshed into
+    the index between requests are still visible. Cursors also carry the sort
+    they were read with, and are invalid for any other (e.g. a changed ordering).
+
+    Requests without a cursor are paginated with limit/offset, as before.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, *args, **kwargs):
+        self.cursor = None
+        self.next_cursor = None
+        self.previous_cursor = None
+        super().__init__(*args, **kwargs)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        if getattr(queryset, "_suggest", False) or view.action == "functional_suggest":
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        encoded = request.query_params[self.cursor_query_param]
+        self.cursor = decode_cursor(encoded) if encoded else {"after": []}
+        preference = self.cursor.get("preference") or uuid.uuid4().hex
+        backwards = bool(self.cursor.get("reverse"))
+
+        sort = normalize_sort(queryset._sort)
+        key = sort_key(sort)
+        if self.cursor["after"] and self.cursor.get("sort") != key:
+            raise NotFound(self.invalid_cursor_message)
+        search = queryset.sort(*(reverse_sort(sort) if backwards else sort))
+        search = search.params(preference=preference)
+        if self.cursor["after"]:
+            search = search.extra(search_after=self.cursor["after"])
+        try:
+            # One extra hit tells whether there's another page in this direction
+            resp = search[: self.limit + 1].execute()
+        except RequestError:
+            if not self.cursor["after"]:
+                raise
+            # search_after values that don't fit the sort fields' types
+            raise NotFound(self.invalid_cursor_message)
+        self.facets = getattr(resp, "aggregations", None)
+        self.count = self.get_count(resp)
+
+        hits = list(resp)
+        has_more = len(hits) > self.limit
+        hits = hits[: self.limit]
+        if backwards:
+            hits.reverse()
+        first = self.hit_cursor(hits[0], preference, key) if hits else None
+        last = self.hit_cursor(hits[-1], preference, key) if hits else None
+        if backwards:
+            # We came from the page after this one
+            self.next_cursor = last
+            self.previous_cursor = first if has_more else None
+        else:
+            self.next_cursor = last if has_more else None
+            self.previous_cursor = first if self.cursor["after"] else None
+        if self.previous_cursor:
+            self.previous_cursor = {**self.previous_cursor, "reverse": True}
+        return hits
+
+    @staticmethod
+    def hit_cursor(hit, preference: str, sort: str) -> dict:
+        return {"after": list(hit.meta.sort), "preference": preference, "sort": sort}
+
+    def get_next_link(self) -> Optional[str]:
+        if self.cursor is None:
+            return super().get_next_link()
+        return self.cursor_link(self.next_cursor)
+
+    def get_previous_link(self) -> Optional[str]:
+        if self.cursor is None:
+            return super().get_previous_link()
+        return self.cursor_link(self.previous_cursor)
+
+    def cursor_link(self, cursor: Optional[dict]) -> Optional[str]:
+        if cursor is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(cursor))
@@ -3,7 +3,7 @@ from hashlib import sha256
 
 from api.sample_data.etl import load_data
 from core.models import Account, MessageAudit, File
-from etl.message.nlp import extract_labels, load_nlp_model
+from etl.message.nlp import extract_labels_batch, load_nlp_model
 
 SAMPLE_DATA_SETS = (
     {
@@ -35,17 +35,17 @@ def ingest_files(account, spacy_model, files, source):
         ratom_file = account.files.create(
             filename=filename, original_path=f"/tmp/{filename}", sha256=di.hexdigest()
         )
-        messages = load_data(source)
-        for message in messages:
-            message.object.account = account
-            message.object.file = ratom_file
-            ratom_file.unique_paths.append(message.object.directory)
-            labels = extract_labels(
-                f"{message.object.subject}\n{message.object.body}", spacy_model
-            )
-            message.object.audit = MessageAudit.objects.create()
-            message.object.audit.labels.add(*labels)
-            message.object.save()
+        messages = [message.object for message in load_data(source)]
+        labels_per_message = extract_labels_batch(
+            [f"{message.subject}\n{message.body}" for message in messages], spacy_model,
+        )
+        for message, labels in zip(messages, labels_per_message):
+            message.account = account
+            message.file = ratom_file
+            ratom_file.unique_paths.append(message.directory)
+            message.audit = MessageAudit.objects.create()
+            message.audit.labels.add(*labels)
+            message.save()
         ratom_file.reported_total_messages = ratom_file.message_set.count()
         ratom_file.import_status = File.COMPLETE
         ratom_file.save()
@@ -0,0 +1,82 @@
+import hashlib
+import json
+from typing import List, Optional
+
+from django.core.cache import cache
+
+from core.index_version import index_versions
+
+
+# Query parameters that don't change which messages a search matches
+PAGE_PARAMS = {"limit", "offset", "cursor", "ordering", "preview"}
+# Filters that limit a search to accounts, with "__" separated values
+ACCOUNT_PARAMS = {"account", "account__in"}
+
+STATS_KEY = "search-cache-stats"
+
+
+def filtered_account_ids(query_params) -> Optional[List[int]]:
+    """Accounts a search is limited to by its account filter, or None."""
+    account_ids = set()
+    for name in ACCOUNT_PARAMS:
+        for value in query_params.getlist(name):
+            for part in value.split("__"):
+                if not part.isdigit():
+                    return None
+                account_ids.add(int(part))
+    return sorted(account_ids) or None
+
+
+def search_cache_key(prefix: str, query_params, pages: bool = False, extra="") -> str:
+    """Cache key of a search at the current version of the messages it can match.
+
+    Parameters and their values are sorted. Page, cursor and ordering parameters
+    are left out unless pages is set, so every page of a search shares the key.
+    Searches filtered by account are keyed with those accounts' index versions,
+    so they're only invalidated by changes to their messages.
+    """
+    params = sorted(
+        (name, sorted(values))
+        for name, values in query_params.lists()
+        if pages or name not in PAGE_PARAMS
+    )
+    versions = index_versions(filtered_account_ids(query_params))
+    digest = hashlib.sha1(json.dumps([params, versions, extra]).encode()).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+def is_first_page(query_params) -> bool:
+    return query_params.get("offset") in (None, "", "0") and not query_params.get(
+        "cursor"
+    )
+
+
+def record_lookup(prefix: str, hit: bool) -> None:
+    """Count a hit or miss of prefix's cached searches, for search_cache_stats()."""
+    key = f"{STATS_KEY}:{prefix}:{'hits' if hit else 'misses'}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def search_cache_stats(prefixes=("search", "facets")) -> dict:
+    """Hits, misses and hit rate of each prefix's cached searches."""
+    keys = [
+        f"{STATS_KEY}:{prefix}:{count}"
+        for prefix in prefixes
+        for count in ("hits", "misses")
+    ]
+    counts = cache.get_many(keys)
+    stats = {}
+    for prefix in prefixes:
+        hits = counts.get(f"{STATS_KEY}:{prefix}:hits", 0)
+        misses = counts.get(f"{STATS_KEY}:{prefix}:misses", 0)
+        lookups = hits + misses
+        stats[prefix] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else None,
+        }
+    return stats
@@ -10,7 +10,18 @@ from rest_framework import serializers
 
 from api.documents.message import MessageDocument
 from etl.providers.factory import import_provider_factory
-from core.models import Account, File, Message, Attachments, MessageAudit, User, Label
+from core.models import (
+    Account,
+    Blob,
+    BulkAction,
+    ExportJob,
+    File,
+    Message,
+    Attachments,
+    MessageAudit,
+    User,
+    Label,
+)
 
 logger = logging.getLogger(__file__)
 
@@ -57,6 +68,58 @@ class FileSerializer(serializers.ModelSerializer):
         }
 
 
+class BlobSerializer(serializers.ModelSerializer):
+    imported = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Blob
+        fields = [
+            "container",
+            "name",
+            "size",
+            "etag",
+            "last_modified",
+            "last_seen",
+            "imported",
+        ]
+
+
+class BulkActionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BulkAction
+        fields = [
+            "id",
+            "action",
+            "effect",
+            "query",
+            "status",
+            "total",
+            "processed",
+            "error",
+            "created",
+            "finished",
+        ]
+        read_only_fields = fields
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id",
+            "format",
+            "query",
+            "status",
+            "total",
+            "processed",
+            "size",
+            "error",
+            "created",
+            "finished",
+        ]
+        read_only_fields = fields
+
+
 class AccountSerializer(serializers.ModelSerializer):
     files = FileSerializer(many=True, read_only=True)
 
@@ -161,6 +224,7 @@ class MessageAuditSerializer(serializers.ModelSerializer):
             instance.needs_redaction = validated_data["needs_redaction"]
             instance.processed = True
         if "append_user_label" in validated_data:
+            # Not label_cache: web workers live long enough for it to go stale
             label, _ = Label.objects.get_or_create(
                 name=validated_data["append_user_label"], type=Label.USER
             )
@@ -260,3 +324,35 @@ class MessageDocumentSerializer(serializers.Serializer):
             "highlight",
             "audit",
         )
+
+
+class MessagePreviewSerializer(serializers.BaseSerializer):
+    """
+    Serializer for Message document hits of ?preview=true searches.
+
+    Hits are projected into dicts directly rather than through serializer
+    fields. The body is replaced by its first highlighted fragment, or the
+    document's stored preview.
+    """
+
+    source_fields = ("id", "source_id", "msg_from", "msg_to", "subject", "directory")
+    sent_date_field = serializers.DateTimeField(read_only=True)
+
+    def to_representation(self, hit):
+        source = hit.to_dict(skip_empty=False)
+        data = {name: source.get(name) for name in self.source_fields}
+        sent_date = source.get("sent_date")
+        data["sent_date"] = (
+            self.sent_date_field.to_representation(sent_date) if sent_date else None
+        )
+        highlight = getattr(hit.meta, "highlight", None)
+        highlight = highlight.to_dict() if highlight else {}
+        fragments = highlight.get("body")
+        data["preview"] = fragments[0] if fragments else source.get("preview")
+        data["highlight"] = highlight
+        data["score"] = hit.meta.score
+        # Keeps empty values, as MessageDocumentSerializer does
+        audit = hit.audit.to_dict(skip_empty=False) if source.get("audit") else {}
+        data["processed"] = audit.get("processed", False)
+        data["audit"] = audit
+        return data
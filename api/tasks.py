@@ -0,0 +1,28 @@
+from celery import shared_task
+from celery.utils.log import logger
+
+from core.models import BulkAction, ExportJob
+
+
+@shared_task
+def bulk_action_task(bulk_action_pk: int):
+    """Apply a BulkAction to every message matching its search."""
+    # api.bulk_actions imports the views, which import this module
+    from api.bulk_actions import BulkActionRunner
+
+    bulk_action = BulkAction.objects.select_related("user").get(pk=bulk_action_pk)
+    BulkActionRunner(bulk_action).run()
+    logger.info(
+        f"BulkAction[{bulk_action.pk}] updated {bulk_action.processed} messages"
+    )
+
+
+@shared_task
+def export_job_task(export_job_pk: int):
+    """Write every message matching an ExportJob's search to its artifact."""
+    # api.export_jobs imports the views, which import this module
+    from api.export_jobs import ExportJobRunner
+
+    export_job = ExportJob.objects.get(pk=export_job_pk)
+    ExportJobRunner(export_job).run()
+    logger.info(f"ExportJob[{export_job.pk}] exported {export_job.processed} messages")
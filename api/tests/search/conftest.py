@@ -1,5 +1,6 @@
 import pytest
 
+from django.core.cache import cache
 from django.urls import reverse
 from django_elasticsearch_dsl.registries import registry
 
@@ -16,12 +17,21 @@ def elasticsearch(request):
             index.delete(ignore=404)
 
     delete_indices()
+    # Cached facets and results of a previous test's index
+    cache.clear()
     for index in registry.get_indices():
         index.create()
     # always clean up indicies at end of scoped context
     request.addfinalizer(delete_indices)
 
 
+@pytest.fixture
+def search_cache(settings):
+    """Cache search results and facets, as deployed with a shared cache."""
+    settings.SEARCH_CACHE_TIMEOUT = 300
+    settings.FACET_CACHE_TIMEOUT = 300
+
+
 @pytest.fixture
 def url():
     return reverse("search_messages")
@@ -0,0 +1,23 @@
+import os
+import pytest
+
+from api.bulk_actions import search_message_ids
+
+pytestmark = [
+    pytest.mark.skipif(
+        os.getenv("TEST_ELASTICSEARCH", "false") == "false",
+        reason="TEST_ELASTICSEARCH is not set to 'true'",
+    ),
+    pytest.mark.django_db,
+]
+
+
+def test_search_message_ids__filters(sally1, sally2, eric1):
+    ids = search_message_ids({"account": [str(sally1.account.pk)]})
+    assert sorted(ids) == sorted([sally1.pk, sally2.pk])
+
+
+def test_search_message_ids__search(sally4_known_bodies):
+    m1, m2 = sally4_known_bodies
+    ids = search_message_ids({"search_simple_query_string": ["FileZilla"]})
+    assert ids == [m1.pk]
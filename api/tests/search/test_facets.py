@@ -0,0 +1,57 @@
+import os
+import pytest
+
+from django.core.cache import cache
+from django.http import QueryDict
+from django.urls import reverse
+
+from api.search_cache import search_cache_key
+
+pytestmark = [
+    pytest.mark.skipif(
+        os.getenv("TEST_ELASTICSEARCH", "false") == "false",
+        reason="TEST_ELASTICSEARCH is not set to 'true'",
+    ),
+    pytest.mark.django_db,
+    pytest.mark.usefixtures("search_cache"),
+]
+
+
+@pytest.fixture
+def facets_url():
+    return reverse("message_facets")
+
+
+def test_facets_only_on_first_page(url, api_client, sally1, sally2):
+    response = api_client.get(url, data={"limit": 1})
+    assert response.data["facets"]["_filter_processed"]["doc_count"] == 2
+    assert "facets" not in api_client.get(url, data={"limit": 1, "offset": 1}).data
+
+
+def test_facets_are_cached(url, api_client, sally1):
+    first = api_client.get(url).data["facets"]
+    key = search_cache_key("facets", QueryDict())
+    assert cache.get(key) == first
+    cache.set(key, {"cached": True})
+    second = api_client.get(url, data={"limit": 2}).data
+    assert second["facets"] == {"cached": True}
+    assert list(second) == ["count", "next", "previous", "facets", "results"]
+
+
+def test_index_change_invalidates_facets(url, api_client, sally1, sally2):
+    api_client.get(url)
+    sally1.directory = "/TestUser/Sent"
+    sally1.save()
+    facets = api_client.get(url).data["facets"]
+    buckets = facets["_filter_directory"]["directory"]["buckets"]
+    assert {bucket["key"] for bucket in buckets} == {
+        "/TestUser/Inbox",
+        "/TestUser/Sent",
+    }
+
+
+def test_facets_endpoint(url, facets_url, api_client, sally1, eric1):
+    data = {"account": sally1.account.pk}
+    facets = api_client.get(facets_url, data=data).data["facets"]
+    assert facets == api_client.get(url, data=data).data["facets"]
+    assert facets["_filter_processed"]["doc_count"] == 1
@@ -0,0 +1,66 @@
+import os
+import pytest
+
+from core.tests import factories
+
+pytestmark = [
+    pytest.mark.skipif(
+        os.getenv("TEST_ELASTICSEARCH", "false") == "false",
+        reason="TEST_ELASTICSEARCH is not set to 'true'",
+    ),
+    pytest.mark.django_db,
+]
+
+
+@pytest.fixture
+def sally_messages(file_sally):
+    return [
+        factories.MessageFactory(account=file_sally.account, file=file_sally)
+        for _ in range(7)
+    ]
+
+
+def result_ids(response):
+    return [result["id"] for result in response.data["results"]]
+
+
+def test_cursor_pages_follow_offset_order(url, api_client, sally_messages):
+    expected = result_ids(api_client.get(url, data={"limit": 7}))
+    ids = []
+    response = api_client.get(url, data={"limit": 3, "cursor": ""})
+    assert response.data["previous"] is None
+    assert response.data["count"] == 7
+    while True:
+        ids.extend(result_ids(response))
+        if not response.data["next"]:
+            break
+        response = api_client.get(response.data["next"])
+    assert ids == expected
+
+
+def test_cursor_previous_page(url, api_client, sally_messages):
+    first = api_client.get(url, data={"limit": 3, "cursor": ""})
+    second = api_client.get(first.data["next"])
+    assert result_ids(api_client.get(second.data["previous"])) == result_ids(first)
+    third = api_client.get(second.data["next"])
+    assert result_ids(api_client.get(third.data["previous"])) == result_ids(second)
+
+
+def test_cursor_keeps_filters(url, api_client, sally_messages, eric1):
+    response = api_client.get(
+        url, data={"limit": 3, "cursor": "", "account": eric1.account.pk}
+    )
+    assert result_ids(response) == [eric1.pk]
+    assert response.data["next"] is None
+
+
+def test_invalid_cursor(url, api_client, sally_messages):
+    response = api_client.get(url, data={"cursor": "e30="})
+    assert response.status_code == 404
+
+
+def test_cursor_from_other_ordering(url, api_client, sally_messages):
+    """A cursor is invalid once the ordering it was read with changes."""
+    first = api_client.get(url, data={"limit": 3, "cursor": ""})
+    response = api_client.get(f"{first.data['next']}&ordering=-sent_date")
+    assert response.status_code == 404
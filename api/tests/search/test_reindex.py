@@ -0,0 +1,118 @@
+import os
+import pytest
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.documents.message import MessageDocument
+from api.documents.reindex import MessageReindexer, id_ranges
+
+pytestmark = [
+    pytest.mark.skipif(
+        os.getenv("TEST_ELASTICSEARCH", "false") == "false",
+        reason="TEST_ELASTICSEARCH is not set to 'true'",
+    ),
+    pytest.mark.django_db,
+]
+
+
+@pytest.fixture
+def connection():
+    connection = MessageDocument._get_connection()
+    alias = MessageDocument._index._name
+    yield connection
+    connection.indices.delete(index=f"{alias}-*", ignore=404)
+
+
+def aliased_index(connection):
+    return list(connection.indices.get_alias(name=MessageDocument._index._name))
+
+
+def indexed_ids(connection, index):
+    connection.indices.refresh(index=index)
+    hits = connection.search(index=index, body={"size": 100})["hits"]["hits"]
+    return sorted(int(hit["_id"]) for hit in hits)
+
+
+def test_id_ranges():
+    assert list(id_ranges(0, 25, 10)) == [(0, 10), (10, 20), (20, 25)]
+    assert list(id_ranges(25, 25, 10)) == []
+
+
+def test_reindex__swaps_alias(connection, sally1, sally2, sally3):
+    """The original concrete index is replaced by an alias to the new index."""
+    index_name = MessageReindexer(batch_size=2).run()
+    assert aliased_index(connection) == [index_name]
+    assert indexed_ids(connection, MessageDocument._index._name) == sorted(
+        [sally1.pk, sally2.pk, sally3.pk]
+    )
+
+
+def test_reindex__keeps_previous_index(connection, sally1):
+    first = MessageReindexer().run()
+    later = timezone.now() + timedelta(days=1)
+    with mock.patch("api.documents.reindex.timezone.now", return_value=later):
+        second = MessageReindexer().run()
+    assert first != second
+    assert aliased_index(connection) == [second]
+    assert connection.indices.exists(index=first)
+
+
+def test_reindex__resume(connection, sally1, sally2, sally3):
+    """A resumed reindex only loads messages after the checkpoint."""
+    reindexer = MessageReindexer(batch_size=1)
+    reindexer.create_index()
+    reindexer.load(0, sally1.pk)
+    resumed = MessageReindexer(batch_size=1)
+    with mock.patch("api.documents.reindex.prepare_messages") as prepare:
+        prepare.side_effect = lambda start_after, last_id: (last_id, [])
+        resumed.run(resume=True)
+    assert resumed.index_name == reindexer.index_name
+    assert prepare.call_args_list[0] == mock.call(sally1.pk, sally1.pk + 1)
+
+
+def test_reindex__catches_up_audit_changes(connection, sally1, event):
+    """Messages audited while the reindex runs are indexed again."""
+    reindexer = MessageReindexer()
+    reindexer.create_index()
+    reindexer.load(0, reindexer.max_id())
+    sally1.audit.is_record = False
+    sally1.audit.save()
+    reindexer.catch_up(reindexer.started)
+    connection.indices.refresh(index=reindexer.index_name)
+    source = connection.get(index=reindexer.index_name, id=sally1.pk)["_source"]
+    assert source["audit"]["is_record"] is False
+
+
+def test_reindex__catches_up_deleted_messages(connection, sally1, sally2):
+    """Messages deleted while the reindex runs are deleted from the new index."""
+    reindexer = MessageReindexer()
+    reindexer.create_index()
+    reindexer.load(0, reindexer.max_id())
+    sally2.delete()
+    reindexer.catch_up(reindexer.started)
+    assert indexed_ids(connection, reindexer.index_name) == [sally1.pk]
+
+
+def test_reindex__catches_up_since_first_catch_up(connection, sally1):
+    """The catch up after the swap covers changes made during the first one."""
+    reindexer = MessageReindexer()
+    events = []
+    now = timezone.now()
+    with mock.patch(
+        "api.documents.reindex.timezone.now",
+        side_effect=lambda: events.append("now") or now,
+    ), mock.patch.object(
+        reindexer, "catch_up", side_effect=lambda since: events.append("catch_up")
+    ) as catch_up:
+        reindexer.run()
+    # create_index()'s start time, then the cutoff
+    assert events == ["now", "now", "catch_up", "catch_up"]
+    assert catch_up.call_args_list == [mock.call(now), mock.call(now)]
+
+
+def test_reindex_messages_command(connection, sally1):
+    call_command("reindex_messages", workers=1)
+    assert aliased_index(connection)[0].startswith(MessageDocument._index._name + "-")
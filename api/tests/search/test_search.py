@@ -3,6 +3,7 @@ import pytest
 import gzip
 import json
 
+from api.documents.message import MessageDocument
 from core.tests import factories
 
 pytestmark = [
@@ -78,7 +79,7 @@ def test_export_match_one_file(export_url, api_client, sally1, eric1, org, event
     response = api_client.get(
         export_url, data={"labels_importer__terms": f"{org.name}"}
     )
-    resp_data = json.loads(gzip.decompress(response.data))
+    resp_data = json.loads(gzip.decompress(b"".join(response.streaming_content)))
     assert len(resp_data) == 1
     assert eric1.file.filename in resp_data[0].values()
     assert eric1.file.sha256 in resp_data[0].values()
@@ -97,7 +98,7 @@ def test_export_match_two_file(
     response = api_client.get(
         export_url, data={"labels_importer__terms": f"{org.name}__{event.name}"}
     )
-    resp_data = json.loads(gzip.decompress(response.data))
+    resp_data = json.loads(gzip.decompress(b"".join(response.streaming_content)))
     assert len(resp_data) == 2
     decomposed = list(resp_data[0].values()) + list(resp_data[1].values())
     source_ids = decomposed[2] + decomposed[5]
@@ -110,6 +111,21 @@ def test_export_match_two_file(
     assert sally2.source_id in source_ids
 
 
+def test_export_groups_ids_by_file(export_url, api_client, file_sally, file_eric):
+    messages = [
+        factories.MessageFactory(account=file.account, file=file)
+        for file in (file_sally, file_eric, file_sally, file_eric)
+    ]
+    response = api_client.get(export_url)
+    assert response.streaming
+    resp_data = json.loads(gzip.decompress(b"".join(response.streaming_content)))
+    assert [(group["filename"], len(group["id_list"])) for group in resp_data] == [
+        (file_sally.filename, 2),
+        (file_eric.filename, 2),
+    ]
+    assert resp_data[0]["id_list"] == [m.source_id for m in messages[::2]]
+
+
 def test_msg_to_indexes_lowercase_without_analyzer(url, api_client, file_sally):
     message = factories.MessageFactory(account=file_sally.account, file=file_sally)
     message.msg_to = "ABC <ABC@123.com>"
@@ -124,3 +140,58 @@ def test_long_msg_to_does_not_break(url, api_client, file_sally):
     message.save()
     response = api_client.get(url, data={"email__contains": f"abc"})
     assert response.data["count"] == 1
+
+
+def test_source_id_sorts_on_keyword_without_fielddata(url, api_client, file_sally):
+    for source_id in ("30", "100", "20"):
+        factories.MessageFactory(
+            account=file_sally.account, file=file_sally, source_id=source_id
+        )
+    mapping = MessageDocument._index.get_mapping()
+    properties = next(iter(mapping.values()))["mappings"]["properties"]
+    assert "fielddata" not in properties["source_id"]
+    assert properties["source_id"]["fields"]["raw"]["type"] == "keyword"
+    response = api_client.get(url, data={"ordering": "-source_id"})
+    assert [r["source_id"] for r in response.data["results"]] == ["30", "20", "100"]
+
+
+@pytest.mark.parametrize(
+    "value", ["bob", "b.com", "example.org", "bob.jones@example.org", "Jones", "bo"]
+)
+def test_email_matches_parsed_addresses(url, api_client, file_sally, value):
+    message = factories.MessageFactory(account=file_sally.account, file=file_sally)
+    message.msg_from = '"Bob Jones" <Bob.Jones@Example.org>'
+    message.msg_to = "Sally <sally@b.com>"
+    message.save()
+    factories.MessageFactory(
+        account=file_sally.account, file=file_sally, msg_from="eric@c.net", msg_to=""
+    )
+    response = api_client.get(url, data={"email__contains": value})
+    assert [result["id"] for result in response.data["results"]] == [message.pk]
+
+
+def test_email_matches_any_value(url, api_client, file_sally):
+    for address in ("eric@c.net", "sally@b.com", "bob@a.org"):
+        factories.MessageFactory(
+            account=file_sally.account, file=file_sally, msg_from=address, msg_to=""
+        )
+    response = api_client.get(url, data={"email__contains": "eric,sally"})
+    assert response.data["count"] == 2
+
+
+def test_preview_returns_stored_preview(url, api_client, sally1):
+    response = api_client.get(url, data={"preview": "true"})
+    result = response.data["results"][0]
+    assert "body" not in result
+    assert result["preview"] == MessageDocument().prepare(sally1)["preview"]
+    assert result["subject"] == sally1.subject
+
+
+def test_preview_returns_highlighted_fragment(url, api_client, sally4_known_bodies):
+    message, _ = sally4_known_bodies
+    response = api_client.get(
+        url, data={"preview": "true", "search_simple_query_string": "FileZilla"}
+    )
+    result = response.data["results"][0]
+    assert result["id"] == message.pk
+    assert "<strong>FileZilla</strong>" in result["preview"]
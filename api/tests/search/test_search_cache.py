@@ -0,0 +1,49 @@
+import os
+import pytest
+
+from django.urls import reverse
+
+from api.search_cache import search_cache_stats
+
+pytestmark = [
+    pytest.mark.skipif(
+        os.getenv("TEST_ELASTICSEARCH", "false") == "false",
+        reason="TEST_ELASTICSEARCH is not set to 'true'",
+    ),
+    pytest.mark.django_db,
+    pytest.mark.usefixtures("search_cache"),
+]
+
+
+def test_repeated_search_is_cached(url, api_client, sally1, sally2):
+    data = {"account": sally1.account.pk}
+    first = api_client.get(url, data=data).data
+    assert api_client.get(url, data=data).data == first
+    assert search_cache_stats()["search"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_account_change_invalidates_search(url, api_client, sally1, eric1):
+    data = {"account": sally1.account.pk, "directory": "/TestUser/Sent"}
+    assert api_client.get(url, data=data).data["count"] == 0
+    sally1.directory = "/TestUser/Sent"
+    sally1.save()
+    assert api_client.get(url, data=data).data["count"] == 1
+
+
+def test_other_account_change_keeps_search(url, api_client, sally1, eric1):
+    data = {"account": sally1.account.pk}
+    api_client.get(url, data=data)
+    eric1.directory = "/TestUser/Sent"
+    eric1.save()
+    api_client.get(url, data=data)
+    assert search_cache_stats()["search"]["hits"] == 1
+
+
+def test_cache_off__no_lookups(url, api_client, settings, sally1):
+    settings.SEARCH_CACHE_TIMEOUT = 0
+    settings.FACET_CACHE_TIMEOUT = 0
+    assert api_client.get(url).data["facets"]
+    assert api_client.get(reverse("message_facets")).data["facets"]
+    stats = search_cache_stats()
+    assert stats["search"]["hit_rate"] is None
+    assert stats["facets"]["hit_rate"] is None
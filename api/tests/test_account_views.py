@@ -128,3 +128,21 @@ def test_contradictory_audit_data_fails(api_client, ratom_message):
         in str(response.content)
     )
     assert response.status_code == 400
+
+
+def test_index_status(api_client, ratom_message):
+    ratom_message.audit.save()
+    response = api_client.get(reverse("index_status"))
+    assert response.status_code == 200
+    assert response.data["pending"] == 1
+
+
+def test_message_detail_put__wait_for_index(api_client, ratom_message):
+    url = reverse("message_detail", kwargs={"pk": ratom_message.pk})
+    with mock.patch("api.views.message.wait_for_index", return_value=True) as wait:
+        response = api_client.put(
+            f"{url}?wait_for_index=true", data={"is_record": True}
+        )
+    assert response.status_code == 201
+    assert response["X-Search-Indexed"] == "true"
+    wait.assert_called_once_with([ratom_message.pk])
@@ -15,8 +15,14 @@ http_method_names = set(View.http_method_names) - {"options"}
         ("user_detail", None),
         ("account_list", None),
         ("search_messages", None),
+        ("message_facets", None),
         ("account_detail", 1),
         ("message_detail", 1),
+        ("index_status", None),
+        ("search_cache_status", None),
+        ("bulk_action_detail", 1),
+        ("export_job_detail", 1),
+        ("export_job_download", 1),
     ],
 )
 def test_anonymous_unauthorized(api_client_anon, url, pk):
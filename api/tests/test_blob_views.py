@@ -0,0 +1,67 @@
+import datetime as dt
+
+import pytest
+
+from django.urls import reverse
+
+from core.models import Blob
+from core.tests.factories import FileFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def blobs():
+    now = dt.datetime.now(dt.timezone.utc)
+    yield [
+        Blob.objects.create(container="psts", name=name, size=100, last_seen=now)
+        for name in ("albert.pst", "kate.pst", "kay.pst")
+    ]
+
+
+def test_blob_list(api_client, blobs):
+    response = api_client.get(reverse("blob_list"), {"limit": 2})
+    assert response.status_code == 200
+    assert response.data["count"] == 3
+    assert [blob["name"] for blob in response.data["results"]] == [
+        "albert.pst",
+        "kate.pst",
+    ]
+
+
+def test_blob_list__search(api_client, blobs):
+    response = api_client.get(reverse("blob_list"), {"search": "KA"})
+    assert [blob["name"] for blob in response.data["results"]] == [
+        "kate.pst",
+        "kay.pst",
+    ]
+
+
+def test_blob_list__imported(api_client, blobs, account):
+    url = "https://ratom.blob.core.windows.net"
+    FileFactory(
+        account=account, filename="kate.pst", original_path=f"{url}/psts/kate.pst"
+    )
+    # The same name in another container
+    FileFactory(account=account, filename="kay.pst", original_path=f"{url}/old/kay.pst")
+    response = api_client.get(reverse("blob_list"), {"imported": "false"})
+    assert [blob["name"] for blob in response.data["results"]] == [
+        "albert.pst",
+        "kay.pst",
+    ]
+    response = api_client.get(reverse("blob_list"), {"imported": "true"})
+    assert response.data["results"][0]["imported"]
+
+
+def test_blob_list__container(api_client, blobs):
+    now = dt.datetime.now(dt.timezone.utc)
+    Blob.objects.create(container="old", name="kate.pst", last_seen=now)
+    response = api_client.get(reverse("blob_list"), {"container": "old"})
+    assert [(blob["container"], blob["name"]) for blob in response.data["results"]] == [
+        ("old", "kate.pst")
+    ]
+
+
+def test_blob_list__anonymous(api_client_anon):
+    response = api_client_anon.get(reverse("blob_list"))
+    assert response.status_code == 401
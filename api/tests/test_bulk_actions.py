@@ -0,0 +1,104 @@
+import pytest
+from unittest import mock
+
+from django.urls import reverse
+
+from api.bulk_actions import BulkActionRunner
+from core import models as ratom
+from core.tests import factories
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def bulk_action(user):
+    return ratom.BulkAction.objects.create(
+        user=user, action="record_status", effect="non-record", query={"account": ["1"]}
+    )
+
+
+@pytest.fixture
+def search_message_ids():
+    with mock.patch("api.bulk_actions.search_message_ids") as search_message_ids:
+        yield search_message_ids
+
+
+def test_post__queues_bulk_action(api_client, user, run_on_commit):
+    url = reverse("bulk_actions")
+    with mock.patch("api.views.bulk_action.bulk_action_task") as task:
+        response = api_client.post(
+            f"{url}?account=1&labels_importer=ORG&labels_importer=DATE&limit=10",
+            data={"action": "record_status", "effect": "non-record"},
+        )
+        run_on_commit()
+    assert response.status_code == 202
+    bulk_action = ratom.BulkAction.objects.get()
+    assert bulk_action.user == user
+    assert bulk_action.query == {"account": ["1"], "labels_importer": ["ORG", "DATE"]}
+    task.delay.assert_called_once_with(bulk_action.pk)
+
+
+def test_post__requires_query(api_client):
+    response = api_client.post(
+        reverse("bulk_actions"), data={"action": "record_status", "effect": "redacted"}
+    )
+    assert response.status_code == 400
+    assert not ratom.BulkAction.objects.exists()
+
+
+def test_post__bad_effect(api_client):
+    response = api_client.post(
+        f"{reverse('bulk_actions')}?account=1",
+        data={"action": "record_status", "effect": "shredded"},
+    )
+    assert response.status_code == 400
+
+
+def test_detail(api_client, bulk_action):
+    url = reverse("bulk_action_detail", kwargs={"pk": bulk_action.pk})
+    response = api_client.get(url)
+    assert response.data["status"] == ratom.BulkAction.CREATED
+
+
+def test_detail__other_users(api_client, bulk_action):
+    bulk_action.user = factories.UserFactory()
+    bulk_action.save()
+    url = reverse("bulk_action_detail", kwargs={"pk": bulk_action.pk})
+    assert api_client.get(url).status_code == 404
+
+
+def test_runner__updates_audits_in_chunks(
+    bulk_action,
+    ratom_message,
+    ratom_message_2,
+    search_message_ids,
+    mock_outbox_registry,
+    settings,
+):
+    settings.SEARCH_INDEX_OUTBOX = True
+    document = mock.MagicMock()
+    mock_outbox_registry.get_documents.return_value = [document]
+    search_message_ids.return_value = [ratom_message.pk, ratom_message_2.pk]
+    BulkActionRunner(bulk_action, chunk_size=1).run()
+    bulk_action.refresh_from_db()
+    assert bulk_action.status == ratom.BulkAction.COMPLETE
+    assert (bulk_action.total, bulk_action.processed) == (2, 2)
+    for message in (ratom_message, ratom_message_2):
+        message.audit.refresh_from_db()
+        assert message.audit.is_record is False
+        assert message.audit.processed is True
+        assert message.audit.updated_by == bulk_action.user
+        change = message.audit.history.latest()
+        assert change.history_type == "~"
+        assert change.history_user == bulk_action.user
+    assert document.return_value.update_audits.call_count == 2
+    assert not ratom.IndexOutbox.objects.exists()
+
+
+def test_runner__failure(bulk_action, search_message_ids):
+    search_message_ids.side_effect = ConnectionError("Elasticsearch is down")
+    with pytest.raises(ConnectionError):
+        BulkActionRunner(bulk_action).run()
+    bulk_action.refresh_from_db()
+    assert bulk_action.status == ratom.BulkAction.FAILED
+    assert bulk_action.error == "Elasticsearch is down"
@@ -0,0 +1,125 @@
+import pytest
+from unittest import mock
+
+from api.documents.message import MessageDocument, parse_addresses
+from core import models as ratom
+from core.tests import factories
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def labeled_messages(ratom_file, user_label):
+    messages = []
+    for _ in range(5):
+        message = factories.MessageFactory(account=ratom_file.account, file=ratom_file)
+        message.audit.labels.add(user_label)
+        messages.append(message)
+    return messages
+
+
+def test_prepare_batch__fixed_queries(labeled_messages, django_assert_num_queries):
+    """Audits, accounts, files and labels are each fetched with one query."""
+    messages = list(ratom.Message.objects.all())
+    with django_assert_num_queries(4):
+        sources = MessageDocument().prepare_batch(messages)
+    assert len(sources) == 5
+    assert sources[0]["audit"]["labels"] == [
+        {"type": ratom.Label.USER, "name": labeled_messages[0].audit.labels.get().name}
+    ]
+    assert sources[0]["file"]["filename"] == labeled_messages[0].file.filename
+
+
+def test_get_actions__prepares_in_chunks(labeled_messages, django_assert_num_queries):
+    messages = list(ratom.Message.objects.all())
+    document = MessageDocument()
+    document.django.queryset_pagination = 2
+    try:
+        with django_assert_num_queries(3 * 4):
+            actions = list(document._get_actions(messages, "index"))
+    finally:
+        document.django.queryset_pagination = 500
+    assert [action["_id"] for action in actions] == [m.pk for m in messages]
+
+
+def test_get_indexing_queryset__fixed_queries(
+    labeled_messages, django_assert_num_queries
+):
+    """One query per page plus one for its labels, and one for the empty last page."""
+    with django_assert_num_queries(3):
+        messages = list(MessageDocument().get_indexing_queryset())
+    assert [m.pk for m in messages] == sorted(m.pk for m in labeled_messages)
+    with django_assert_num_queries(0):
+        MessageDocument().prepare_batch(messages)
+
+
+def test_labels_indexing__uses_prefetched_labels(
+    labeled_messages, django_assert_num_queries
+):
+    audit = ratom.MessageAudit.objects.prefetch_related("labels").get(
+        pk=labeled_messages[0].audit.pk
+    )
+    with django_assert_num_queries(0):
+        assert len(audit.labels_indexing) == 1
+
+
+def test_update_audits__partial_bulk_update(labeled_messages):
+    document = MessageDocument()
+    with mock.patch.object(document, "bulk", return_value=(5, [])) as bulk:
+        document.update_audits(ratom.Message.objects.all())
+    actions = list(bulk.call_args[0][0])
+    assert len(actions) == 5
+    assert actions[0]["_op_type"] == "update"
+    assert list(actions[0]["doc"]) == ["audit"]
+    assert actions[0]["doc"]["audit"]["labels"][0]["type"] == ratom.Label.USER
+
+
+def test_update_audits__indexes_missing_documents(labeled_messages):
+    """Messages that aren't indexed yet are indexed in full."""
+    missing = labeled_messages[0]
+    errors = [{"update": {"_id": str(missing.pk), "status": 404}}]
+    document = MessageDocument()
+    with mock.patch.object(
+        document, "bulk", return_value=(4, errors)
+    ), mock.patch.object(document, "update") as update:
+        document.update_audits(ratom.Message.objects.all())
+    update.assert_called_once_with([missing], refresh=None)
+
+
+def test_update_audits__returns_failed_messages(labeled_messages):
+    """Updates rejected for other reasons than a missing document are returned."""
+    rejected = labeled_messages[0]
+    errors = [{"update": {"_id": str(rejected.pk), "status": 429}}]
+    document = MessageDocument()
+    with mock.patch.object(
+        document, "bulk", return_value=(4, errors)
+    ), mock.patch.object(document, "update") as update:
+        failed = document.update_audits(ratom.Message.objects.all())
+    assert failed == {rejected.pk}
+    update.assert_not_called()
+
+
+def test_parse_addresses():
+    assert parse_addresses('"Doe, Jane" <Jane@Doe.com>; bob@b.com, Sally Smith') == [
+        {"email": "jane@doe.com", "name": "Doe, Jane", "domain": "doe.com"},
+        {"email": "bob@b.com", "name": None, "domain": "b.com"},
+        {"email": None, "name": "Sally Smith", "domain": None},
+    ]
+
+
+def test_parse_addresses__unique():
+    assert len(parse_addresses("ABC <ABC@123.com>; " * 1000)) == 1
+
+
+def test_prepare_addresses(ratom_message):
+    ratom_message.msg_from = "Jane <jane@doe.com>"
+    ratom_message.msg_to = "bob@b.com"
+    addresses = MessageDocument().prepare(ratom_message)["addresses"]
+    assert [address["email"] for address in addresses] == ["jane@doe.com", "bob@b.com"]
+
+
+def test_prepare_preview(ratom_message):
+    ratom_message.body = "<p>Hello\n\n<b>there</b></p>" + " word" * 100
+    preview = MessageDocument().prepare(ratom_message)["preview"]
+    assert preview.startswith("Hello there word word")
+    assert len(preview) <= 200
@@ -0,0 +1,231 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.utils import timezone
+
+from api.export_jobs import ExportJobRunner
+from api.views.export_job import parse_byte_range
+from core import models as ratom
+from core.tests import factories
+
+pytestmark = pytest.mark.django_db
+
+ARTIFACT = bytes(range(256)) * 4
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture
+def export_job(user):
+    return ratom.ExportJob.objects.create(
+        user=user, format=ratom.ExportJob.JSONL, query={"account": ["1"]}
+    )
+
+
+@pytest.fixture
+def complete_export_job(export_job):
+    export_job.artifact.save("rr-export.jsonl.gz", ContentFile(ARTIFACT), save=False)
+    export_job.status = ratom.ExportJob.COMPLETE
+    export_job.size = len(ARTIFACT)
+    export_job.finished = timezone.now()
+    export_job.save()
+    return export_job
+
+
+@pytest.fixture
+def message_search():
+    with mock.patch("api.export_jobs.message_search") as message_search:
+        yield message_search
+
+
+def matching(message_search, *messages):
+    search = message_search.return_value
+    search.count.return_value = len(messages)
+    search.source.return_value.scan.return_value = [
+        SimpleNamespace(meta=SimpleNamespace(id=str(message.pk)))
+        for message in messages
+    ]
+
+
+def artifact_text(export_job):
+    with export_job.artifact.open("rb") as artifact:
+        return gzip.decompress(artifact.read()).decode()
+
+
+def test_post__queues_export_job(api_client, user, run_on_commit):
+    url = reverse("export_jobs")
+    with mock.patch("api.views.export_job.export_job_task") as task:
+        response = api_client.post(
+            f"{url}?account=1&search=budget&limit=10", data={"format": "csv"}
+        )
+        run_on_commit()
+    assert response.status_code == 202
+    export_job = ratom.ExportJob.objects.get()
+    assert export_job.user == user
+    assert export_job.format == ratom.ExportJob.CSV
+    assert export_job.query == {"account": ["1"], "search": ["budget"]}
+    task.delay.assert_called_once_with(export_job.pk)
+
+
+def test_post__defaults_to_manifest(api_client):
+    with mock.patch("api.views.export_job.export_job_task"):
+        response = api_client.post(f"{reverse('export_jobs')}?account=1")
+    assert response.data["format"] == ratom.ExportJob.MANIFEST
+
+
+def test_post__bad_format(api_client):
+    response = api_client.post(
+        f"{reverse('export_jobs')}?account=1", data={"format": "xml"}
+    )
+    assert response.status_code == 400
+    assert not ratom.ExportJob.objects.exists()
+
+
+def test_post__requires_query(api_client):
+    response = api_client.post(reverse("export_jobs"), data={"format": "csv"})
+    assert response.status_code == 400
+
+
+def test_detail__other_users(api_client, export_job):
+    export_job.user = factories.UserFactory()
+    export_job.save()
+    url = reverse("export_job_detail", kwargs={"pk": export_job.pk})
+    assert api_client.get(url).status_code == 404
+
+
+def test_runner__jsonl(export_job, ratom_message, ratom_message_2, message_search):
+    matching(message_search, ratom_message_2, ratom_message)
+    ExportJobRunner(export_job, chunk_size=1).run()
+    export_job.refresh_from_db()
+    assert export_job.status == ratom.ExportJob.COMPLETE
+    assert (export_job.total, export_job.processed) == (2, 2)
+    assert export_job.size == export_job.artifact.size
+    rows = [json.loads(line) for line in artifact_text(export_job).splitlines()]
+    assert [row["id"] for row in rows] == [ratom_message_2.pk, ratom_message.pk]
+    assert rows[1]["body"] == ratom_message.body
+    assert rows[1]["filename"] == ratom_message.file.filename
+    assert datetime.fromisoformat(rows[1]["sent_date"]) == ratom_message.sent_date
+    assert rows[1]["is_record"] is True
+
+
+def test_runner__csv(export_job, ratom_message, ratom_message_2, message_search):
+    export_job.format = ratom.ExportJob.CSV
+    matching(message_search, ratom_message, ratom_message_2)
+    ExportJobRunner(export_job).run()
+    assert export_job.artifact.name.endswith(".csv.gz")
+    rows = list(csv.DictReader(io.StringIO(artifact_text(export_job))))
+    assert [row["id"] for row in rows] == [
+        str(ratom_message.pk),
+        str(ratom_message_2.pk),
+    ]
+    assert rows[0]["subject"] == ratom_message.subject
+
+
+def test_runner__deleted_message(
+    export_job, ratom_message, ratom_message_2, message_search
+):
+    """Messages deleted since they were indexed aren't exported or counted."""
+    matching(message_search, ratom_message, ratom_message_2)
+    ratom_message_2.delete()
+    ExportJobRunner(export_job).run()
+    assert (export_job.total, export_job.processed) == (2, 1)
+    rows = [json.loads(line) for line in artifact_text(export_job).splitlines()]
+    assert [row["id"] for row in rows] == [ratom_message.pk]
+
+
+def test_runner__manifest(export_job, message_search):
+    export_job.format = ratom.ExportJob.MANIFEST
+    message_search.return_value.count.return_value = 2
+    hits = [
+        SimpleNamespace(file={"filename": "a.pst", "sha256": "abc"}, source_id=1),
+        SimpleNamespace(file={"filename": "a.pst", "sha256": "abc"}, source_id=2),
+    ]
+    with mock.patch("api.export_jobs.scan_by_file", return_value=iter(hits)):
+        ExportJobRunner(export_job, chunk_size=1).run()
+    assert export_job.processed == 2
+    assert json.loads(artifact_text(export_job)) == [
+        {"filename": "a.pst", "sha256": "abc", "id_list": [1, 2]}
+    ]
+
+
+def test_runner__failure(export_job, message_search):
+    message_search.side_effect = ConnectionError("Elasticsearch is down")
+    with pytest.raises(ConnectionError):
+        ExportJobRunner(export_job).run()
+    export_job.refresh_from_db()
+    assert export_job.status == ratom.ExportJob.FAILED
+    assert export_job.error == "Elasticsearch is down"
+    assert not export_job.artifact
+
+
+@pytest.mark.parametrize(
+    "header,byte_range",
+    [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 1023)),
+        ("bytes=1000-2000", (1000, 1023)),
+        ("bytes=-24", (1000, 1023)),
+        ("bytes=-5000", (0, 1023)),
+        ("bytes=0-9,20-29", None),
+        ("bytes=9-0", None),
+        ("lines=0-9", None),
+    ],
+)
+def test_parse_byte_range(header, byte_range):
+    assert parse_byte_range(header, 1024) == byte_range
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=-0"])
+def test_parse_byte_range__unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, 1024)
+
+
+def test_download(api_client, complete_export_job):
+    url = reverse("export_job_download", kwargs={"pk": complete_export_job.pk})
+    response = api_client.get(url)
+    assert response.status_code == 200
+    assert response["Accept-Ranges"] == "bytes"
+    assert response["Content-Length"] == str(len(ARTIFACT))
+    assert b"".join(response.streaming_content) == ARTIFACT
+
+
+def test_download__range(api_client, complete_export_job):
+    url = reverse("export_job_download", kwargs={"pk": complete_export_job.pk})
+    etag = api_client.get(url)["ETag"]
+    response = api_client.get(url, HTTP_RANGE="bytes=1000-", HTTP_IF_RANGE=etag)
+    assert response.status_code == 206
+    assert (
+        response["Content-Range"] == f"bytes 1000-{len(ARTIFACT) - 1}/{len(ARTIFACT)}"
+    )
+    assert b"".join(response.streaming_content) == ARTIFACT[1000:]
+
+
+def test_download__changed_if_range(api_client, complete_export_job):
+    url = reverse("export_job_download", kwargs={"pk": complete_export_job.pk})
+    response = api_client.get(url, HTTP_RANGE="bytes=1000-", HTTP_IF_RANGE='"stale"')
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == ARTIFACT
+
+
+def test_download__unsatisfiable_range(api_client, complete_export_job):
+    url = reverse("export_job_download", kwargs={"pk": complete_export_job.pk})
+    response = api_client.get(url, HTTP_RANGE=f"bytes={len(ARTIFACT)}-")
+    assert response.status_code == 416
+    assert response["Content-Range"] == f"bytes */{len(ARTIFACT)}"
+
+
+def test_download__incomplete(api_client, export_job):
+    url = reverse("export_job_download", kwargs={"pk": export_job.pk})
+    assert api_client.get(url).status_code == 404
@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from api.exports import gzip_stream, manifest_chunks, scan_by_file
+
+
+def hit(filename, source_id):
+    return SimpleNamespace(
+        file={"filename": filename, "sha256": f"{filename}-sha"}, source_id=source_id
+    )
+
+
+def test_manifest_chunks():
+    hits = [hit("a.pst", "1"), hit("a.pst", "2"), hit("b.pst", "3")]
+    assert json.loads("".join(manifest_chunks(hits))) == [
+        {"filename": "a.pst", "sha256": "a.pst-sha", "id_list": ["1", "2"]},
+        {"filename": "b.pst", "sha256": "b.pst-sha", "id_list": ["3"]},
+    ]
+
+
+@pytest.fixture
+def field_mapping():
+    with mock.patch("api.exports.get_connection") as get_connection:
+        yield get_connection.return_value.indices.get_field_mapping
+
+
+def test_scan_by_file(field_mapping):
+    field_mapping.return_value = {"message-1": {"mappings": {"file.id": {}}}}
+    search = mock.MagicMock()
+    hits = scan_by_file(search)
+    sorted_search = search.source.return_value.sort.return_value
+    assert hits is sorted_search.params.return_value.scan.return_value
+    sorted_search.params.assert_called_once_with(preserve_order=True)
+
+
+def test_scan_by_file__unmapped_file_id(field_mapping):
+    """Indices created before file.id was mapped are grouped in memory."""
+    field_mapping.return_value = {"message": {"mappings": {}}}
+    search = mock.MagicMock()
+    search.source.return_value.scan.return_value = [
+        hit("a.pst", "1"),
+        hit("b.pst", "2"),
+        hit("a.pst", "3"),
+    ]
+    hits = scan_by_file(search)
+    assert [h.source_id for h in hits] == ["1", "3", "2"]
+    search.source.return_value.sort.assert_not_called()
+
+
+def test_manifest_chunks__empty():
+    assert json.loads("".join(manifest_chunks([]))) == []
+
+
+def test_gzip_stream():
+    chunks = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(10000)]
+    stream = gzip_stream(iter(chunks), chunk_size=1024)
+    header = next(stream)
+    assert header.startswith(b"\x1f\x8b")
+    compressed = [header, *stream]
+    assert len(compressed) > 3
+    assert gzip.decompress(b"".join(compressed)).decode() == "".join(chunks)
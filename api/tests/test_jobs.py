@@ -0,0 +1,17 @@
+from django.http import QueryDict
+
+from api.jobs import job_query
+
+
+def test_job_query__leaves_out_page_params():
+    query_params = QueryDict(
+        "account=1&labels_importer=ORG&labels_importer=DATE&limit=5"
+    )
+    assert job_query(query_params) == {
+        "account": ["1"],
+        "labels_importer": ["ORG", "DATE"],
+    }
+
+
+def test_job_query__empty():
+    assert job_query(QueryDict("limit=10&offset=20")) is None
@@ -0,0 +1,58 @@
+import pytest
+from rest_framework.exceptions import NotFound
+
+from api.pagination import (
+    decode_cursor,
+    encode_cursor,
+    normalize_sort,
+    reverse_sort,
+    sort_key,
+)
+
+
+def test_normalize_sort__defaults_and_tiebreaker():
+    sort = normalize_sort(
+        [{"_score": {"order": "desc"}}, "sent_date", {"source_id": "desc"}]
+    )
+    assert sort == [
+        {"_score": {"order": "desc"}},
+        {"sent_date": {"order": "asc", "missing": "_last"}},
+        {"source_id": {"order": "desc", "missing": "_last"}},
+        {"id": {"order": "asc", "missing": "_last"}},
+    ]
+
+
+def test_normalize_sort__keeps_requested_tiebreaker():
+    sort = normalize_sort([{"id": {"order": "desc"}}])
+    assert sort == [{"id": {"order": "desc", "missing": "_last"}}]
+
+
+def test_normalize_sort__score_by_default():
+    assert normalize_sort(["_score"])[0] == {"_score": {"order": "desc"}}
+
+
+def test_reverse_sort():
+    sort = normalize_sort([{"_score": {"order": "desc"}}, "sent_date"])
+    assert reverse_sort(sort) == [
+        {"_score": {"order": "asc"}},
+        {"sent_date": {"order": "desc", "missing": "_first"}},
+        {"id": {"order": "desc", "missing": "_first"}},
+    ]
+    assert reverse_sort(reverse_sort(sort)) == sort
+
+
+def test_sort_key():
+    sort = normalize_sort([{"_score": {"order": "desc"}}, "sent_date"])
+    assert sort_key(sort) == "-_score,sent_date,id"
+    assert sort_key(reverse_sort(sort)) == "_score,-sent_date,-id"
+
+
+def test_cursor_round_trip():
+    cursor = {"after": [1.5, 1577836800000, "abc", 3], "preference": "p"}
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+
+
+@pytest.mark.parametrize("encoded", ["not-a-cursor!", "e30=", "WzFd"])
+def test_decode_cursor__invalid(encoded):
+    with pytest.raises(NotFound):
+        decode_cursor(encoded)
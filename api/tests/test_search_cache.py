@@ -0,0 +1,84 @@
+import pytest
+from django.core.cache import cache
+from django.http import QueryDict
+
+from api.search_cache import (
+    filtered_account_ids,
+    is_first_page,
+    record_lookup,
+    search_cache_key,
+    search_cache_stats,
+)
+from core.index_version import bump_index_version
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_search_cache_key__ignores_pages_and_order():
+    key = search_cache_key("facets", QueryDict("account=1&email__contains=a,b&facet=x"))
+    other = QueryDict("facet=x&offset=20&limit=5&email__contains=a,b&account=1")
+    assert search_cache_key("facets", other) == key
+    assert search_cache_key("search", other, pages=True) != key
+
+
+def test_search_cache_key__differs_by_filters():
+    key = search_cache_key("facets", QueryDict("account=1"))
+    assert search_cache_key("facets", QueryDict("account=2")) != key
+    assert search_cache_key("facets", QueryDict("account=1&account=2")) != key
+
+
+def test_search_cache_key__differs_by_index_version():
+    key = search_cache_key("facets", QueryDict("email__contains=a"))
+    bump_index_version([1])
+    assert search_cache_key("facets", QueryDict("email__contains=a")) != key
+
+
+def test_search_cache_key__account_versions():
+    key = search_cache_key("search", QueryDict("account=1"))
+    bump_index_version([2])
+    assert search_cache_key("search", QueryDict("account=1")) == key
+    bump_index_version([1])
+    assert search_cache_key("search", QueryDict("account=1")) != key
+
+
+@pytest.mark.parametrize(
+    "query,account_ids",
+    [
+        ("account=2", [2]),
+        ("account__in=3__1&account=2", [1, 2, 3]),
+        ("account=abc", None),
+        ("email__contains=a", None),
+    ],
+)
+def test_filtered_account_ids(query, account_ids):
+    assert filtered_account_ids(QueryDict(query)) == account_ids
+
+
+@pytest.mark.parametrize(
+    "query,first",
+    [
+        ("", True),
+        ("offset=0", True),
+        ("cursor=", True),
+        ("offset=4", False),
+        ("cursor=abc", False),
+    ],
+)
+def test_is_first_page(query, first):
+    assert is_first_page(QueryDict(query)) is first
+
+
+def test_search_cache_stats():
+    record_lookup("search", hit=False)
+    record_lookup("search", hit=True)
+    record_lookup("search", hit=True)
+    record_lookup("search", hit=True)
+    assert search_cache_stats() == {
+        "search": {"hits": 3, "misses": 1, "hit_rate": 0.75},
+        "facets": {"hits": 0, "misses": 0, "hit_rate": None},
+    }
@@ -3,8 +3,14 @@ from django.utils import timezone
 import pytest
 
 import factory
-from api.serializers import AccountSerializer, MessageAuditSerializer
+from api.documents.message import MessageDocument
+from api.serializers import (
+    AccountSerializer,
+    MessageAuditSerializer,
+    MessagePreviewSerializer,
+)
 from core.models import Label, Account
+from core.util.label_cache import label_cache
 
 pytestmark = pytest.mark.django_db
 
@@ -144,6 +150,18 @@ def test_audit_append_user_label__existing(ratom_message_audit, user, user_label
     assert Label.objects.count() == 1  # still only should be one label
 
 
+def test_audit_append_user_label__deleted_label(ratom_message_audit, user, user_label):
+    """A Label deleted since it was last resolved is created again."""
+    label_cache.resolve_one(Label.USER, user_label.name)
+    user_label.delete()
+    serializer = MessageAuditSerializer(
+        instance=ratom_message_audit, data={"append_user_label": user_label.name}
+    )
+    assert serializer.is_valid(), serializer.errors
+    instance = serializer.save(updated_by=user)
+    assert instance.labels.filter(type=Label.USER, name=user_label.name).exists()
+
+
 def test_add_label_does_not_process_record(ratom_message_audit, user, user_label):
     """
     A bug existed that caused records to be marked as "Open Record" on the front end
@@ -190,3 +208,40 @@ def test_bulk_audit_update(ratom_message_audit, ratom_message_audit_2, user):
         assert not audit.is_record
         assert not audit.is_restricted
         assert not audit.needs_redaction
+
+
+def preview_hit(**meta):
+    return MessageDocument.from_es(
+        {
+            "_id": "1",
+            "_score": 1.5,
+            **meta,
+            "_source": {
+                "id": 1,
+                "source_id": "1234",
+                "sent_date": "2020-01-02T15:00:00+00:00",
+                "msg_from": "jane@doe.com",
+                "subject": "Hello",
+                "preview": "Start of the body",
+                "audit": {"processed": True, "labels": []},
+            },
+        }
+    )
+
+
+def test_preview_serializer():
+    data = MessagePreviewSerializer([preview_hit()], many=True).data[0]
+    assert data["preview"] == "Start of the body"
+    assert data["sent_date"] == "2020-01-02T10:00:00-05:00"
+    assert data["msg_to"] is None
+    assert data["score"] == 1.5
+    assert data["processed"] is True
+    assert data["audit"] == {"processed": True, "labels": []}
+    assert "body" not in data
+
+
+def test_preview_serializer__highlighted_fragment():
+    hit = preview_hit(highlight={"body": ["a <strong>match</strong>", "another"]})
+    data = MessagePreviewSerializer(hit).data
+    assert data["preview"] == "a <strong>match</strong>"
+    assert data["highlight"] == {"body": ["a <strong>match</strong>", "another"]}
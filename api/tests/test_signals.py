@@ -1,18 +1,66 @@
 import pytest
+from unittest import mock
+
+from django.db import transaction
+
 from core.tests import factories
 
 
+@pytest.fixture
+def document(mock_core_registry, settings):
+    """The MessageDocument of audit updates sent without the outbox."""
+    settings.SEARCH_INDEX_OUTBOX = False
+    document = mock.MagicMock()
+    mock_core_registry.get_documents.return_value = [document]
+    yield document.return_value
+
+
+def updated_messages(document):
+    return [list(call[0][0]) for call in document.update_audits.call_args_list]
+
+
 @pytest.mark.django_db
-def test_message_audit_update_triggers_message_reindex(
-    ratom_message_audit, mock_core_registry
+def test_message_audit_update_triggers_partial_update(
+    ratom_message_audit, document, run_on_commit
 ):
     ratom_message_audit.processed = False
     ratom_message_audit.save()
-    mock_core_registry.update.assert_called_with(ratom_message_audit.message)
+    document.update_audits.assert_not_called()
+    run_on_commit()
+    assert updated_messages(document) == [[ratom_message_audit.message]]
 
 
 @pytest.mark.django_db
-def test_audit_created_no_signal(mock_core_registry):
+def test_audit_created_no_signal(document, run_on_commit):
     """Verify new audits don't trigger an index update (since message will already do it)."""
     factories.MessageAuditFactory()
-    mock_core_registry.update.assert_not_called()
+    run_on_commit()
+    document.update_audits.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_audit_updates_coalesced(
+    ratom_message_audit, ratom_message_audit_2, document, run_on_commit
+):
+    """Audits saved in one transaction are sent in a single bulk request."""
+    with transaction.atomic():
+        ratom_message_audit.save()
+        ratom_message_audit_2.save()
+    run_on_commit()
+    assert len(updated_messages(document)) == 1
+    assert set(updated_messages(document)[0]) == {
+        ratom_message_audit.message,
+        ratom_message_audit_2.message,
+    }
+
+
+@pytest.mark.django_db
+def test_audit_update_after_rollback(
+    ratom_message_audit, ratom_message_audit_2, document, run_on_commit
+):
+    with pytest.raises(ValueError), transaction.atomic():
+        ratom_message_audit.save()
+        raise ValueError
+    ratom_message_audit_2.save()
+    run_on_commit()
+    assert updated_messages(document) == [[ratom_message_audit_2.message]]
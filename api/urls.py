@@ -8,10 +8,18 @@ from .views import (
     AccountListView,
     message_detail,
     messages_batch,
+    index_status,
+    search_cache_status,
+    bulk_actions,
+    bulk_action_detail,
     MessageDocumentView,
     FileDeleteView,
+    BlobListView,
     reset_sample_data,
     ExportDocumentView,
+    export_jobs,
+    export_job_detail,
+    export_job_download,
 )
 
 # Auth
@@ -30,6 +38,7 @@ urlpatterns += [
 # Files
 urlpatterns += [
     path("files/", FileDeleteView.as_view(), name="remove_file"),
+    path("blobs/", BlobListView.as_view(), name="blob_list"),
 ]
 
 # Messages
@@ -39,15 +48,35 @@ urlpatterns += [
         MessageDocumentView.as_view({"get": "list"}),
         name="search_messages",
     ),
+    path(
+        "messages/facets/",
+        MessageDocumentView.as_view({"get": "facets"}),
+        name="message_facets",
+    ),
     path("messages/<int:pk>/", message_detail, name="message_detail"),
     path("messages/batch/", messages_batch, name="messages_batch"),
+    path("messages/index-status/", index_status, name="index_status"),
+    path("messages/search-cache/", search_cache_status, name="search_cache_status"),
+    path("messages/bulk-actions/", bulk_actions, name="bulk_actions"),
+    path(
+        "messages/bulk-actions/<int:pk>/",
+        bulk_action_detail,
+        name="bulk_action_detail",
+    ),
 ]
 
 # Export
 urlpatterns += [
     path(
         "export/", ExportDocumentView.as_view({"get": "list"}), name="export_messages",
-    )
+    ),
+    path("export/jobs/", export_jobs, name="export_jobs"),
+    path("export/jobs/<int:pk>/", export_job_detail, name="export_job_detail"),
+    path(
+        "export/jobs/<int:pk>/download/",
+        export_job_download,
+        name="export_job_download",
+    ),
 ]
 
 if settings.RATOM_SAMPLE_DATA_ENABLED:
@@ -2,4 +2,7 @@ from .account import *  # noqa
 from .message import *  # noqa
 from .sample_data import *  # noqa
 from .file import *  # noqa
+from .blob import *  # noqa
+from .bulk_action import *  # noqa
 from .export import ExportDocumentView  # noqa
+from .export_job import *  # noqa
@@ -0,0 +1,44 @@
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Concat
+from rest_framework.generics import ListAPIView
+from rest_framework.permissions import IsAuthenticated
+
+from api.serializers import BlobSerializer
+from core.models import Blob, File
+
+__all__ = ("BlobListView",)
+
+
+class BlobListView(ListAPIView):
+    """
+    Page through the cloud storage blob inventory to find files to import.
+
+    A blob is imported if a File was imported from it: remote imports record
+    the blob's URL, which ends with its container and name, as original_path.
+
+    Query parameters:
+        container: only blobs in this container
+        search: only blobs whose name contains this text
+        imported: "true" or "false" to only list blobs that have (not) been imported
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = BlobSerializer
+
+    def get_queryset(self):
+        blob_path = Concat(
+            Value("/"), OuterRef("container"), Value("/"), OuterRef("name")
+        )
+        queryset = Blob.objects.annotate(
+            imported=Exists(File.objects.filter(original_path__endswith=blob_path))
+        )
+        container = self.request.query_params.get("container")
+        if container:
+            queryset = queryset.filter(container=container)
+        search = self.request.query_params.get("search")
+        if search:
+            queryset = queryset.filter(name__icontains=search)
+        imported = self.request.query_params.get("imported")
+        if imported in ("true", "false"):
+            queryset = queryset.filter(imported=imported == "true")
+        return queryset
@@ -0,0 +1,63 @@
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from api.jobs import job_query
+from api.serializers import BulkActionSerializer
+from api.tasks import bulk_action_task
+from api.views.message import ALLOWED_ACTIONS, ALLOWED_EFFECTS_BY_ACTION
+from core.models import BulkAction
+
+__all__ = ("bulk_actions", "bulk_action_detail")
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def bulk_actions(request):
+    """
+    Apply an action to every message matching a search, in the background.
+
+    Takes the search and filter query parameters of search_messages, and the
+    action and effect of messages_batch in the body. Poll bulk_action_detail for
+    its progress.
+    """
+    action = request.data.get("action")
+    if action not in ALLOWED_ACTIONS:
+        return Response(
+            {"error": f"'{action}' is not a permitted action"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    effect = request.data.get("effect")
+    if effect not in ALLOWED_EFFECTS_BY_ACTION[action]:
+        return Response(
+            {"error": f"'{effect}' is not a permitted effect for action '{action}'"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    query = job_query(request.query_params)
+    if query is None:
+        return Response(
+            {"error": "A search or filter is required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    bulk_action = BulkAction.objects.create(
+        user=request.user, action=action, effect=effect, query=query
+    )
+    transaction.on_commit(lambda: bulk_action_task.delay(bulk_action.pk))
+    return Response(
+        BulkActionSerializer(bulk_action).data, status=status.HTTP_202_ACCEPTED
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def bulk_action_detail(request, pk):
+    """
+    Retrieve a BulkAction's status and progress
+    """
+    try:
+        bulk_action = BulkAction.objects.get(pk=pk, user=request.user)
+    except BulkAction.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    return Response(BulkActionSerializer(bulk_action).data)
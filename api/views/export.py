@@ -1,9 +1,8 @@
-import gzip
-import json
+from django.http import StreamingHttpResponse
 from django.utils.timezone import now
-from rest_framework.response import Response
 from rest_framework import renderers
 from rest_framework.permissions import IsAuthenticated
+from api.exports import gzip_stream, manifest_chunks, scan_by_file
 from api.views import MessageDocumentView
 
 
@@ -17,56 +16,35 @@ class FileRenderer(renderers.BaseRenderer):
         return data
 
 
-def compress_response(data):
-    fo = json.dumps(data).encode("utf-8")
-    return gzip.compress(fo)
-
-
 class ExportDocumentView(MessageDocumentView):
     """Returns a zipped json file that has this structure:
     [
         {
             "filename": "filename01.pst",
             "sha256": "55fce039aeeb2921dbb54e1c2c65955bcb2fe81259df74dd9463f38a847f3286"
-            "file_ids": [001,002,003,004],
+            "id_list": ["001", "002", "003", "004"],
         },
         {
             "filename": "filename02.pst",
             "sha256": "836917539e0b02d4ecc722ff82354c6514181b7314b647ccfc7cf4d7ba65265d",
-            "file_ids": [005,006,007,008],
+            "id_list": ["005", "006", "007", "008"],
         }
     ]
     """
 
     permission_classes = [IsAuthenticated]
     pagination_class = None
+    aggregate_facets = False
     renderer_classes = [FileRenderer]
 
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        hits = queryset.source(fields=["source_id", "file"]).scan()
-        export = []
-        current_dict = {}
-        for hit in hits:
-            if not current_dict:
-                current_dict = self._new_dict(hit.file["filename"], hit.file["sha256"])
-                current_dict["id_list"].append(hit.source_id)
-                continue
-            if hit.file["filename"] != current_dict["filename"]:
-                export.append(current_dict.copy())
-                current_dict = self._new_dict(hit.file["filename"], hit.file["sha256"])
-                current_dict["id_list"].append(hit.source_id)
-                continue
-            current_dict["id_list"].append(hit.source_id)
-        export.append(current_dict.copy())
-        dataIO = compress_response(export)
-        returned_file_name = f"rr-{now().strftime('%Y-%m-%dT%H%M%S')}.txt.gz"
-        return Response(
-            data=dataIO,
-            headers={
-                "Content-Disposition": f"attachment; filename={returned_file_name}"
-            },
+        """
+        Stream the gzipped manifest as hits are scrolled, grouped by file
+        """
+        hits = scan_by_file(self.filter_queryset(self.get_queryset()))
+        response = StreamingHttpResponse(
+            gzip_stream(manifest_chunks(hits)), content_type=FileRenderer.media_type
         )
-
-    def _new_dict(self, filename: str, sha256: str):
-        return {"filename": f"{filename}", "sha256": f"{sha256}", "id_list": []}
+        returned_file_name = f"rr-{now().strftime('%Y-%m-%dT%H%M%S')}.txt.gz"
+        response["Content-Disposition"] = f"attachment; filename={returned_file_name}"
+        return response
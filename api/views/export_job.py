@@ -0,0 +1,163 @@
+import os
+import re
+from typing import Optional, Tuple
+
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from api.jobs import job_query
+from api.serializers import ExportJobSerializer
+from api.tasks import export_job_task
+from api.views.export import FileRenderer
+from core.models import ExportJob
+
+__all__ = ("export_jobs", "export_job_detail", "export_job_download")
+
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Bytes read from storage per chunk of a partial download
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """The first and last byte positions a Range header asks for, or None.
+
+    Only single byte ranges are supported. Others, and malformed headers, give
+    None, so the whole artifact is sent. Raises ValueError if the range starts
+    past the end of the artifact.
+    """
+    match = BYTE_RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-500 is the last 500 bytes
+        if not last:
+            return None
+        if int(last) == 0 or size == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError("Range starts past the end")
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def read_range(file, first: int, last: int):
+    """Yield bytes first through last of file, then close it."""
+    try:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            data = file.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def export_jobs(request):
+    """
+    Export every message matching a search, in the background.
+
+    Takes the search and filter query parameters of search_messages, and a
+    format in the body: "json" (the id manifest of export_messages, the
+    default), "jsonl" or "csv". Poll export_job_detail for its progress, then
+    fetch the gzipped artifact from export_job_download.
+    """
+    export_format = request.data.get("format", ExportJob.MANIFEST)
+    if export_format not in dict(ExportJob.FORMATS):
+        return Response(
+            {"error": f"'{export_format}' is not a supported format"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    query = job_query(request.query_params)
+    if query is None:
+        return Response(
+            {"error": "A search or filter is required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    export_job = ExportJob.objects.create(
+        user=request.user, format=export_format, query=query
+    )
+    transaction.on_commit(lambda: export_job_task.delay(export_job.pk))
+    return Response(
+        ExportJobSerializer(export_job).data, status=status.HTTP_202_ACCEPTED
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_job_detail(request, pk):
+    """
+    Retrieve an ExportJob's status and progress
+    """
+    try:
+        export_job = ExportJob.objects.get(pk=pk, user=request.user)
+    except ExportJob.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    return Response(ExportJobSerializer(export_job).data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_job_download(request, pk):
+    """
+    Download a complete ExportJob's gzipped artifact.
+
+    A single byte range can be requested with a Range header, to resume an
+    interrupted download. Send the first response's ETag as If-Range, and the
+    whole artifact is sent instead if it has changed.
+    """
+    try:
+        export_job = ExportJob.objects.get(
+            pk=pk, user=request.user, status=ExportJob.COMPLETE
+        )
+    except ExportJob.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    artifact = export_job.artifact
+    size = artifact.size if export_job.size is None else export_job.size
+    etag = f'"{export_job.pk}-{size}-{int(export_job.finished.timestamp())}"'
+    last_modified = http_date(export_job.finished.timestamp())
+
+    byte_range = None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if "HTTP_RANGE" in request.META and if_range in (None, etag, last_modified):
+        try:
+            byte_range = parse_byte_range(request.META["HTTP_RANGE"], size)
+        except ValueError:
+            response = HttpResponse(
+                status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+            )
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    file = artifact.storage.open(artifact.name, "rb")
+    if byte_range is None:
+        response = FileResponse(file, content_type=FileRenderer.media_type)
+        response["Content-Length"] = size
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(
+            read_range(file, first, last),
+            status=status.HTTP_206_PARTIAL_CONTENT,
+            content_type=FileRenderer.media_type,
+        )
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response["Content-Length"] = last - first + 1
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    file_name = os.path.basename(artifact.name)
+    response["Content-Disposition"] = f"attachment; filename={file_name}"
+    return response
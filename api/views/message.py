@@ -1,22 +1,55 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django_elasticsearch_dsl_drf import filter_backends
-from django_elasticsearch_dsl_drf.pagination import LimitOffsetPagination
 from elasticsearch_dsl import DateHistogramFacet, TermsFacet
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from api.documents.message import MessageDocument
-from api.filter_backends import CustomFilteringFilterBackend
+from api.filter_backends import (
+    CustomFilteringFilterBackend,
+    OptionalFacetedSearchFilterBackend,
+)
+from api.pagination import SearchAfterPagination
+from api.search_cache import (
+    is_first_page,
+    record_lookup,
+    search_cache_key,
+    search_cache_stats,
+)
 from api.serializers import (
     MessageAuditSerializer,
     MessageDocumentSerializer,
+    MessagePreviewSerializer,
     MessageSerializer,
 )
 from api.views.utils import LoggingDocumentViewSet
 from core.models import Message, MessageAudit
+from core.outbox import outbox_lag, wait_for_index
+
+__all__ = (
+    "message_detail",
+    "messages_batch",
+    "index_status",
+    "search_cache_status",
+    "MessageDocumentView",
+)
+
+
+def index_sync_headers(request, message_ids) -> dict:
+    """With ?wait_for_index=true, wait for the search index to reflect a change.
 
-__all__ = ("message_detail", "messages_batch", "MessageDocumentView")
+    Returns: headers reporting whether it did in time
+    """
+    if request.query_params.get("wait_for_index") != "true":
+        return {}
+    indexed = wait_for_index(message_ids)
+    return {"X-Search-Indexed": "true" if indexed else "false"}
 
 
 @api_view(["GET", "PUT"])
@@ -42,9 +75,15 @@ def message_detail(request, pk):
             message.audit, data=request.data, partial=True
         )
         if serialized_audit.is_valid():
-            serialized_audit.save(updated_by=request.user)
+            # The search index update is queued in the same transaction
+            with transaction.atomic():
+                serialized_audit.save(updated_by=request.user)
             serialized_message = MessageSerializer(message)
-            return Response(serialized_message.data, status=status.HTTP_201_CREATED)
+            return Response(
+                serialized_message.data,
+                status=status.HTTP_201_CREATED,
+                headers=index_sync_headers(request, [message.pk]),
+            )
         return Response(serialized_audit.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -62,31 +101,17 @@ ALLOWED_EFFECTS_BY_ACTION = {
 }
 
 
+# Audit fields set by each record status effect
+RECORD_STATUS_EFFECTS = {
+    OPEN_RECORD: {"is_record": True, "is_restricted": False, "needs_redaction": False},
+    NON_RECORD: {"is_record": False, "is_restricted": False, "needs_redaction": False},
+    REDACTED: {"is_record": True, "is_restricted": False, "needs_redaction": True},
+    RESTRICTED: {"is_record": True, "is_restricted": True, "needs_redaction": False},
+}
+
+
 def get_data_from_record_status(audits, effect):
-    if effect == OPEN_RECORD:
-        effect_args = {
-            "is_record": True,
-            "is_restricted": False,
-            "needs_redaction": False,
-        }
-    if effect == NON_RECORD:
-        effect_args = {
-            "is_record": False,
-            "is_restricted": False,
-            "needs_redaction": False,
-        }
-    if effect == REDACTED:
-        effect_args = {
-            "is_record": True,
-            "is_restricted": False,
-            "needs_redaction": True,
-        }
-    if effect == RESTRICTED:
-        effect_args = {
-            "is_record": True,
-            "is_restricted": True,
-            "needs_redaction": False,
-        }
+    effect_args = RECORD_STATUS_EFFECTS[effect]
     return [{"id": a.pk, **effect_args} for a in audits]
 
 
@@ -129,8 +154,14 @@ def messages_batch(request):
                 data=data, instance=audits, many=True, partial=True
             )
             if serialized_audits.is_valid():
-                serialized_audits.save(updated_by=request.user)
-                return Response(serialized_audits.data, status=status.HTTP_201_CREATED)
+                # Index updates of the whole batch are queued and applied together
+                with transaction.atomic():
+                    serialized_audits.save(updated_by=request.user)
+                return Response(
+                    serialized_audits.data,
+                    status=status.HTTP_201_CREATED,
+                    headers=index_sync_headers(request, request.data.get("messages")),
+                )
             return Response(
                 serialized_audits.errors, status=status.HTTP_400_BAD_REQUEST
             )
@@ -138,6 +169,25 @@ def messages_batch(request):
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def index_status(request):
+    """
+    Number of review changes waiting to be applied to the search index, and the
+    age in seconds of the oldest
+    """
+    return Response(outbox_lag())
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def search_cache_status(request):
+    """
+    Hits, misses and hit rate of the search result and facet caches
+    """
+    return Response(search_cache_stats())
+
+
 HIGHLIGHT_LABELS = {
     "pre_tags": ["<strong>"],
     "post_tags": ["</strong>"],
@@ -150,7 +200,7 @@ class MessageDocumentView(LoggingDocumentViewSet):
     """The MessageDocument view."""
 
     permission_classes = (IsAuthenticated,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = SearchAfterPagination
 
     document = MessageDocument
     serializer_class = MessageDocumentSerializer
@@ -160,7 +210,7 @@ class MessageDocumentView(LoggingDocumentViewSet):
         filter_backends.OrderingFilterBackend,
         filter_backends.DefaultOrderingFilterBackend,
         filter_backends.CompoundSearchFilterBackend,
-        filter_backends.FacetedSearchFilterBackend,
+        OptionalFacetedSearchFilterBackend,
         filter_backends.HighlightBackend,
         filter_backends.SimpleQueryStringSearchFilterBackend,
         filter_backends.NestedFilteringFilterBackend,
@@ -204,21 +254,6 @@ class MessageDocumentView(LoggingDocumentViewSet):
             # The number of buckets to show (ie the number of unique directories)
             "options": {"size": 200},
         },
-        "is_record": {
-            "field": "audit.is_record",
-            "facet": TermsFacet,
-            "enabled": True,
-        },
-        "is_restricted": {
-            "field": "audit.is_restricted",
-            "facet": TermsFacet,
-            "enabled": True,
-        },
-        "needs_redaction": {
-            "field": "audit.needs_redaction",
-            "facet": TermsFacet,
-            "enabled": True,
-        },
         "sent_date": {
             "field": "sent_date",
             "facet": DateHistogramFacet,
@@ -254,7 +289,100 @@ class MessageDocumentView(LoggingDocumentViewSet):
     ordering_fields = {
         "_score": "_score",
         "sent_date": "sent_date",
-        "source_id": "source_id",
+        "source_id": "source_id.raw",
     }
     # Specify default ordering
     ordering = ("-_score", "sent_date", "source_id")
+
+    # Whether filter_queryset() aggregates facets, set per request by list()
+    aggregate_facets = True
+
+    # Document fields returned by ?preview=true searches
+    preview_source = (
+        "id",
+        "source_id",
+        "sent_date",
+        "msg_from",
+        "msg_to",
+        "subject",
+        "directory",
+        "preview",
+        "audit",
+    )
+
+    def is_preview(self) -> bool:
+        return self.request.query_params.get("preview") == "true"
+
+    def get_serializer_class(self):
+        if self.is_preview():
+            return MessagePreviewSerializer
+        return super().get_serializer_class()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.is_preview():
+            queryset = queryset.source(self.preview_source)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Search messages. Responses are cached for SEARCH_CACHE_TIMEOUT seconds,
+        until the messages the search can match change.
+        """
+        if not settings.SEARCH_CACHE_TIMEOUT:
+            return self.search_page(request, *args, **kwargs)
+        # Links in the response are absolute
+        key = search_cache_key(
+            "search", request.query_params, pages=True, extra=request.get_host()
+        )
+        data = cache.get(key)
+        record_lookup("search", data is not None)
+        if data is not None:
+            return Response(data)
+        response = self.search_page(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.SEARCH_CACHE_TIMEOUT)
+        return response
+
+    def search_page(self, request, *args, **kwargs):
+        """
+        Facets are only returned with the first page, from the facet cache when
+        the same filters were searched at this index version.
+        """
+        if not is_first_page(request.query_params):
+            self.aggregate_facets = False
+            return super().list(request, *args, **kwargs)
+        if not settings.FACET_CACHE_TIMEOUT:
+            return super().list(request, *args, **kwargs)
+        key = search_cache_key("facets", request.query_params)
+        facets = cache.get(key)
+        record_lookup("facets", facets is not None)
+        self.aggregate_facets = facets is None
+        response = super().list(request, *args, **kwargs)
+        if facets is None:
+            cache.set(key, response.data.get("facets"), settings.FACET_CACHE_TIMEOUT)
+        else:
+            data = [item for item in response.data.items() if item[0] != "results"]
+            response.data = OrderedDict(
+                [*data, ("facets", facets), ("results", response.data["results"])]
+            )
+        return response
+
+    @action(detail=False)
+    def facets(self, request):
+        """
+        Facets of the messages a search matches, without the messages
+        """
+        if not settings.FACET_CACHE_TIMEOUT:
+            return Response({"facets": self.aggregate()})
+        key = search_cache_key("facets", request.query_params)
+        facets = cache.get(key)
+        record_lookup("facets", facets is not None)
+        if facets is None:
+            facets = self.aggregate()
+            cache.set(key, facets, settings.FACET_CACHE_TIMEOUT)
+        return Response({"facets": facets})
+
+    def aggregate(self) -> dict:
+        search = self.filter_queryset(self.get_queryset()).extra(size=0)
+        return search.execute().aggregations.to_dict()
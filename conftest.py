@@ -1,28 +1,76 @@
 import pytest
 from unittest import mock
 
+from django.db import transaction
+
 from core.models import Label
 from core.tests import factories
+from core.util.label_cache import label_cache
 
 
-@pytest.fixture(scope="function", autouse=True)
-def mock_es_registry(request):
-    """Fixture to mock ES registry and use it automatically in every test."""
+def mock_registry(request, target):
+    """Mock the ES registry imported as target, unless the test uses elasticsearch."""
     if "elasticsearch" not in request.fixturenames:
-        with mock.patch("django_elasticsearch_dsl.signals.registry") as mock_registry:
-            yield mock_registry
+        with mock.patch(target) as registry:
+            yield registry
     else:
         yield None
 
 
+@pytest.fixture(scope="function", autouse=True)
+def mock_es_registry(request):
+    """Fixture to mock ES registry and use it automatically in every test."""
+    yield from mock_registry(request, "django_elasticsearch_dsl.signals.registry")
+
+
 @pytest.fixture(scope="function", autouse=True)
 def mock_core_registry(request):
     """Fixture to mock ES registry from core.signals and use it automatically in every test."""
-    if "elasticsearch" not in request.fixturenames:
-        with mock.patch("core.signals.registry") as mock_core_registry:
-            yield mock_core_registry
-    else:
-        yield None
+    yield from mock_registry(request, "core.signals.registry")
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_outbox_registry(request):
+    yield from mock_registry(request, "core.outbox.registry")
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_bulk_action_registry(request):
+    yield from mock_registry(request, "api.bulk_actions.registry")
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_etl_registry(request):
+    yield from mock_registry(request, "etl.message.writer.registry")
+
+
+@pytest.fixture(scope="function", autouse=True)
+def mock_indexer_registry(request):
+    yield from mock_registry(request, "etl.message.indexer.registry")
+
+
+@pytest.fixture
+def run_on_commit():
+    """Function running the on_commit callbacks of the test's transaction.
+
+    The transaction of a django_db test never commits, so they never run otherwise.
+    """
+
+    def run():
+        connection = transaction.get_connection()
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        for _, callback in callbacks:
+            callback()
+
+    return run
+
+
+@pytest.fixture(scope="function", autouse=True)
+def clear_label_cache():
+    """Cached labels don't survive the test database being rolled back."""
+    label_cache.clear()
+    yield
+    label_cache.clear()
 
 
 @pytest.fixture
@@ -0,0 +1,50 @@
+import time
+from typing import Iterable, List
+
+from django.core.cache import cache
+
+from core.models import Account
+
+
+INDEX_VERSION_KEY = "search-index-version"
+
+
+def version_key(account_id: int = None) -> str:
+    if account_id is None:
+        return INDEX_VERSION_KEY
+    return f"{INDEX_VERSION_KEY}:{account_id}"
+
+
+def index_versions(account_ids: Iterable[int] = None) -> List[int]:
+    """Counters bumped whenever the message index changes.
+
+    Without account_ids, the counter of the whole index. Otherwise, the counters
+    of those accounts' messages. Cached search results are keyed with them, so
+    they're invalidated together. Counters start from the current time, so one
+    evicted from the cache is never reset to a version that was already used.
+    """
+    if account_ids is None:
+        keys = [version_key()]
+    else:
+        keys = [version_key(account_id) for account_id in account_ids]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = cache.get_or_set(key, time.time_ns, timeout=None)
+    return [versions[key] for key in keys]
+
+
+def index_version(account_id: int = None) -> int:
+    return index_versions(None if account_id is None else [account_id])[0]
+
+
+def bump_index_version(account_ids: Iterable[int] = None) -> None:
+    """Bump the whole index's counter and account_ids' (by default every account's)."""
+    if account_ids is None:
+        account_ids = Account.objects.values_list("pk", flat=True)
+    for key in [version_key(), *(version_key(pk) for pk in set(account_ids))]:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not set (or evicted) yet
+            cache.get_or_set(key, time.time_ns, timeout=None)
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.17 on 2020-11-20 12:00
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_auto_20201109_1300'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='completed_folders',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, size=None),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.17 on 2020-11-20 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_file_completed_folders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='file',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='SHA256'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.17 on 2020-11-23 10:00
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_auto_20201120_1300'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='file',
+            name='manifest',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.17 on 2020-11-24 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_file_manifest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('container', models.CharField(max_length=200)),
+                ('name', models.CharField(max_length=1024)),
+                ('size', models.BigIntegerField(null=True)),
+                ('etag', models.CharField(blank=True, max_length=100)),
+                ('last_modified', models.DateTimeField(null=True)),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('container', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.17 on 2020-12-04 10:12
+
+from django.conf import settings
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_bulkaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('json', 'JSON id manifest'), ('jsonl', 'JSON Lines'), ('csv', 'CSV')], default='json', max_length=8)),
+                ('query', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('CR', 'Created'), ('RU', 'Running'), ('CM', 'Complete'), ('FA', 'Failed')], default='CR', max_length=2)),
+                ('total', models.IntegerField(null=True)),
+                ('processed', models.IntegerField(default=0)),
+                ('artifact', models.FileField(blank=True, upload_to='exports/')),
+                ('size', models.BigIntegerField(null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+    ]
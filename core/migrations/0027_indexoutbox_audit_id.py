@@ -0,0 +1,29 @@
+# Generated by Django 2.2.17 on 2020-12-07 09:41
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_exportjob'),
+    ]
+
+    operations = [
+        # Queued rows keep their change, now keyed by the message's audit
+        migrations.RunSQL(
+            [
+                "DELETE FROM core_indexoutbox WHERE message_id NOT IN "
+                "(SELECT id FROM core_message)",
+                "UPDATE core_indexoutbox SET message_id = core_message.audit_id "
+                "FROM core_message WHERE core_message.id = core_indexoutbox.message_id",
+            ],
+            "UPDATE core_indexoutbox SET message_id = core_message.id "
+            "FROM core_message WHERE core_message.audit_id = core_indexoutbox.message_id",
+        ),
+        migrations.RenameField(
+            model_name='indexoutbox',
+            old_name='message_id',
+            new_name='audit_id',
+        ),
+    ]
@@ -133,12 +133,18 @@ class File(models.Model):
     reported_total_messages = models.IntegerField(null=True)
     accession_date = models.DateField(null=True, blank=True)
     file_size = models.BigIntegerField(null=True)
-    sha256 = models.CharField("SHA256", max_length=64, default="", blank=True)
+    sha256 = models.CharField(
+        "SHA256", max_length=64, default="", blank=True, db_index=True
+    )
     import_status = models.CharField(
         max_length=2, choices=IMPORT_STATUS, default=CREATED
     )
     date_imported = models.DateTimeField(auto_now_add=True)
     unique_paths = ArrayField(base_field=models.TextField(), default=list)
+    # Archive folders whose messages have all been saved, to resume imports
+    completed_folders = ArrayField(base_field=models.BigIntegerField(), default=list)
+    # Folder paths, message/attachment counts and sizes from the pre-import scan
+    manifest = JSONField(null=True, blank=True)
     errors = JSONField(null=True, blank=True)
 
     # Managers
@@ -161,6 +167,24 @@ class File(models.Model):
         return qs.first().sent_date, qs.last().sent_date
 
 
+class Blob(models.Model):
+    """An archive in cloud storage, as of the last blob inventory refresh."""
+
+    container = models.CharField(max_length=200)
+    name = models.CharField(max_length=1024)
+    size = models.BigIntegerField(null=True)
+    etag = models.CharField(max_length=100, blank=True)
+    last_modified = models.DateTimeField(null=True)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        ordering = ["name"]
+        unique_together = ["container", "name"]
+
+    def __str__(self):
+        return f"{self.container}/{self.name}"
+
+
 class Label(models.Model):
     USER = "U"
     IMPORTER = "I"
@@ -200,7 +224,8 @@ class MessageAudit(models.Model):
         of labels that we will have are Static and Importer
         :return:
         """
-        return list(self.labels.values("type", "name"))
+        # all() rather than values(), so prefetched labels are used
+        return [{"type": label.type, "name": label.name} for label in self.labels.all()]
 
 
 class Message(models.Model):
@@ -264,6 +289,84 @@ class Message(models.Model):
         return f"{self.subject[:40]}..."
 
 
+class Job(models.Model):
+    """A user's job, run by Celery, over every message matching a search."""
+
+    CREATED = "CR"
+    RUNNING = "RU"
+    COMPLETE = "CM"
+    FAILED = "FA"
+    STATUS = [
+        (CREATED, "Created"),
+        (RUNNING, "Running"),
+        (COMPLETE, "Complete"),
+        (FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.PROTECT)
+    # MessageDocumentView search and filter parameters, as lists of values
+    query = JSONField(default=dict)
+    status = models.CharField(max_length=2, choices=STATUS, default=CREATED)
+    total = models.IntegerField(null=True)
+    processed = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+        ordering = ["-created"]
+
+
+class BulkAction(Job):
+    """A review action applied, by a Celery job, to every message matching a search."""
+
+    action = models.CharField(max_length=32)
+    effect = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.action}:{self.effect} by {self.user}"
+
+
+class ExportJob(Job):
+    """An export of every message matching a search, written by a Celery job."""
+
+    MANIFEST = "json"
+    JSONL = "jsonl"
+    CSV = "csv"
+    FORMATS = [
+        (MANIFEST, "JSON id manifest"),
+        (JSONL, "JSON Lines"),
+        (CSV, "CSV"),
+    ]
+
+    format = models.CharField(max_length=8, choices=FORMATS, default=MANIFEST)
+    # Gzipped export, in default_storage
+    artifact = models.FileField(upload_to="exports/", blank=True)
+    size = models.BigIntegerField(null=True)
+
+    def __str__(self):
+        return f"{self.format} export by {self.user}"
+
+
+class IndexOutbox(models.Model):
+    """A MessageAudit change its message's search document needs.
+
+    Written in the same transaction as the MessageAudit change and drained in
+    bulk by core.tasks.drain_index_outbox_task. Keyed by audit, so saving an
+    audit doesn't have to look up its message.
+    """
+
+    audit_id = models.IntegerField(db_index=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"MessageAudit[{self.audit_id}]"
+
+
 def upload_directory_path(instance, filename):
     """
     This is just stubbed out based on django examples. Will need to plan
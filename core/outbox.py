@@ -0,0 +1,83 @@
+import logging
+import time
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from django_elasticsearch_dsl.registries import registry
+
+from core.models import IndexOutbox, Message
+
+
+logger = logging.getLogger(__name__)
+
+
+def drain_outbox(batch_size: int = None) -> int:
+    """Apply queued audit updates to the search index until the outbox is empty.
+
+    Each batch of rows is locked with SKIP LOCKED, so concurrent drains don't
+    apply the same rows. Audits queued more than once are sent once, as they
+    are now, and all of their rows up to the batch are deleted.
+    Rows of updates Elasticsearch rejects are kept, for the next drain to retry.
+
+    Returns: number of outbox rows applied
+    """
+    batch_size = batch_size or settings.INDEX_OUTBOX_BATCH_SIZE
+    drained = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                IndexOutbox.objects.select_for_update(skip_locked=True)
+                .filter(pk__gt=last_pk)
+                .order_by("id")
+                .values_list("id", "audit_id")[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            audit_ids = {audit_id for _, audit_id in rows}
+            messages = list(
+                Message.objects.filter(audit_id__in=audit_ids).select_related("audit")
+            )
+            failed = set()
+            for document in registry.get_documents([Message]):
+                failed.update(document().update_audits(messages))
+            failed = {m.audit_id for m in messages if m.pk in failed}
+            deleted, _ = IndexOutbox.objects.filter(
+                audit_id__in=audit_ids - failed, pk__lte=last_pk
+            ).delete()
+        drained += deleted
+        logger.debug(f"Applied {len(audit_ids)} audit updates ({deleted} queued)")
+        if failed:
+            logger.warning(f"{len(failed)} audit updates failed, kept in the outbox")
+    return drained
+
+
+def outbox_lag() -> dict:
+    """Number of queued updates and the age of the oldest, in seconds."""
+    stats = IndexOutbox.objects.aggregate(pending=Count("id"), oldest=Min("created"))
+    oldest = stats["oldest"]
+    return {
+        "pending": stats["pending"],
+        "oldest": oldest,
+        "lag_seconds": (timezone.now() - oldest).total_seconds() if oldest else 0,
+    }
+
+
+def wait_for_index(message_ids: Iterable[int], timeout: float = None) -> bool:
+    """Wait for the queued updates of message_ids to be applied.
+
+    Returns: whether they were applied within timeout seconds
+    """
+    if timeout is None:
+        timeout = settings.INDEX_OUTBOX_WAIT_TIMEOUT
+    audit_ids = Message.objects.filter(pk__in=list(message_ids)).values("audit_id")
+    deadline = time.monotonic() + timeout
+    while IndexOutbox.objects.filter(audit_id__in=audit_ids).exists():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.1)
+    return True
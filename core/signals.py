@@ -1,8 +1,45 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django_elasticsearch_dsl.apps import DEDConfig
 from django_elasticsearch_dsl.registries import registry
+from django_elasticsearch_dsl.signals import RealTimeSignalProcessor
+
+from core.models import IndexOutbox, Message, MessageAudit
+from core.tasks import drain_index_outbox_task
+
+
+# Audits saved in the current thread's transaction, indexed once it commits
+_pending = threading.local()
+# Whether saves in the current thread are left out of autosync
+_autosync = threading.local()
+
+
+@contextmanager
+def suspend_autosync():
+    """Don't index models saved in this thread, e.g. by an import's BulkIndexer.
+
+    Unlike ELASTICSEARCH_DSL_AUTOSYNC, this doesn't affect other threads.
+    """
+    suspended = getattr(_autosync, "suspended", False)
+    _autosync.suspended = True
+    try:
+        yield
+    finally:
+        _autosync.suspended = suspended
 
-from core.models import MessageAudit
+
+class SignalProcessor(RealTimeSignalProcessor):
+    """RealTimeSignalProcessor that skips saves inside suspend_autosync()."""
+
+    def handle_save(self, sender, instance, **kwargs):
+        if getattr(_autosync, "suspended", False):
+            return
+        super().handle_save(sender, instance, **kwargs)
 
 
 @receiver(post_save)
@@ -13,4 +50,40 @@ def update_document(sender, **kwargs):
     instance = kwargs["instance"]
     created = kwargs["created"]
     if isinstance(instance, MessageAudit) and not created:
-        registry.update(instance.message)
+        queue_audit_update(instance)
+
+
+def queue_audit_update(audit: MessageAudit) -> None:
+    """Partially update the audit of audit.message's document.
+
+    With SEARCH_INDEX_OUTBOX, the update is queued in the outbox table, in the
+    caller's transaction, and applied by drain_index_outbox_task once it commits.
+    Otherwise it's sent right away outside a transaction. Inside one, every audit
+    saved before it commits is sent in a single bulk request.
+    """
+    if not DEDConfig.autosync_enabled():
+        return
+    if settings.SEARCH_INDEX_OUTBOX:
+        IndexOutbox.objects.create(audit_id=audit.pk)
+    connection = transaction.get_connection()
+    audit_ids = getattr(_pending, "audit_ids", None)
+    if (
+        connection.in_atomic_block
+        and audit_ids is not None
+        # Still queued, i.e. its transaction wasn't rolled back
+        and any(func is flush_audit_updates for _, func in connection.run_on_commit)
+    ):
+        audit_ids.add(audit.pk)
+        return
+    _pending.audit_ids = {audit.pk}
+    transaction.on_commit(flush_audit_updates)
+
+
+def flush_audit_updates() -> None:
+    audit_ids, _pending.audit_ids = _pending.audit_ids, None
+    if settings.SEARCH_INDEX_OUTBOX:
+        drain_index_outbox_task.delay()
+        return
+    messages = Message.objects.filter(audit_id__in=audit_ids).select_related("audit")
+    for document in registry.get_documents([Message]):
+        document().update_audits(messages)
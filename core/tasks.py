@@ -0,0 +1,13 @@
+from celery import shared_task
+from celery.utils.log import logger
+
+from core.outbox import drain_outbox, outbox_lag
+
+
+@shared_task
+def drain_index_outbox_task():
+    """Apply queued audit updates to the search index."""
+    drained = drain_outbox()
+    if drained:
+        logger.info(f"Applied {drained} queued index updates, lag: {outbox_lag()}")
+    return drained
@@ -0,0 +1,48 @@
+import pytest
+
+from django.core.cache import cache
+
+from core.index_version import (
+    bump_index_version,
+    index_version,
+    index_versions,
+    version_key,
+)
+from core.tests import factories
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_bump_index_version():
+    version = index_version()
+    bump_index_version([1])
+    assert index_version() == version + 1
+
+
+def test_bump_index_version__evicted():
+    version = index_version()
+    cache.delete(version_key())
+    bump_index_version([1])
+    assert index_version() > version
+
+
+def test_bump_index_version__accounts():
+    versions = index_versions([1, 2])
+    bump_index_version([2, 2])
+    assert index_versions([1, 2]) == [versions[0], versions[1] + 1]
+
+
+def test_bump_index_version__every_account():
+    accounts = [factories.AccountFactory(), factories.AccountFactory()]
+    versions = index_versions([account.pk for account in accounts])
+    bump_index_version()
+    assert index_versions([account.pk for account in accounts]) == [
+        version + 1 for version in versions
+    ]
@@ -0,0 +1,54 @@
+import pytest
+from unittest import mock
+
+from core.models import Label
+from core.tests import factories
+from core.util.label_cache import LabelCache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cache():
+    yield LabelCache()
+
+
+def test_resolve__preloaded(cache, django_assert_num_queries):
+    """Cached labels are resolved without queries."""
+    org = factories.LabelFactory(name="ORG")
+    cache.preload()
+    with django_assert_num_queries(0):
+        assert cache.resolve(Label.IMPORTER, ["ORG", "org"]) == [org, org]
+
+
+def test_resolve__creates_missing(cache):
+    org = factories.LabelFactory(name="ORG")
+    labels = cache.resolve(Label.IMPORTER, ["ORG", "DATE", "GPE"])
+    assert labels[0] == org
+    assert [label.name for label in labels[1:]] == ["DATE", "GPE"]
+    assert all(label.pk for label in labels)
+    assert Label.objects.count() == 3
+
+
+def test_resolve__type_is_part_of_key(cache):
+    importer = factories.LabelFactory(name="ORG", type=Label.IMPORTER)
+    user = cache.resolve_one(Label.USER, "ORG")
+    assert user != importer
+    assert user.type == Label.USER
+
+
+def test_resolve__concurrent_create(cache):
+    """A label created elsewhere after preload() is read back, not duplicated."""
+    cache.preload()
+    org = factories.LabelFactory(name="ORG")
+    assert cache.resolve_one(Label.IMPORTER, "org") == org
+    assert Label.objects.count() == 1
+
+
+def test_resolve__cached_outside_atomic_block(cache, django_assert_num_queries):
+    cache.preload()
+    with mock.patch("core.util.label_cache.transaction") as mock_transaction:
+        mock_transaction.get_connection.return_value.in_atomic_block = False
+        label = cache.resolve_one(Label.IMPORTER, "ORG")
+    with django_assert_num_queries(0):
+        assert cache.resolve_one(Label.IMPORTER, "ORG") == label
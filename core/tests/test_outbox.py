@@ -0,0 +1,108 @@
+import pytest
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import models as ratom
+from core.outbox import drain_outbox, outbox_lag, wait_for_index
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def outbox(settings):
+    settings.SEARCH_INDEX_OUTBOX = True
+
+
+@pytest.fixture
+def document(mock_outbox_registry):
+    document = mock.MagicMock()
+    mock_outbox_registry.get_documents.return_value = [document]
+    yield document.return_value
+
+
+def updated_messages(document):
+    return [set(call[0][0]) for call in document.update_audits.call_args_list]
+
+
+def test_audit_save__queues_update(ratom_message_audit, document):
+    ratom_message_audit.processed = True
+    ratom_message_audit.save()
+    assert ratom.IndexOutbox.objects.get().audit_id == ratom_message_audit.pk
+    document.update_audits.assert_not_called()
+
+
+def test_audit_save__doesnt_load_message(ratom_message_audit, document):
+    audit = ratom.MessageAudit.objects.get(pk=ratom_message_audit.pk)
+    with CaptureQueriesContext(connection) as queries:
+        audit.save()
+    assert not any('"core_message"' in query["sql"] for query in queries)
+
+
+def test_audit_save__rolled_back(ratom_message_audit, document):
+    """The queued update is rolled back with the audit change."""
+    with pytest.raises(ValueError), transaction.atomic():
+        ratom_message_audit.save()
+        raise ValueError
+    assert not ratom.IndexOutbox.objects.exists()
+
+
+def test_commit__drains_outbox(ratom_message_audit, document, run_on_commit):
+    ratom_message_audit.save()
+    run_on_commit()  # drain_index_outbox_task runs eagerly in tests
+    assert updated_messages(document) == [{ratom_message_audit.message}]
+    assert not ratom.IndexOutbox.objects.exists()
+
+
+def test_drain_outbox__dedupes_messages(ratom_message, ratom_message_2, document):
+    for message in (ratom_message, ratom_message_2, ratom_message):
+        ratom.IndexOutbox.objects.create(audit_id=message.audit_id)
+    assert drain_outbox(batch_size=10) == 3
+    assert updated_messages(document) == [{ratom_message, ratom_message_2}]
+
+
+def test_drain_outbox__batches(ratom_message, ratom_message_2, document):
+    for message in (ratom_message, ratom_message_2):
+        ratom.IndexOutbox.objects.create(audit_id=message.audit_id)
+    assert drain_outbox(batch_size=1) == 2
+    assert updated_messages(document) == [{ratom_message}, {ratom_message_2}]
+
+
+def test_drain_outbox__keeps_rows_if_update_fails(ratom_message, document):
+    ratom.IndexOutbox.objects.create(audit_id=ratom_message.audit_id)
+    document.update_audits.side_effect = ConnectionError
+    with pytest.raises(ConnectionError):
+        drain_outbox()
+    assert ratom.IndexOutbox.objects.exists()
+
+
+def test_drain_outbox__keeps_rows_of_failed_updates(
+    ratom_message, ratom_message_2, document
+):
+    """Rows of updates rejected by Elasticsearch (e.g. 429) are kept for a retry."""
+    for message in (ratom_message, ratom_message_2):
+        ratom.IndexOutbox.objects.create(audit_id=message.audit_id)
+    document.update_audits.return_value = {ratom_message.pk}
+    assert drain_outbox(batch_size=1) == 1
+    assert updated_messages(document) == [{ratom_message}, {ratom_message_2}]
+    assert ratom.IndexOutbox.objects.get().audit_id == ratom_message.audit_id
+
+
+def test_outbox_lag(ratom_message):
+    assert outbox_lag() == {"pending": 0, "oldest": None, "lag_seconds": 0}
+    row = ratom.IndexOutbox.objects.create(audit_id=ratom_message.audit_id)
+    ratom.IndexOutbox.objects.filter(pk=row.pk).update(
+        created=timezone.now() - timedelta(seconds=30)
+    )
+    lag = outbox_lag()
+    assert lag["pending"] == 1
+    assert lag["lag_seconds"] >= 30
+
+
+def test_wait_for_index(ratom_message, ratom_message_2):
+    ratom.IndexOutbox.objects.create(audit_id=ratom_message.audit_id)
+    assert wait_for_index([ratom_message_2.pk], timeout=0)
+    assert not wait_for_index([ratom_message.pk], timeout=0)
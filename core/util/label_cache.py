@@ -0,0 +1,83 @@
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import transaction
+
+from core.models import Label
+
+
+logger = logging.getLogger(__name__)
+
+
+class LabelCache:
+    """
+    This helper class resolves (type, name) pairs to core.Label instances from
+    memory. The Label table is small (mostly spaCy's entity types), so it is
+    reloaded at the start of every import run with `preload()` and only labels
+    that are not cached yet hit the database. Nothing invalidates it when a
+    Label is renamed or deleted, so don't use it outside imports (e.g. in
+    long-lived web workers).
+
+    Missing labels are created in bulk with `ON CONFLICT DO NOTHING` and read
+    back, so two imports racing to create the same label both end up with the
+    row that won. Labels created inside an atomic block are returned but not
+    cached, since the block could still be rolled back.
+    """
+
+    def __init__(self):
+        self._labels = {}  # type: Dict[Tuple[str, str], Label]
+        self.loaded = False
+
+    @staticmethod
+    def _key(type: str, name: str) -> Tuple[str, str]:
+        # Label.name is case-insensitive (citext)
+        return type, name.lower()
+
+    def preload(self) -> None:
+        """(Re)load every Label into the cache."""
+        self._labels = {
+            self._key(label.type, label.name): label for label in Label.objects.all()
+        }
+        self.loaded = True
+        logger.debug(f"Loaded {len(self._labels)} labels")
+
+    def clear(self) -> None:
+        self._labels = {}
+        self.loaded = False
+
+    def resolve(self, type: str, names: Iterable[str]) -> List[Label]:
+        """Return a Label of type for each name, creating any that are missing."""
+        if not self.loaded:
+            self.preload()
+        names = list(names)
+        labels = {}
+        missing = {}
+        for name in names:
+            key = self._key(type, name)
+            if key in self._labels:
+                labels[key] = self._labels[key]
+            else:
+                missing[key] = name
+        if missing:
+            labels.update(self._create(type, missing.values()))
+        return [labels[self._key(type, name)] for name in names]
+
+    def resolve_one(self, type: str, name: str) -> Label:
+        return self.resolve(type, [name])[0]
+
+    def _create(self, type: str, names: Iterable[str]) -> Dict[Tuple[str, str], Label]:
+        names = list(names)
+        Label.objects.bulk_create(
+            [Label(type=type, name=name) for name in names], ignore_conflicts=True
+        )
+        # ignore_conflicts leaves primary keys unset, so read the rows back
+        created = {
+            self._key(label.type, label.name): label
+            for label in Label.objects.filter(type=type, name__in=names)
+        }
+        if not transaction.get_connection().in_atomic_block:
+            self._labels.update(created)
+        return created
+
+
+label_cache = LabelCache()
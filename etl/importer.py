@@ -1,20 +1,55 @@
+import heapq
 import logging
-from typing import List
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional, Tuple
+from django import db
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.db.models import F, Func, Value
+from django_elasticsearch_dsl.apps import DEDConfig
+from libratom.lib.pff import PffArchive
 from spacy.language import Language
 from tqdm import tqdm
 import pypff
 
 from core import models as ratom
-from etl.message.forms import ArchiveMessageForm
-from etl.message.nlp import extract_labels, load_nlp_model
+from core.util.label_cache import label_cache
+from etl.manifest import scan_archive
+from etl.message.forms import ArchiveMessageForm, ArchiveMessageSnapshot
+from etl.message.indexer import BulkIndexer
+from etl.message.nlp import extract_labels, extract_labels_batch, load_nlp_model
+from etl.message.writer import MessageWriter
+from etl.pipeline import Stage, StagedPipeline
 from etl.providers.base import ImportProvider, ImportProviderError
 from etl.providers.factory import import_provider_factory, ProviderTypes
+from etl.providers.filesystem import FilesystemProvider
 
 
 logger = logging.getLogger(__name__)
 
 
+class DuplicatePolicy:
+    """What to do with an archive whose SHA-256 matches an imported ratom.File."""
+
+    SKIP = "skip"  # don't import it
+    LINK = "link"  # copy the imported file's messages instead of parsing the archive
+    FORCE = "force"  # import it anyway
+    CHOICES = [SKIP, LINK, FORCE]
+
+
+class ShardImportError(Exception):
+    """One or more worker processes of a parallel import failed."""
+
+
+class DuplicateFile(Exception):
+    def __init__(self, original: ratom.File):
+        super().__init__(f"Archive was already imported as ratom.File[{original.pk}]")
+        self.original = original
+
+
 class PstImporter:
     def __init__(
         self,
@@ -22,23 +57,114 @@ class PstImporter:
         account: ratom.Account,
         spacy_model: Language,
         is_background: bool = False,
+        chunk_size: int = None,
+        workers: int = 1,
+        pipeline: bool = False,
+        resume: bool = False,
+        duplicates: str = DuplicatePolicy.FORCE,
+        bulk_index: bool = None,
+        nlp_processes: int = None,
     ):
         logger.info(f"PstImporter running on {import_provider.path}")
         self.import_provider = import_provider
         self.account = account
         self.spacy_model = spacy_model
         self.is_background = is_background
+        self.workers = workers
+        # spaCy processes, NLP_N_PROCESS by default
+        self.nlp_processes = nlp_processes
+        self.pipeline = pipeline
+        self.resume = resume
+        self.duplicates = duplicates
+        self.skipped = False
         self.ratom_file_errors = []
+        # File errors are recorded from every thread of a StagedPipeline
+        self._errors_lock = threading.Lock()
+        if bulk_index is None:
+            bulk_index = settings.IMPORT_BULK_INDEX and DEDConfig.autosync_enabled()
+        self.indexer = BulkIndexer() if bulk_index else None
+        self.writer = MessageWriter(
+            chunk_size=chunk_size or settings.IMPORT_CHUNK_SIZE,
+            on_error=self.add_message_error,
+            indexer=self.indexer,
+        )
+        self.message_batch = []  # type: List[ratom.Message]
+        self.started = None
+        self.manifest = None  # type: Optional[dict]
+        self.folder_index = {}  # manifest folders by identifier
+        self.messages_read = 0
+        # Checkpoint of a previous import, loaded by load_checkpoint()
+        self.completed_folders = set()
+        self.saved_source_ids = set()
 
     def initializing_stage(self) -> None:
         """Initialization step prior to starting import process."""
         logger.info("--- Initializing Stage ---")
         self.ratom_file = self._create_ratom_file(self.account, self.import_provider)
         logger.info(f"Using ratom.File[{self.ratom_file.pk}]")
+        if self.resume:
+            self.load_checkpoint()
+        else:
+            self.ratom_file.completed_folders = []
+            ratom.File.objects.filter(pk=self.ratom_file.pk).update(
+                completed_folders=[]
+            )
+        label_cache.preload()
+
+    def load_checkpoint(self) -> None:
+        """Load the folders and messages a previous import of this file saved."""
+        self.completed_folders = set(self.ratom_file.completed_folders)
+        self.saved_source_ids = set(
+            self.ratom_file.message_set.values_list("source_id", flat=True)
+        )
+        self.ratom_file_errors = list(self.ratom_file.errors or [])
+        logger.info(
+            f"Resuming after {len(self.completed_folders)} folders and "
+            f"{len(self.saved_source_ids)} messages"
+        )
+
+    def mark_folder_complete(self, folder: pypff.folder) -> None:
+        """Checkpoint a folder once all of its messages have been saved.
+
+        The identifier is appended in the database, rather than saving the whole
+        ratom.File, since shard workers checkpoint the same file concurrently.
+        """
+        ratom.File.objects.filter(pk=self.ratom_file.pk).update(
+            completed_folders=Func(
+                F("completed_folders"),
+                Value(folder.identifier),
+                function="array_append",
+                output_field=ArrayField(models.BigIntegerField()),
+            )
+        )
+        self.completed_folders.add(folder.identifier)
 
     def importing_stage(self) -> None:
-        """Set import_status to IMPORTING and open PffArchive."""
+        """Open PffArchive, set import_status to IMPORTING and scan it.
+
+        Duplicates are detected first, so a skipped archive's ratom.File keeps
+        its status.
+        """
         logger.info("--- Importing Stage ---")
+        self.open_archive()
+        if self.duplicates != DuplicatePolicy.FORCE:
+            original = self.find_duplicate()
+            if original:
+                raise DuplicateFile(original)
+        self.mark_importing()
+        self.scan_stage()
+
+    def mark_importing(self) -> None:
+        self.ratom_file.import_status = ratom.File.IMPORTING
+        self.ratom_file.reported_total_messages = self.archive.message_count
+        self.ratom_file.save()
+        logger.info(
+            f"Opened {self.ratom_file.reported_total_messages} messages in archive"
+        )
+        self.started = time.monotonic()
+
+    def open_archive(self) -> None:
+        """Open PffArchive and record the file's size and hash."""
         logger.info(f"Opening archive {self.import_provider.path}")
         if not self.import_provider.exists:
             raise ImportProviderError(
@@ -46,28 +172,166 @@ class PstImporter:
             )
         self.import_provider.open()
         self.archive = self.import_provider.pff_archive
-        self.ratom_file.import_status = ratom.File.IMPORTING
-        self.ratom_file.reported_total_messages = self.archive.message_count
         self.ratom_file.file_size = self.import_provider.file_size
         self.ratom_file.sha256 = self.import_provider.crypt_hash
-        self.ratom_file.save()
-        logger.info(f"Opened {self.archive.message_count} messages in archive")
+
+    def scan_stage(self) -> None:
+        """Store a manifest of the archive's folders, unless it already has one."""
+        logger.info("--- Scan Stage ---")
+        manifest = self.ratom_file.manifest
+        if not manifest or manifest.get("sha256") != self.ratom_file.sha256:
+            manifest = scan_archive(self.archive, self.ratom_file.file_size)
+            manifest["sha256"] = self.ratom_file.sha256
+            self.ratom_file.manifest = manifest
+            self.ratom_file.save()
+        self.load_manifest(manifest)
+
+    def load_manifest(self, manifest: dict) -> None:
+        self.manifest = manifest
+        self.folder_index = {entry["id"]: entry for entry in manifest["folders"]}
+
+    def scan(self) -> None:
+        """Open and scan the archive into its ratom.File without importing it."""
+        try:
+            self.ratom_file = self._create_ratom_file(
+                self.account, self.import_provider
+            )
+            self.open_archive()
+            self.ratom_file.save()
+            self.scan_stage()
+        except ImportProviderError as e:
+            logger.warning(f"{e}")
+        finally:
+            self.import_provider.close()
+
+    def find_duplicate(self) -> Optional[ratom.File]:
+        """Return the first completely imported ratom.File with the same SHA-256."""
+        if not self.ratom_file.sha256:
+            return None
+        return (
+            ratom.File.objects.filter(
+                sha256=self.ratom_file.sha256, import_status=ratom.File.COMPLETE
+            )
+            .exclude(pk=self.ratom_file.pk)
+            .order_by("pk")
+            .first()
+        )
+
+    def duplicate_stage(self, original: ratom.File) -> None:
+        """Skip the archive, or copy original's messages, according to the policy."""
+        logger.info("--- Duplicate Stage ---")
+        logger.warning(f"{self.import_provider.path} matches ratom.File[{original.pk}]")
+        if self.duplicates == DuplicatePolicy.LINK:
+            self.mark_importing()
+            self.start_indexing()
+            self.link_messages(original)
+            self.success_stage()
+            return
+        self.skipped = True
+        if not self.ratom_file.message_set.exists():
+            # Nothing was imported into this file, don't leave an empty one behind
+            self.ratom_file.delete()
+        elif self.ratom_file.import_status != ratom.File.COMPLETE:
+            # Part of a previous import, resumable with duplicates=force
+            self.add_file_error(
+                name="Duplicate archive skipped",
+                context=f"Matches ratom.File[{original.pk}]",
+            )
+            self.ratom_file.import_status = ratom.File.FAILED
+            self.ratom_file.errors = self.ratom_file_errors
+            self.save_ratom_file()
+        logger.info(f"Skipped already imported {self.import_provider.path}")
+
+    def link_messages(self, original: ratom.File) -> None:
+        """Copy original's messages, with their importer labels, into self.ratom_file.
+
+        Review decisions (the rest of each MessageAudit) are not copied, since the
+        copies belong to a new file and possibly a different account.
+        """
+        messages = (
+            original.message_set.select_related("audit")
+            .prefetch_related("audit__labels")
+            .order_by("pk")
+        )
+        last_pk = 0
+        while True:
+            chunk = list(messages.filter(pk__gt=last_pk)[: self.writer.chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            for message in chunk:
+                labels = [
+                    label
+                    for label in message.audit.labels.all()
+                    if label.type == ratom.Label.IMPORTER
+                ]
+                message.pk = None
+                message.audit = None
+                message.file = self.ratom_file
+                message.account = self.ratom_file.account
+                self.writer.add(message, labels)
+        self.writer.flush()
+        for folder_path in original.unique_paths:
+            self.add_unique_path(folder_path)
+        logger.info(f"Linked {self.writer.total_saved} messages")
 
     def fail_stage(self, e) -> None:
         """Import failed for some reason, set import_status to FAILED."""
         logger.info("--- Fail Stage ---")
+        self.stop_indexing()
         self.ratom_file.import_status = ratom.File.FAILED
         self.ratom_file.errors = self.ratom_file_errors
-        self.ratom_file.save()
+        self.save_ratom_file()
         logger.info(f"ratom.File[{self.ratom_file.pk}] failed to import")
 
     def success_stage(self) -> None:
         """If import was successful, set import_status to COMPLETE."""
         logger.info("--- Success Stage ---")
+        # Messages are searchable once the file is COMPLETE
+        self.stop_indexing(force_merge=settings.IMPORT_FORCE_MERGE)
         self.ratom_file.import_status = ratom.File.COMPLETE
         self.ratom_file.errors = self.ratom_file_errors
-        self.ratom_file.save()
+        self.save_ratom_file()
         logger.info(f"ratom.File[{self.ratom_file.pk}] imported successfully")
+        self.log_throughput()
+
+    def start_indexing(self, suspend_refresh: bool = True) -> None:
+        """Start bulk indexing saved messages, if enabled."""
+        if self.indexer:
+            self.indexer.suspend_refresh = suspend_refresh
+            self.indexer.start()
+
+    def stop_indexing(self, force_merge: bool = False) -> None:
+        """Wait for saved messages to be indexed and restore the index settings.
+
+        A failure is recorded as a file error rather than raised, so the file
+        still gets its final status.
+        """
+        if not self.indexer:
+            return
+        try:
+            self.indexer.stop(force_merge=force_merge)
+        except Exception as e:
+            name = "stop_indexing() failed"
+            logger.exception(name)
+            self.add_file_error(name=name, context=str(e))
+
+    def save_ratom_file(self) -> None:
+        """Save self.ratom_file without overwriting its folder checkpoints."""
+        self.ratom_file.refresh_from_db(fields=["completed_folders"])
+        self.ratom_file.save()
+
+    def log_throughput(self) -> None:
+        """Log the import rate of saved messages."""
+        if self.started is None:
+            return
+        elapsed = time.monotonic() - self.started
+        total = self.writer.total_saved
+        rate = total / elapsed if elapsed else 0
+        logger.info(
+            f"Saved {total} messages in {elapsed:.1f}s ({rate:.1f} msgs/sec, "
+            f"chunk_size={self.writer.chunk_size})"
+        )
 
     def _create_ratom_file(
         self, account: ratom.Account, import_provider: ImportProvider
@@ -85,54 +349,249 @@ class PstImporter:
 
     def import_messages_from_archive(self) -> None:
         """Loop through and import all archive messages."""
+        if self.workers > 1:
+            self.import_messages_in_parallel()
+        else:
+            self.start_indexing()
+            self.import_folders(self.archive_folders())
+
+    def import_folders(self, folders: Iterable[Tuple[pypff.folder, int]]) -> None:
+        """Import the messages of (folder, message count) pairs and save them all."""
+        if self.pipeline:
+            self.import_folders_with_pipeline(folders)
+            return
+        for folder, message_count in folders:
+            self.import_folder(folder, message_count)
+        self.flush_messages()
+
+    def archive_folders(self) -> Iterator[Tuple[pypff.folder, int]]:
+        """Yield each archive folder that has messages, with its message count."""
         for folder in self.archive.folders():
             if not folder.name:  # skip root node
                 continue
-            message_count = folder.get_number_of_sub_messages()
-            logger.info(f"Scanning {message_count} messages in folder {folder.name}")
+            message_count = self.folder_index[folder.identifier]["messages"]
+            logger.info(f"Found {message_count} messages in folder {folder.name}")
             if message_count == 0:
                 continue
-            folder_path = self.get_folder_abs_path(folder)
+            if folder.identifier in self.completed_folders:
+                logger.info(f"Skipping completed folder {folder.name}")
+                self.add_unique_path(self.get_folder_abs_path(folder))
+                continue
+            yield folder, message_count
+
+    def add_unique_path(self, folder_path: str) -> None:
+        if folder_path not in self.ratom_file.unique_paths:
             self.ratom_file.unique_paths.append(folder_path)
-            msg_iterator = tqdm(
-                folder.sub_messages,
-                unit="msgs",
-                initial=0,
-                total=message_count,
-                mininterval=3.0 if self.is_background else 0.1,
+
+    def is_saved(self, archive_msg: pypff.message) -> bool:
+        """Whether a previous run of a resumed import already saved archive_msg."""
+        return str(archive_msg.identifier) in self.saved_source_ids
+
+    def import_folder(self, folder: pypff.folder, message_count: int) -> None:
+        """Import all messages in a single archive folder, then checkpoint it."""
+        folder_path = self.get_folder_abs_path(folder)
+        self.add_unique_path(folder_path)
+        for archive_msg in self.folder_messages(folder, message_count):
+            if self.is_saved(archive_msg):
+                continue
+            try:
+                self.create_message(folder_path, archive_msg)
+            except Exception as e:
+                name = "create_message() failed"
+                logger.exception(name)
+                self.add_file_error(name=name, context=str(e), archive_msg=archive_msg)
+        self.flush_messages()
+        self.mark_folder_complete(folder)
+        self.log_progress(message_count)
+
+    def log_progress(self, message_count: int) -> None:
+        """Log how much of the manifest's messages have been read."""
+        self.messages_read += message_count
+        total = self.manifest["messages"] if self.manifest else 0
+        if total:
+            logger.info(
+                f"Read {self.messages_read} of {total} messages "
+                f"({self.messages_read / total:.0%})"
             )
-            for archive_msg in msg_iterator:  # type: pypff.message
+
+    def folder_messages(
+        self, folder: pypff.folder, message_count: int
+    ) -> Iterator[pypff.message]:
+        """Iterate a folder's messages with a progress bar."""
+        return tqdm(
+            folder.sub_messages,
+            unit="msgs",
+            initial=0,
+            total=message_count,
+            mininterval=3.0 if self.is_background else 0.1,
+        )
+
+    def flush_messages(self) -> None:
+        """Label and save any messages still queued."""
+        self.save_message_batch()
+        self.writer.flush()
+
+    def import_folders_with_pipeline(
+        self, folders: Iterable[Tuple[pypff.folder, int]]
+    ) -> None:
+        """Import folders with reading, parsing, NLP and saving running concurrently.
+
+        This thread reads messages from the archive; parsing, entity extraction and
+        the database/index writes each run in their own StagedPipeline thread.
+
+        Folders are only checkpointed once the whole pipeline has finished, so a
+        resumed import skips a failed pipeline's messages by their identifiers.
+        """
+        pipeline = StagedPipeline(
+            [
+                Stage("parse", self.parse_messages),
+                Stage("nlp", self.label_messages, batch_size=self.writer.chunk_size),
+                Stage("write", self.write_messages, on_finish=self.writer.flush),
+            ],
+            maxsize=settings.IMPORT_PIPELINE_QUEUE_SIZE,
+        )
+        read_folders = []
+        with pipeline:
+            for folder, message_count in folders:
+                if pipeline.failed.is_set():
+                    # A stage failed, stop reading the archive
+                    break
+                folder_path = self.get_folder_abs_path(folder)
+                self.add_unique_path(folder_path)
+                read_folders.append(folder)
+                for archive_msg in self.folder_messages(folder, message_count):
+                    if pipeline.failed.is_set():
+                        break
+                    if self.is_saved(archive_msg):
+                        continue
+                    try:
+                        snapshot = ArchiveMessageSnapshot.from_archive(
+                            self.archive, archive_msg
+                        )
+                    except Exception as e:
+                        name = "create_message() failed"
+                        logger.exception(name)
+                        self.add_file_error(
+                            name=name, context=str(e), archive_msg=archive_msg
+                        )
+                        continue
+                    pipeline.put((folder_path, snapshot))
+                self.log_progress(message_count)
+        for folder in read_folders:
+            self.mark_folder_complete(folder)
+
+    def parse_messages(
+        self, items: List[Tuple[str, ArchiveMessageSnapshot]]
+    ) -> List[ratom.Message]:
+        """Pipeline stage: validate (folder path, snapshot) pairs into messages."""
+        messages = []
+        for folder_path, snapshot in items:
+            try:
+                message = self.build_message(
+                    folder_path, snapshot, rfc822=snapshot.rfc822
+                )
+            except Exception as e:
+                name = "create_message() failed"
+                logger.exception(name)
+                self.add_file_error(name=name, context=str(e), archive_msg=snapshot)
+                continue
+            if message is not None:
+                messages.append(message)
+        return messages
+
+    def write_messages(
+        self, labeled: List[Tuple[ratom.Message, List[ratom.Label]]]
+    ) -> list:
+        """Pipeline stage: queue labeled messages in the writer."""
+        for message, labels in labeled:
+            self.writer.add(message, labels)
+        return []
+
+    def import_messages_in_parallel(self) -> None:
+        """Import the archive's folders in a pool of worker processes.
+
+        Folders are split into self.workers shards of similar message counts. Each
+        worker opens its own PffArchive on the same local file and saves messages
+        to self.ratom_file; their errors and folder paths are merged here.
+
+        If any worker fails, ShardImportError is raised once the others finish,
+        so the file is left FAILED. The folders they completed are checkpointed,
+        for a resumed import to skip.
+        """
+        folders = [
+            (folder.identifier, message_count)
+            for folder, message_count in self.archive_folders()
+        ]
+        shards = shard_folders(folders, self.workers)
+        logger.info(f"Importing {len(folders)} folders with {len(shards)} workers")
+        # Suspends refresh_interval for the workers, which index their own messages
+        self.start_indexing()
+        # Forked workers must not share the parent's database connection
+        db.connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=len(shards) or 1, initializer=init_shard_worker
+        ) as executor:
+            futures = [
+                executor.submit(
+                    import_folder_shard,
+                    archive_path=self.import_provider.archive_path,
+                    ratom_file_pk=self.ratom_file.pk,
+                    folder_ids=shard,
+                    chunk_size=self.writer.chunk_size,
+                    is_background=self.is_background,
+                    pipeline=self.pipeline,
+                    resume=self.resume,
+                    bulk_index=self.indexer is not None,
+                )
+                for shard in shards
+            ]
+            failed = 0
+            for future in as_completed(futures):
                 try:
-                    self.create_message(folder_path, archive_msg)
+                    result = future.result()
                 except Exception as e:
-                    name = "create_message() failed"
+                    name = "import_folder_shard() failed"
                     logger.exception(name)
-                    self.add_file_error(
-                        name=name, context=str(e), archive_msg=archive_msg
-                    )
+                    self.add_file_error(name=name, context=str(e))
+                    failed += 1
+                    continue
+                self.ratom_file_errors.extend(result["errors"])
+                for folder_path in result["unique_paths"]:
+                    self.add_unique_path(folder_path)
+                self.writer.total_saved += result["total_saved"]
+        if failed:
+            raise ShardImportError(f"{failed} of {len(shards)} workers failed")
 
     def get_folder_abs_path(self, folder: pypff.folder) -> str:
-        """Traverse tree node parent's to build absolution path"""
-        path = [folder.name]
-        parent = self.archive.tree.get_node(
-            self.archive.tree.get_node(folder.identifier).bpointer
-        )
-        while parent:
-            tag = parent.tag if parent.tag != "root" else ""
-            path.insert(0, tag)
-            parent = self.archive.tree.get_node(
-                self.archive.tree.get_node(parent.identifier).bpointer
-            )
-        return "/".join(path)
+        """Look up the folder's absolute path in the manifest."""
+        return self.folder_index[folder.identifier]["path"]
 
     def create_message(self, folder_path: str, archive_msg: pypff.message) -> None:
-        """Validate message, run NLP, and create ratom.Message instance.
+        """Validate message and queue ratom.Message instance for NLP and saving.
+
+        Messages are labeled and saved in batches by save_message_batch().
+        """
+        ratom_message = self.build_message(folder_path, archive_msg)
+        if ratom_message is None:
+            return
+        self.message_batch.append(ratom_message)
+        if len(self.message_batch) >= self.writer.chunk_size:
+            self.save_message_batch()
+
+    def build_message(
+        self, folder_path: str, archive_msg: pypff.message, rfc822: str = None
+    ) -> Optional[ratom.Message]:
+        """Validate message and build an unsaved ratom.Message instance.
 
         Any errors are stored in a dict. If a message has errors this dict will be added to the
         msg_data field.
+
+        Returns: ratom.Message, or None if the message is not valid
         """
         logger.debug(f"Ingesting ({archive_msg.identifier}): {archive_msg.subject}")
-        form = ArchiveMessageForm(archive=self.archive, archive_msg=archive_msg)
+        form = ArchiveMessageForm(
+            archive=self.archive, archive_msg=archive_msg, rfc822=rfc822
+        )
         if not form.is_valid():
             # A discovered error will prevent saving this message
             # so log the error and move on to next message
@@ -140,37 +599,77 @@ class PstImporter:
             self.add_file_error(
                 name="ArchiveMessageForm not valid",
                 context=form.errors,
-                archive=archive_msg,
+                archive_msg=archive_msg,
             )
-            return
+            return None
 
         ratom_message = form.save(commit=False)
-        # perform spaCy NLP and entity extraction
-        labels = extract_labels(
-            f"{ratom_message.subject}\n{ratom_message.body}", self.spacy_model
-        )
-        ratom_message.audit = ratom.MessageAudit.objects.create()
-        ratom_message.audit.labels.add(*list(labels))
-        # lastly, save instance
         ratom_message.file = self.ratom_file
         ratom_message.account = self.ratom_file.account
         ratom_message.directory = folder_path
         ratom_message.errors = form.msg_errors
-        ratom_message.save()
+        return ratom_message
+
+    def save_message_batch(self) -> None:
+        """Run spaCy NLP and entity extraction on queued messages, then save them."""
+        batch, self.message_batch = self.message_batch, []
+        for message, labels in self.label_messages(batch):
+            self.writer.add(message, labels)
+
+    def label_messages(
+        self, batch: List[ratom.Message]
+    ) -> List[Tuple[ratom.Message, List[ratom.Label]]]:
+        """Run spaCy NLP and entity extraction on a batch of messages.
+
+        Returns: (message, labels) pairs, without messages that failed
+        """
+        if not batch:
+            return []
+        texts = [f"{message.subject}\n{message.body}" for message in batch]
+        try:
+            labels = extract_labels_batch(
+                texts, self.spacy_model, n_process=self.nlp_processes
+            )
+            return list(zip(batch, labels))
+        except Exception:
+            logger.exception("Batch entity extraction failed, retrying individually")
+        labeled = []
+        for message, text in zip(batch, texts):
+            try:
+                labeled.append((message, extract_labels(text, self.spacy_model)))
+            except Exception as e:
+                self.add_message_error(message, e)
+        return labeled
 
     def add_file_error(self, name, context, archive_msg=None):
         """Record file-level error occured."""
         error_data = {"name": name, "context": context}
         if archive_msg:
             error_data["msg_identifier"] = archive_msg.identifier
-        self.ratom_file_errors.append(error_data)
+        with self._errors_lock:
+            self.ratom_file_errors.append(error_data)
+
+    def add_message_error(self, message: ratom.Message, e: Exception) -> None:
+        """Record a message that MessageWriter failed to save."""
+        error_data = {
+            "name": "save_message() failed",
+            "context": str(e),
+            "msg_identifier": message.source_id,
+        }
+        with self._errors_lock:
+            self.ratom_file_errors.append(error_data)
 
     def run(self) -> None:
         """Main staged import process."""
         try:
             self.initializing_stage()
+            if self.resume and self.ratom_file.import_status == ratom.File.COMPLETE:
+                logger.info(f"ratom.File[{self.ratom_file.pk}] is already imported")
+                return
             self.importing_stage()
             self.import_messages_from_archive()
+        except DuplicateFile as e:
+            self.duplicate_stage(e.original)
         except (KeyboardInterrupt, SystemExit, SystemError) as e:
             name = "Keyboard interrupted file import process"
             logger.warning("Keyboard interrupted file import process")
@@ -188,6 +687,88 @@ class PstImporter:
             self.fail_stage(e)
         else:
             self.success_stage()
+        finally:
+            self.stop_indexing()
+            self.import_provider.close()
+
+
+def shard_folders(folders: List[Tuple[int, int]], workers: int) -> List[List[int]]:
+    """Split (folder identifier, message count) pairs into balanced shards.
+
+    Folders are assigned largest first to the shard with the fewest messages.
+
+    Returns: list of folder identifier lists, one per non-empty shard
+    """
+    shards = [(0, index, []) for index in range(workers)]
+    heapq.heapify(shards)
+    for identifier, message_count in sorted(folders, key=lambda f: f[1], reverse=True):
+        total, index, identifiers = heapq.heappop(shards)
+        identifiers.append(identifier)
+        heapq.heappush(shards, (total + message_count, index, identifiers))
+    return [identifiers for _, _, identifiers in sorted(shards) if identifiers]
+
+
+# spaCy model of a shard worker process, loaded once by init_shard_worker()
+_shard_spacy_model = None
+
+
+def init_shard_worker() -> None:
+    global _shard_spacy_model
+    _shard_spacy_model = load_nlp_model()
+
+
+def import_folder_shard(
+    archive_path: str,
+    ratom_file_pk: int,
+    folder_ids: List[int],
+    chunk_size: int,
+    is_background: bool,
+    pipeline: bool = False,
+    resume: bool = False,
+    bulk_index: bool = False,
+) -> dict:
+    """Import a subset of an archive's folders, in a worker process.
+
+    Returns: dict of the shard's file errors, folder paths and saved message count
+    """
+    ratom_file = ratom.File.objects.select_related("account").get(pk=ratom_file_pk)
+    # Only report this shard's paths, the parent process merges them
+    ratom_file.unique_paths = []
+    importer = PstImporter(
+        FilesystemProvider(file_path=archive_path),
+        ratom_file.account,
+        _shard_spacy_model,
+        is_background,
+        chunk_size,
+        pipeline=pipeline,
+        bulk_index=bulk_index,
+        # Pool workers are daemonic, spaCy can't start processes of its own
+        nlp_processes=1,
+    )
+    importer.ratom_file = ratom_file
+    importer.load_manifest(ratom_file.manifest)
+    if resume:
+        importer.load_checkpoint()
+        # Errors from the previous run are already in the parent's list
+        importer.ratom_file_errors = []
+    importer.archive = PffArchive(archive_path)
+    label_cache.preload()
+    folder_ids = set(folder_ids)
+    # The parent process suspended (and will restore) the index's refresh_interval
+    importer.start_indexing(suspend_refresh=False)
+    try:
+        importer.import_folders(
+            (folder, message_count)
+            for folder, message_count in importer.archive_folders()
+            if folder.identifier in folder_ids
+        )
+    finally:
+        importer.stop_indexing()
+    return {
+        "errors": importer.ratom_file_errors,
+        "unique_paths": ratom_file.unique_paths,
+        "total_saved": importer.writer.total_saved,
+    }
 
 
 def import_psts(
@@ -197,10 +778,28 @@ def import_psts(
     clean_file: bool = False,
     is_background: bool = False,
     is_remote=False,
-) -> None:
+    chunk_size: int = None,
+    workers: int = None,
+    pipeline: bool = None,
+    resume: bool = False,
+    duplicates: str = None,
+    scan_only: bool = False,
+) -> List[str]:
+    """Import each path into account.
+
+    Archives whose SHA-256 matches a completely imported ratom.File are handled
+    according to duplicates, a DuplicatePolicy (default: IMPORT_DUPLICATE_POLICY).
+    With scan_only, each file's manifest is stored but no messages are imported.
+
+    Returns: the paths that failed to import
+    """
     logger.info("Import process started")
+    workers = workers or settings.IMPORT_WORKERS
+    if pipeline is None:
+        pipeline = settings.IMPORT_PIPELINE
+    duplicates = duplicates or settings.IMPORT_DUPLICATE_POLICY
     spacy_model = load_nlp_model()
-    account, _ = ratom.Account.objects.get_or_create(title=account)
+    account, account_created = ratom.Account.objects.get_or_create(title=account)
     if clean:
         logger.warning(f"Deleting {account.title} account files (if exists)")
         account.files.all().delete()
@@ -208,10 +807,35 @@ def import_psts(
         logger.warning(f"Deleting failed file for {account.title}")
         # MVP: We assume there is only 1 failed file per account.
         account.files.filter(import_status=ratom.File.FAILED).delete()
+    failed = []
+    skipped = []
     for path in paths:
         provider = import_provider_factory(provider=ProviderTypes.FILESYSTEM)
         if is_remote:
             provider = import_provider_factory(provider=settings.CLOUD_SERVICE_PROVIDER)
         local_provider = provider(file_path=path)
-        importer = PstImporter(local_provider, account, spacy_model, is_background)
+        importer = PstImporter(
+            local_provider,
+            account,
+            spacy_model,
+            is_background,
+            chunk_size,
+            workers,
+            pipeline,
+            resume,
+            duplicates,
+        )
+        if scan_only:
+            importer.scan()
+            continue
         importer.run()
+        if importer.skipped:
+            skipped.append(path)
+        elif importer.ratom_file.import_status == ratom.File.FAILED:
+            failed.append(path)
+    if skipped:
+        logger.warning(f"Skipped {len(skipped)} already imported file(s): {skipped}")
+        if account_created and not account.files.exists():
+            # An account without files breaks the front-end account list
+            account.delete()
+    return failed
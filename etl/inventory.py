@@ -0,0 +1,58 @@
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Blob
+from etl.providers.azure import AzureServiceProvider
+
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_blob_inventory(provider: AzureServiceProvider = None) -> dict:
+    """Sync core.Blob with a listing of the cloud storage container.
+
+    New blobs are created, blobs whose etag changed are updated and blobs that are
+    no longer listed are removed, each in bulk.
+
+    Returns: dict of created, updated and removed counts
+    """
+    provider = provider or AzureServiceProvider()
+    container = provider.container
+    refreshed = timezone.now()
+    existing = {
+        name: (pk, etag)
+        for pk, name, etag in Blob.objects.filter(container=container).values_list(
+            "pk", "name", "etag"
+        )
+    }
+    created = []
+    updated = []
+    listed = set()
+    for properties in provider.list_blobs():
+        listed.add(properties.name)
+        blob = Blob(
+            container=container,
+            name=properties.name,
+            size=properties.size,
+            etag=properties.etag or "",
+            last_modified=properties.last_modified,
+            last_seen=refreshed,
+        )
+        if properties.name not in existing:
+            created.append(blob)
+        elif existing[properties.name][1] != blob.etag:
+            blob.pk = existing[properties.name][0]
+            updated.append(blob)
+    removed = [pk for name, (pk, _) in existing.items() if name not in listed]
+    with transaction.atomic():
+        Blob.objects.bulk_create(created, batch_size=1000)
+        Blob.objects.bulk_update(
+            updated, ["size", "etag", "last_modified"], batch_size=1000
+        )
+        Blob.objects.filter(pk__in=removed).delete()
+        Blob.objects.filter(container=container).update(last_seen=refreshed)
+    counts = {"created": len(created), "updated": len(updated), "removed": len(removed)}
+    logger.info(f"Refreshed {len(listed)} blobs in {container}: {counts}")
+    return counts
@@ -1,7 +1,7 @@
 import logging
 from django.core.management.base import BaseCommand
 from etl.tasks import import_file_task
-from etl.importer import import_psts
+from etl.importer import DuplicatePolicy, import_psts
 
 
 logger = logging.getLogger(__name__)
@@ -36,6 +36,43 @@ class Command(BaseCommand):
             action="store_true",
             help="Run task in background",
         )
+        parser.add_argument(
+            "--chunk_size",
+            type=int,
+            default=None,
+            help="Number of messages to save per bulk write (default: IMPORT_CHUNK_SIZE)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of processes to import a file's folders with (default: IMPORT_WORKERS)",
+        )
+        parser.add_argument(
+            "--pipeline",
+            default=None,
+            action="store_true",
+            help="Overlap reading, parsing, NLP and saving in a staged pipeline",
+        )
+        parser.add_argument(
+            "--resume",
+            default=False,
+            action="store_true",
+            help="Continue a failed import, skipping folders and messages already saved",
+        )
+        parser.add_argument(
+            "--duplicates",
+            choices=DuplicatePolicy.CHOICES,
+            default=None,
+            help="How to handle files that were already imported, by SHA-256 "
+            "(default: IMPORT_DUPLICATE_POLICY)",
+        )
+        parser.add_argument(
+            "--scan_only",
+            default=False,
+            action="store_true",
+            help="Store each file's folder manifest without importing messages",
+        )
         parser.add_argument(
             "--account", help="Name of the account for this set of paths", required=True
         )
@@ -50,6 +87,12 @@ class Command(BaseCommand):
             "clean": options["clean"],
             "clean_file": options["clean_file"],
             "is_remote": options["remote"],
+            "chunk_size": options["chunk_size"],
+            "workers": options["workers"],
+            "pipeline": options["pipeline"],
+            "resume": options["resume"],
+            "duplicates": options["duplicates"],
+            "scan_only": options["scan_only"],
         }
         if options["detach"]:
             logger.info("Queuing background task...")
@@ -0,0 +1,66 @@
+import logging
+from typing import Iterator, Tuple
+
+from libratom.lib.pff import PffArchive
+import pypff
+
+
+logger = logging.getLogger(__name__)
+
+
+def walk_folders(archive: PffArchive) -> Iterator[Tuple[pypff.folder, str]]:
+    """Yield every folder of the archive with its absolute path.
+
+    Paths are built from the parent's path as the tree is walked breadth first,
+    so each folder is visited once. The root folder's path is "".
+    """
+    paths = {}
+    for folder in archive.folders():
+        path = paths.pop(folder.identifier, "")
+        yield folder, path
+        for sub_folder in folder.sub_folders:
+            paths[sub_folder.identifier] = f"{path}/{sub_folder.name}"
+
+
+def scan_archive(archive: PffArchive, file_size: int = None) -> dict:
+    """Build a manifest of the archive's folders without parsing any message.
+
+    Returns: dict of total counts and, for each folder, its identifier, path,
+    message and attachment counts and estimated share of the file's bytes.
+    """
+    folders = []
+    for folder, path in walk_folders(archive):
+        message_count = folder.get_number_of_sub_messages()
+        attachment_count = 0
+        if message_count:
+            attachment_count = sum(
+                message.number_of_attachments for message in folder.sub_messages
+            )
+        logger.debug(f"Scanned {message_count} messages in folder {path}")
+        folders.append(
+            {
+                "id": folder.identifier,
+                "path": path,
+                "messages": message_count,
+                "attachments": attachment_count,
+            }
+        )
+    total_messages = sum(entry["messages"] for entry in folders)
+    for entry in folders:
+        # Estimated by message count, since sizes aren't known without parsing
+        entry["estimated_bytes"] = (
+            (file_size or 0) * entry["messages"] // total_messages
+            if total_messages
+            else 0
+        )
+    manifest = {
+        "messages": total_messages,
+        "attachments": sum(entry["attachments"] for entry in folders),
+        "estimated_bytes": file_size or 0,
+        "folders": folders,
+    }
+    logger.info(
+        f"Scanned {len(folders)} folders: {manifest['messages']} messages, "
+        f"{manifest['attachments']} attachments"
+    )
+    return manifest
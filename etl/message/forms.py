@@ -1,8 +1,9 @@
+import datetime as dt
 import logging
 import re
 from pathlib import Path
 from email import message_from_string
-from typing import Dict
+from typing import Dict, NamedTuple
 from bs4 import BeautifulSoup
 
 from django import forms
@@ -41,6 +42,28 @@ def clean_html(html: str) -> str:
     return str(soup)
 
 
+class ArchiveMessageSnapshot(NamedTuple):
+    """The parts of a pypff.message that ArchiveMessageForm reads.
+
+    Reading them up front lets the form be validated in another thread than
+    the one that owns the archive.
+    """
+
+    identifier: int
+    subject: str
+    delivery_time: dt.datetime
+    rfc822: str
+
+    @classmethod
+    def from_archive(cls, archive, archive_msg) -> "ArchiveMessageSnapshot":
+        return cls(
+            identifier=archive_msg.identifier,
+            subject=archive_msg.subject,
+            delivery_time=archive_msg.delivery_time,
+            rfc822=archive.format_message(archive_msg),
+        )
+
+
 class ArchiveMessageForm(forms.ModelForm):
 
     # we manually clean sent_date in clean_sent_date() below
@@ -50,6 +73,8 @@ class ArchiveMessageForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.archive = kwargs.pop("archive")
         self.archive_msg = kwargs.pop("archive_msg")
+        # Pre-formatted message, e.g. from an ArchiveMessageSnapshot
+        self.rfc822 = kwargs.pop("rfc822", None)
         self.msg_errors = []
         msg_data = self._prepare_message()
         kwargs["data"] = msg_data
@@ -60,7 +85,9 @@ class ArchiveMessageForm(forms.ModelForm):
 
     def _prepare_message(self) -> Dict[str, str]:
         """Prepare message for Form-based validation."""
-        rfc822 = self.archive.format_message(self.archive_msg)
+        rfc822 = self.rfc822
+        if rfc822 is None:
+            rfc822 = self.archive.format_message(self.archive_msg)
         # remove bad header lines before creating EmailMessage
         for header in INVALID_MESSAGE_HEADERS:
             rfc822 = rfc822.replace(header, "")
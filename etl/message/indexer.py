@@ -0,0 +1,195 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List
+
+from django.conf import settings
+from django.core.cache import cache
+from django_elasticsearch_dsl.registries import registry
+from elasticsearch.helpers import streaming_bulk
+
+from core import models as ratom
+from core.index_version import bump_index_version
+
+
+logger = logging.getLogger(__name__)
+
+# Cache key of the number of imports that suspended an index's refresh_interval
+REFRESH_SUSPENSIONS_KEY = "bulk-indexer-refresh-suspensions"
+# So an import that died without stop() can't suspend refreshes for good
+REFRESH_SUSPENSIONS_TIMEOUT = 24 * 60 * 60
+
+
+class BulkIndexer:
+    """Index saved messages in Elasticsearch from a pool of threads.
+
+    While the indexer is running, the message index's refresh_interval is set to
+    -1, so the import doesn't pay for a refresh per saved message. MessageWriter
+    saves the messages it hands to the indexer inside suspend_autosync(), so they
+    aren't also indexed one request at a time. Documents are
+    prepared in the calling thread (prepare() reads related rows from the database)
+    and sent with the bulk helpers by `threads` workers. Requests rejected with a
+    429 are retried up to `max_retries` times with exponential backoff.
+
+    stop() waits for every queued chunk, then refreshes the index. Suspensions of
+    refresh_interval are counted in the cache (memcached when deployed), so
+    overlapping imports leave it suspended until the last of them stops, which
+    restores it and optionally force-merges the index. Shard workers of a
+    parallel import pass suspend_refresh=False and leave the index settings to
+    the parent process.
+
+    Usage:
+        >>> indexer = BulkIndexer()
+        >>> indexer.start()
+        >>> indexer.index(messages)
+        >>> indexer.stop()
+    """
+
+    def __init__(
+        self,
+        threads: int = None,
+        max_retries: int = None,
+        suspend_refresh: bool = True,
+    ):
+        self.threads = max(threads or settings.IMPORT_INDEX_THREADS, 1)
+        if max_retries is None:
+            max_retries = settings.IMPORT_INDEX_MAX_RETRIES
+        self.max_retries = max_retries
+        self.suspend_refresh = suspend_refresh
+        self.documents = [
+            document() for document in registry.get_documents([ratom.Message])
+        ]
+        self.indexed = 0
+        self.failed = 0
+        self.running = False
+        self._executor = None
+        self._pending = deque()
+        # Accounts whose cached search results stop() invalidates
+        self._account_ids = set()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        if self.suspend_refresh:
+            for document in self.documents:
+                self._suspend_refresh(document)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="bulk-index"
+        )
+        self.running = True
+        logger.info(f"Bulk indexing with {self.threads} threads")
+
+    def index(self, messages: List[ratom.Message]) -> None:
+        """Queue saved messages, blocking while too many chunks are in flight."""
+        if not self.running or not messages:
+            return
+        self._account_ids.update(message.account_id for message in messages)
+        for document in self.documents:
+            actions = list(document._get_actions(messages, "index"))
+            self.indexed += len(actions)
+            self._pending.append(
+                self._executor.submit(self._send, document._get_connection(), actions)
+            )
+        while len(self._pending) > self.threads * 2:
+            self._wait(self._pending.popleft())
+
+    def _send(self, connection, actions: List[dict]) -> int:
+        """Send one chunk of actions, in a worker thread.
+
+        Returns: number of actions that failed
+        """
+        failed = 0
+        for _, item in streaming_bulk(
+            connection,
+            actions,
+            chunk_size=len(actions),
+            max_retries=self.max_retries,
+            initial_backoff=1,
+            raise_on_error=False,
+            yield_ok=False,
+        ):
+            failed += 1
+            logger.error(f"Failed to index {item}")
+        return failed
+
+    def _wait(self, future: Future) -> None:
+        try:
+            failed = future.result()
+        except Exception:
+            logger.exception("Bulk indexing request failed")
+            return
+        self.failed += failed
+
+    def stop(self, force_merge: bool = False) -> None:
+        """Wait for queued chunks, then refresh and restore the index settings."""
+        if not self.running:
+            return
+        self.running = False
+        started = time.monotonic()
+        try:
+            while self._pending:
+                self._wait(self._pending.popleft())
+            self._executor.shutdown()
+            if self.suspend_refresh:
+                for document in self.documents:
+                    self._restore_refresh(document, force_merge)
+        finally:
+            if self._account_ids:
+                bump_index_version(self._account_ids)
+        logger.info(
+            f"Bulk indexed {self.indexed} documents ({self.failed} failed), "
+            f"finished in {time.monotonic() - started:.1f}s"
+        )
+
+    def _suspend_refresh(self, document) -> None:
+        name = document._index._name
+        connection = document._get_connection()
+        key = f"{REFRESH_SUSPENSIONS_KEY}:{name}"
+        if cache.add(key, 1, timeout=REFRESH_SUSPENSIONS_TIMEOUT):
+            # The first import to suspend it restores it when the last one stops
+            response = connection.indices.get_settings(
+                index=name, name="index.refresh_interval"
+            )
+            previous = None
+            for index_settings in response.values():
+                previous = (
+                    index_settings["settings"].get("index", {}).get("refresh_interval")
+                )
+            if previous == "-1":
+                # Left suspended by an import that died, restore the default
+                previous = None
+            cache.set(f"{key}:previous", previous, timeout=REFRESH_SUSPENSIONS_TIMEOUT)
+        else:
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Expired since add()
+                cache.add(key, 1, timeout=REFRESH_SUSPENSIONS_TIMEOUT)
+        connection.indices.put_settings(
+            index=name, body={"index": {"refresh_interval": "-1"}}
+        )
+
+    def _restore_refresh(self, document, force_merge: bool) -> None:
+        name = document._index._name
+        connection = document._get_connection()
+        key = f"{REFRESH_SUSPENSIONS_KEY}:{name}"
+        try:
+            remaining = cache.decr(key)
+        except ValueError:
+            remaining = 0
+        if remaining > 0:
+            logger.info(
+                f"{name} refresh_interval stays suspended for {remaining} imports"
+            )
+        else:
+            previous = cache.get(f"{key}:previous")
+            cache.delete_many([key, f"{key}:previous"])
+            connection.indices.put_settings(
+                index=name, body={"index": {"refresh_interval": previous}}
+            )
+        # Make this import's messages searchable either way
+        connection.indices.refresh(index=name)
+        if force_merge and remaining <= 0:
+            logger.info(f"Force merging {name}")
+            connection.indices.forcemerge(index=name, max_num_segments=1)
@@ -1,8 +1,11 @@
 import logging
+from typing import Iterable, List
 
+from django.conf import settings
 from libratom.lib.entities import load_spacy_model
 
 from core.models import Label
+from core.util.label_cache import label_cache
 
 
 logger = logging.getLogger(__name__)
@@ -20,14 +23,37 @@ def extract_labels(text, spacy_model):
 
     Returns: core.Label list
     """
+    return extract_labels_batch([text], spacy_model)[0]
+
+
+def extract_labels_batch(
+    texts: Iterable[str], spacy_model, batch_size: int = None, n_process: int = None
+) -> List[List[Label]]:
+    """Extract entities from many texts at once with spaCy's nlp.pipe().
+
+    Only the NER component runs (the rest of the pipeline is disabled) and each
+    text is truncated to NLP_MAX_TEXT_LENGTH characters.
+
+    Returns: a core.Label list per text, in order
+    """
+    batch_size = batch_size or settings.NLP_BATCH_SIZE
+    n_process = n_process or settings.NLP_N_PROCESS
+    max_length = settings.NLP_MAX_TEXT_LENGTH
+    disable = [name for name in spacy_model.pipe_names if name != "ner"]
     try:
-        document = spacy_model(text)
+        documents = spacy_model.pipe(
+            (text[:max_length] for text in texts),
+            batch_size=batch_size,
+            n_process=n_process,
+            disable=disable,
+        )
+        names_per_text = [
+            {entity.label_ for entity in document.ents} for document in documents
+        ]
     except ValueError:
-        logger.exception(f"spaCy error")
+        logger.exception("spaCy error")
         raise
 
-    labels = set()
-    for entity in document.ents:
-        label, _ = Label.objects.get_or_create(type=Label.IMPORTER, name=entity.label_)
-        labels.add(label)
-    return list(labels)
+    names = sorted(set().union(*names_per_text))
+    labels = dict(zip(names, label_cache.resolve(Label.IMPORTER, names)))
+    return [[labels[name] for name in names] for names in names_per_text]
@@ -0,0 +1,114 @@
+import logging
+from typing import Callable, List, Tuple
+
+from django.db import transaction
+from django_elasticsearch_dsl.apps import DEDConfig
+from django_elasticsearch_dsl.registries import registry
+from simple_history.utils import bulk_create_with_history
+
+from core import models as ratom
+from core.signals import suspend_autosync
+
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+    """Buffer unsaved ratom.Message instances and persist them in chunks.
+
+    A chunk is written with a fixed number of queries (MessageAudit, its history,
+    Message and MessageAudit.labels links are each bulk inserted) and then bulk
+    indexed in Elasticsearch. If writing a chunk fails, the whole chunk is rolled
+    back and its messages are saved one at a time, so only the bad message is lost.
+
+    If an `indexer` (etl.message.indexer.BulkIndexer) is given, every saved message
+    is handed to it instead of being indexed synchronously.
+    """
+
+    def __init__(self, chunk_size: int = 500, on_error: Callable = None, indexer=None):
+        self.chunk_size = max(chunk_size, 1)
+        self.on_error = on_error
+        self.indexer = indexer
+        self.pending = []  # type: List[Tuple[ratom.Message, List[ratom.Label]]]
+        self.total_saved = 0
+
+    def add(self, message: ratom.Message, labels: List[ratom.Label]) -> None:
+        """Queue message (and its labels) and flush if the chunk is full."""
+        self.pending.append((message, labels))
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Persist all queued messages."""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        try:
+            with transaction.atomic():
+                self._bulk_save(pending)
+        except Exception:
+            logger.exception(
+                f"Bulk save of {len(pending)} messages failed, saving individually"
+            )
+            if self.indexer and self.indexer.running:
+                # The indexer indexes them, skip autosync of each save
+                with suspend_autosync():
+                    saved = self._save_individually(pending)
+                self.indexer.index(saved)
+            else:
+                saved = self._save_individually(pending)
+        else:
+            saved = [message for message, _ in pending]
+            self.index(saved)
+        self.total_saved += len(saved)
+        logger.debug(f"Saved {len(saved)} messages ({self.total_saved} total)")
+
+    def _bulk_save(self, pending: List[Tuple[ratom.Message, List[ratom.Label]]]):
+        LabelLink = ratom.MessageAudit.labels.through
+        audits = bulk_create_with_history(
+            [ratom.MessageAudit() for _ in pending], ratom.MessageAudit
+        )
+        links = []
+        for (message, labels), audit in zip(pending, audits):
+            message.audit = audit
+            links.extend(
+                LabelLink(messageaudit_id=audit.pk, label_id=label.pk)
+                for label in labels
+            )
+        ratom.Message.objects.bulk_create([message for message, _ in pending])
+        LabelLink.objects.bulk_create(links)
+
+    def _save_individually(
+        self, pending: List[Tuple[ratom.Message, List[ratom.Label]]]
+    ) -> List[ratom.Message]:
+        """Fallback for a failed chunk: save each message in its own transaction.
+
+        Saving a message this way also indexes it via django_elasticsearch_dsl's
+        post_save signal, unless autosync is suspended.
+        """
+        saved = []
+        for message, labels in pending:
+            # Primary keys may have been assigned by the rolled back bulk insert
+            message.pk = None
+            try:
+                with transaction.atomic():
+                    message.audit = ratom.MessageAudit.objects.create()
+                    message.audit.labels.add(*labels)
+                    message.save()
+            except Exception as e:
+                logger.exception(f"Saving message {message.source_id} failed")
+                if self.on_error:
+                    self.on_error(message, e)
+            else:
+                saved.append(message)
+        return saved
+
+    def index(self, messages: List[ratom.Message]) -> None:
+        """Bulk index messages saved with bulk_create(), which sends no signals."""
+        if self.indexer and self.indexer.running:
+            self.indexer.index(messages)
+            return
+        if not DEDConfig.autosync_enabled():
+            return
+        for document in registry.get_documents([ratom.Message]):
+            document().update(messages)
@@ -0,0 +1,169 @@
+import logging
+import queue
+import threading
+from typing import Callable, List, Tuple
+
+from django import db
+
+
+logger = logging.getLogger(__name__)
+
+# Sentinel passed down the queues once a stage has no more items
+DONE = object()
+
+
+class Stage:
+    """A named step of a StagedPipeline.
+
+    `handler` receives a list of up to `batch_size` items and returns a list of
+    items for the next stage. `on_finish` is called once the stage has handled
+    its last item.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[list], list],
+        batch_size: int = 1,
+        on_finish: Callable[[], None] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.on_finish = on_finish
+        self.processed = 0
+        self.max_queue_depth = 0
+
+
+class StagedPipeline:
+    """Run stages in threads connected by bounded queues.
+
+    Items put() into the pipeline flow through each stage in order. Every queue
+    holds at most `maxsize` items, so a slow stage blocks the stages before it
+    (backpressure) rather than letting them buffer a whole archive in memory.
+    Queue depths are logged every `report_interval` seconds.
+
+    If a handler raises, the pipeline is marked as failed and the remaining items
+    are drained without being handled; close() then re-raises the first error.
+
+    Usage:
+        >>> with StagedPipeline([Stage("double", lambda b: [i * 2 for i in b])]) as p:
+        >>>     p.put(1)
+    """
+
+    def __init__(
+        self, stages: List[Stage], maxsize: int = 100, report_interval: float = 30.0
+    ):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=maxsize) for _ in stages]
+        self.report_interval = report_interval
+        self.failed = threading.Event()
+        self.error = None
+        self._stopped = threading.Event()
+        self._threads = [
+            threading.Thread(
+                target=self._run_stage, args=(index,), name=f"pipeline-{stage.name}"
+            )
+            for index, stage in enumerate(stages)
+        ]
+        self._monitor = threading.Thread(
+            target=self._report, name="pipeline-monitor", daemon=True
+        )
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # Don't handle what was queued, the caller is going to re-raise
+            self.failed.set()
+        self.close(raise_error=exc_type is None)
+
+    def start(self) -> None:
+        for thread in self._threads:
+            thread.start()
+        self._monitor.start()
+
+    def put(self, item) -> None:
+        """Add an item to the first stage, blocking while its queue is full."""
+        self.queues[0].put(item)
+
+    def close(self, raise_error: bool = True) -> None:
+        """Wait for all queued items to pass through every stage."""
+        self.queues[0].put(DONE)
+        for thread in self._threads:
+            thread.join()
+        self._stopped.set()
+        self.log_stats()
+        if raise_error and self.error is not None:
+            raise self.error
+
+    def queue_depths(self) -> dict:
+        return {
+            stage.name: inbox.qsize() for stage, inbox in zip(self.stages, self.queues)
+        }
+
+    def log_stats(self) -> None:
+        for stage in self.stages:
+            logger.info(
+                f"Pipeline stage {stage.name}: {stage.processed} items, "
+                f"max queue depth {stage.max_queue_depth}"
+            )
+
+    def _report(self) -> None:
+        while not self._stopped.wait(self.report_interval):
+            logger.info(f"Pipeline queue depths: {self.queue_depths()}")
+
+    def _next_batch(self, index: int) -> Tuple[list, bool]:
+        """Block for one item, then take up to batch_size without waiting.
+
+        Returns: (batch, whether DONE was reached)
+        """
+        stage, inbox = self.stages[index], self.queues[index]
+        stage.max_queue_depth = max(stage.max_queue_depth, inbox.qsize())
+        item = inbox.get()
+        if item is DONE:
+            return [], True
+        batch = [item]
+        while len(batch) < stage.batch_size:
+            try:
+                item = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run_stage(self, index: int) -> None:
+        stage = self.stages[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        try:
+            done = False
+            while not done:
+                batch, done = self._next_batch(index)
+                if not batch or self.failed.is_set():
+                    continue
+                try:
+                    results = stage.handler(batch)
+                except Exception as e:
+                    logger.exception(f"Pipeline stage {stage.name} failed")
+                    self.error = self.error or e
+                    self.failed.set()
+                    continue
+                stage.processed += len(batch)
+                if outbox is not None:
+                    for result in results:
+                        outbox.put(result)
+            if stage.on_finish:
+                stage.on_finish()
+        except Exception as e:
+            logger.exception(f"Pipeline stage {stage.name} failed to finish")
+            self.error = self.error or e
+            self.failed.set()
+        finally:
+            if outbox is not None:
+                outbox.put(DONE)
+            # Each stage thread has its own database connection
+            db.connection.close()
@@ -1,8 +1,12 @@
 from django.conf import settings
-from azure.storage.blob import BlobServiceClient
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobProperties, BlobServiceClient
 from pathlib import Path
 from etl.providers.base import ImportProvider
+from etl.providers.cache import ArchiveCache
+from etl.providers.download import RangedDownload
 from tempfile import NamedTemporaryFile
+from typing import Iterator
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,45 +33,87 @@ class AzureServiceProvider(ImportProvider):
         self._file_size = None
         self.pst_blob = None
         self.valid = None
+        self._cached = None
 
-    def _setup(self):
-        """Establish Azure services and run validations."""
+    def _connect(self):
+        """Establish Azure services."""
         if not self._client:
             logger.info(f"Initiating Azure service client for {self.account_url}")
             self._service = BlobServiceClient(
                 account_url=self.account_url, credential=settings.AZURE_BLOB_KEY
             )
             self._client = self._service.get_container_client(self.container)
+
+    def _setup(self):
+        """Establish Azure services and run validations."""
+        self._connect()
         if self.valid is None:
             self.valid = self._validate()
 
     def _validate(self) -> bool:
         """Obtain blob metadata and set blob state."""
-        for b in self._client.list_blobs():
-            if b.name == self.pst_blob_name:
-                self.pst_blob = b
-                self._file_size = self.pst_blob.size
-                return True
-        return False
+        try:
+            blob_client = self._client.get_blob_client(self.pst_blob_name)
+            self.pst_blob = blob_client.get_blob_properties()
+        except ResourceNotFoundError:
+            return False
+        self._file_size = self.pst_blob.size
+        return True
+
+    def list_blobs(self) -> Iterator[BlobProperties]:
+        """Iterate over every blob in the container, a page of results at a time."""
+        self._connect()
+        return self._client.list_blobs(
+            results_per_page=settings.BLOB_INVENTORY_PAGE_SIZE
+        )
 
     def _get_file(self):
-        tmp_file = NamedTemporaryFile(delete=False, prefix="ratom-")
-        logger.info(f"Downloading to {tmp_file.name}")
-        with Path(tmp_file.name).open(mode="wb") as fh:
-            blob_data = self._client.download_blob(self.pst_blob)
-            blob_data.readinto(fh)
+        """Get the blob from the archive cache, or download it to a temporary file."""
+        if settings.ARCHIVE_CACHE_MAX_BYTES:
+            cache = ArchiveCache(
+                settings.ARCHIVE_CACHE_DIR, settings.ARCHIVE_CACHE_MAX_BYTES
+            )
+            self._cached = cache.open(
+                self.container, self.pst_blob_name, self.pst_blob.etag, self._download
+            )
+            self._data = self._cached.path
+            self.crypt_hash = self._cached.crypt_hash
+            return
+        with NamedTemporaryFile(delete=False, prefix="ratom-") as tmp_file:
             self._data = tmp_file.name
+        self.crypt_hash = self._download(self._data)
+
+    def _download(self, path: str) -> str:
+        """Download the blob to path, hashing it as it arrives.
+
+        Returns: SHA-256 hex digest of the blob
+        """
+        logger.info(f"Downloading to {path}")
+        download = RangedDownload(
+            self._client,
+            self.pst_blob,
+            path,
+            chunk_size=settings.AZURE_DOWNLOAD_CHUNK_SIZE,
+            max_concurrency=settings.AZURE_DOWNLOAD_CONCURRENCY,
+        )
+        crypt_hash = download.run()
         logger.info("Download complete")
+        return crypt_hash
 
     def open(self):
         self._setup()
         self._get_file()
-        logger.info(f"Generating cryptographic hash of {self._data}")
-        self.hash_file()
         super().open()
-        # Clean up temporary file once it is finished
-        logger.info(f"Deleting temporary file {self._data}")
-        Path(self._data).unlink()
+
+    def close(self):
+        if self._cached:
+            # Keep the cached archive for retries, but allow it to be evicted
+            self._cached.release()
+            return
+        # Clean up temporary file once the import is finished
+        if self._data and Path(self._data).exists():
+            logger.info(f"Deleting temporary file {self._data}")
+            Path(self._data).unlink()
 
     @property
     def path(self):
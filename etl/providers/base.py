@@ -25,6 +25,10 @@ class ImportProvider:
         logger.info(f"Opening archive {self._data} with provider")
         self.pff_archive = PffArchive(self._data)
 
+    def close(self) -> None:
+        """Release any local resources once the import is finished."""
+        pass
+
     def hash_file(self):
         with Path(self._data).open(mode="rb") as fh:
             di = sha256()
@@ -36,6 +40,11 @@ class ImportProvider:
                 break
             self.crypt_hash = di.hexdigest()
 
+    @property
+    def archive_path(self) -> str:
+        """Local filesystem path of the opened archive."""
+        return self._data
+
     @property
     def path(self):
         pass
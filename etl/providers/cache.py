@@ -0,0 +1,194 @@
+from hashlib import sha256
+from pathlib import Path
+from typing import Callable, Dict
+import fcntl
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class CachedArchive:
+    """A cache entry in use. The entry can't be evicted until release() is called."""
+
+    def __init__(self, path: str, crypt_hash: str, lock_fd: int, hit: bool):
+        self.path = path
+        self.crypt_hash = crypt_hash
+        self.hit = hit
+        self._lock_fd = lock_fd
+
+    def release(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+class ArchiveCache:
+    """
+    A least recently used disk cache of downloaded archives.
+
+    Entries are keyed by container, blob name and etag, so a blob that changes is
+    downloaded again. Each entry is the archive plus a sidecar file with its SHA-256,
+    written once the download is complete.
+
+    Entries are locked with flock() on two lock files. An entry in use holds a
+    shared lock on its .lock file, which eviction needs exclusively, so it's never
+    evicted. A download holds an exclusive lock on the entry's .download file
+    only while fetching the archive and moving it into place, so concurrent
+    imports of the same blob wait for one download rather than making their own,
+    but not for each other's imports. Lock files are removed along with their
+    entry, or once the download finishes.
+
+    Once a download finishes, the least recently used entries are evicted until
+    the cache fits in max_bytes. Hit and miss counts are kept in stats.json.
+
+    Usage:
+        >>> entry = cache.open("container", "inbox.pst", etag, download)
+        >>> PffArchive(entry.path)
+        >>> entry.release()
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(container: str, name: str, etag: str) -> str:
+        return sha256(f"{container}/{name}@{etag}".encode()).hexdigest()
+
+    def _paths(self, key: str):
+        data = self.directory / f"{key}.pst"
+        return data, data.with_suffix(".sha256"), data.with_suffix(".lock")
+
+    @staticmethod
+    def _lock(path: Path, operation: int) -> int:
+        """Open and flock() path, returning the file descriptor.
+
+        Lock files are unlinked while locked, so if path was removed (or replaced)
+        while we waited for the lock, the lock is retaken on the current file.
+        """
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, operation)
+                current = os.stat(path).st_ino == os.fstat(fd).st_ino
+            except FileNotFoundError:
+                current = False
+            except BaseException:
+                os.close(fd)
+                raise
+            if current:
+                return fd
+            os.close(fd)
+
+    def open(
+        self, container: str, name: str, etag: str, download: Callable[[str], str]
+    ) -> CachedArchive:
+        """Return the cached archive, calling download(path) to fetch it on a miss.
+
+        download() must write the archive to path and return its SHA-256.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        key = self.key(container, name, etag)
+        data, sidecar, lock = self._paths(key)
+        # In use until release()
+        lock_fd = self._lock(lock, fcntl.LOCK_SH)
+        try:
+            hit = sidecar.exists() or not self._download_once(data, sidecar, download)
+            if hit:
+                os.utime(data)  # most recently used
+            self._record(hit, name)
+            if not hit:
+                self.evict()
+            return CachedArchive(str(data), sidecar.read_text(), lock_fd, hit)
+        except BaseException:
+            os.close(lock_fd)
+            raise
+
+    def _download_once(
+        self, data: Path, sidecar: Path, download: Callable[[str], str]
+    ) -> bool:
+        """Download the entry, unless another process did while we waited.
+
+        Returns: whether this process downloaded it
+        """
+        download_lock = data.with_suffix(".download")
+        download_fd = self._lock(download_lock, fcntl.LOCK_EX)
+        try:
+            if sidecar.exists():
+                return False
+            self._download(data, sidecar, download)
+            return True
+        finally:
+            download_lock.unlink()
+            os.close(download_fd)
+
+    def _download(self, data: Path, sidecar: Path, download: Callable[[str], str]):
+        partial = data.with_suffix(".part")
+        try:
+            crypt_hash = download(str(partial))
+            os.replace(partial, data)
+        finally:
+            if partial.exists():
+                partial.unlink()
+        sidecar.write_text(crypt_hash)
+
+    def entries(self):
+        """Complete entries, least recently used first."""
+        entries = []
+        for sidecar in self.directory.glob("*.sha256"):
+            data = sidecar.with_suffix(".pst")
+            try:
+                stat = data.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, data))
+        return sorted(entries)
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> None:
+        """Remove least recently used entries that aren't in use until within max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, data in entries:
+            if total <= self.max_bytes:
+                break
+            lock = data.with_suffix(".lock")
+            try:
+                lock_fd = self._lock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            try:
+                sidecar = data.with_suffix(".sha256")
+                # Unless another process evicted it first
+                if sidecar.exists():
+                    sidecar.unlink()
+                    data.unlink()
+                    total -= size
+                    logger.info(f"Evicted {data} ({size} bytes) from the archive cache")
+                lock.unlink()
+            finally:
+                os.close(lock_fd)
+
+    def stats(self) -> Dict[str, int]:
+        try:
+            return json.loads((self.directory / "stats.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return {"hits": 0, "misses": 0}
+
+    def _record(self, hit: bool, name: str) -> None:
+        lock_fd = os.open(self.directory / "stats.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            stats = self.stats()
+            stats["hits" if hit else "misses"] += 1
+            (self.directory / "stats.json").write_text(json.dumps(stats))
+        finally:
+            os.close(lock_fd)
+        logger.info(
+            f"Archive cache {'hit' if hit else 'miss'} for {name} "
+            f"(hits={stats['hits']}, misses={stats['misses']})"
+        )
@@ -0,0 +1,130 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import md5, sha256
+from typing import Tuple
+import logging
+import os
+import time
+
+from azure.core import MatchConditions
+
+from etl.providers.base import ImportProviderError
+
+logger = logging.getLogger(__name__)
+
+
+class RangedDownload:
+    """
+    Download a blob to a local file with concurrent ranged requests.
+
+    The file is preallocated to the blob's size and each range is written at its
+    offset as soon as it arrives. Ranges are hashed (SHA-256, plus MD5 when the blob
+    reports a Content-MD5) in order as they complete, so the file does not have to be
+    read back from disk to hash it. At most `max_concurrency * 2` ranges are held in
+    memory while they wait to be hashed.
+
+    :keyword:
+       client -- an azure.storage.blob.ContainerClient (or anything with its download_blob())
+       blob -- the blob's BlobProperties
+       path (str) -- the local file to download to
+       chunk_size (int) -- bytes per ranged request
+       max_concurrency (int) -- number of ranges to download at once
+    """
+
+    def __init__(self, client, blob, path: str, chunk_size: int, max_concurrency: int):
+        self.client = client
+        self.blob = blob
+        self.path = path
+        self.size = blob.size
+        self.chunk_size = max(chunk_size, 1)
+        self.max_concurrency = max(max_concurrency, 1)
+        content_settings = getattr(blob, "content_settings", None)
+        self.content_md5 = getattr(content_settings, "content_md5", None)
+        self.etag = getattr(blob, "etag", None)
+        self.bytes_hashed = 0
+
+    def ranges(self):
+        for offset in range(0, self.size, self.chunk_size):
+            yield offset, min(self.chunk_size, self.size - offset)
+
+    def run(self) -> str:
+        """Download the blob and validate it.
+
+        Returns: SHA-256 hex digest of the blob's content
+        """
+        started = time.monotonic()
+        crypt_hash = sha256()
+        content_hash = md5() if self.content_md5 else None
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            self._preallocate(fd)
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                pending = deque()
+                for offset, length in self.ranges():
+                    pending.append(executor.submit(self._fetch, fd, offset, length))
+                    if len(pending) >= self.max_concurrency * 2:
+                        self._hash(pending.popleft(), crypt_hash, content_hash)
+                while pending:
+                    self._hash(pending.popleft(), crypt_hash, content_hash)
+        finally:
+            os.close(fd)
+        self._validate(content_hash)
+        elapsed = time.monotonic() - started
+        rate = self.size / elapsed / 2 ** 20 if elapsed else 0
+        logger.info(
+            f"Downloaded {self.size} bytes in {elapsed:.1f}s ({rate:.1f} MiB/s, "
+            f"max_concurrency={self.max_concurrency})"
+        )
+        return crypt_hash.hexdigest()
+
+    def _preallocate(self, fd: int) -> None:
+        if not self.size:
+            return
+        try:
+            os.posix_fallocate(fd, 0, self.size)
+        except (AttributeError, OSError):
+            # Not available on this platform or filesystem, fall back to a sparse file
+            os.ftruncate(fd, self.size)
+
+    def _fetch(self, fd: int, offset: int, length: int) -> Tuple[int, bytes]:
+        """Download one range and write it at its offset, in a worker thread."""
+        kwargs = {}
+        if self.etag:
+            # Fail rather than mix ranges of two versions of the blob
+            kwargs = {
+                "etag": self.etag,
+                "match_condition": MatchConditions.IfNotModified,
+            }
+        data = self.client.download_blob(
+            self.blob, offset=offset, length=length, **kwargs
+        ).readall()
+        if len(data) != length:
+            raise ImportProviderError(
+                message=f"Expected {length} bytes at offset {offset}, got {len(data)}",
+                error="Blob download failed",
+            )
+        view = memoryview(data)
+        written = 0
+        while written < length:
+            written += os.pwrite(fd, view[written:], offset + written)
+        return offset, data
+
+    def _hash(self, future: Future, crypt_hash, content_hash) -> None:
+        offset, data = future.result()
+        crypt_hash.update(data)
+        if content_hash:
+            content_hash.update(data)
+        self.bytes_hashed += len(data)
+        logger.debug(f"Downloaded {self.bytes_hashed} of {self.size} bytes")
+
+    def _validate(self, content_hash) -> None:
+        if self.bytes_hashed != self.size:
+            raise ImportProviderError(
+                message=f"Downloaded {self.bytes_hashed} of {self.size} bytes",
+                error="Blob download failed",
+            )
+        if content_hash and content_hash.digest() != bytes(self.content_md5):
+            raise ImportProviderError(
+                message="Downloaded content does not match the blob's Content-MD5",
+                error="Blob download failed",
+            )
@@ -1,22 +1,57 @@
 from celery import shared_task
 from celery.utils.log import logger
+from django.conf import settings
 from etl.importer import import_psts
+from etl.inventory import refresh_blob_inventory
 
 from core.models import File
 
 
-@shared_task
+@shared_task(bind=True, max_retries=settings.IMPORT_TASK_MAX_RETRIES)
 def import_file_task(
-    paths: [str], account: str, clean=False, clean_file=False, is_remote=True
+    self,
+    paths: [str],
+    account: str,
+    clean=False,
+    clean_file=False,
+    is_remote=True,
+    chunk_size=None,
+    workers=None,
+    pipeline=None,
+    resume=False,
+    duplicates=None,
+    scan_only=False,
 ):
-    import_psts(
+    """Import paths, retrying any that fail by resuming from their checkpoint."""
+    failed = import_psts(
         paths=paths,
         account=account,
         clean=clean,
         clean_file=clean_file,
         is_background=True,
         is_remote=True,
+        chunk_size=chunk_size,
+        workers=workers,
+        pipeline=pipeline,
+        resume=resume,
+        duplicates=duplicates,
+        scan_only=scan_only,
     )
+    if failed:
+        logger.warning(f"Retrying failed import of {failed}")
+        raise self.retry(
+            kwargs={
+                "paths": failed,
+                "account": account,
+                "is_remote": is_remote,
+                "chunk_size": chunk_size,
+                "workers": workers,
+                "pipeline": pipeline,
+                "resume": True,
+                "duplicates": duplicates,
+            },
+            countdown=settings.IMPORT_TASK_RETRY_DELAY,
+        )
 
 
 @shared_task
@@ -37,3 +72,11 @@ def remove_file_task(files: []):
         f.delete()
         if f.account.files.count() == 0:
             f.account.delete()
+
+
+@shared_task
+def refresh_blob_inventory_task():
+    """List the cloud storage container into core.Blob (see CELERY_BEAT_SCHEDULE)."""
+    if not settings.AZURE_URL:
+        return
+    refresh_blob_inventory()
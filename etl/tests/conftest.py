@@ -58,6 +58,7 @@ def archive_msg(empty_message):
     empty_message.delivery_time = dt.datetime(2020, 1, 1)
     empty_message.identifier = 2097220
     empty_message.plain_text_body = "Hello, World!"
+    empty_message.number_of_attachments = 0
     empty_message.transport_headers = "\r\n".join(headers)
     yield empty_message
 
@@ -67,9 +68,23 @@ def archive_folder(archive_msg):
     """A mock pypff folder with archive_msg in it."""
     folder = mock.Mock()
     folder.name = "Inbox"
+    folder.identifier = 8354
     folder.get_number_of_sub_messages.return_value = 1
     folder.sub_messages = mock.Mock()
     folder.sub_messages = [archive_msg]
+    folder.sub_folders = []
+    yield folder
+
+
+@pytest.fixture
+def root_folder(archive_folder):
+    """A mock pypff root folder, with archive_folder in it."""
+    folder = mock.Mock()
+    folder.name = ""
+    folder.identifier = 290
+    folder.get_number_of_sub_messages.return_value = 0
+    folder.sub_messages = []
+    folder.sub_folders = [archive_folder]
     yield folder
 
 
@@ -95,20 +110,45 @@ def email_message_w_bad_header(archive_msg):
 
 
 @pytest.fixture()
-def test_archive(archive_folder):
-    """A mock pypff archive with ."""
+def test_archive(root_folder, archive_folder):
+    """A mock pypff archive with archive_folder in it."""
     with mock.patch("etl.providers.base.PffArchive") as _mock:
         archive = _mock.return_value
         archive.message_count = 1
-        archive.folders.return_value = [archive_folder]
+        archive.folders.return_value = [root_folder, archive_folder]
         archive.format_message = mock.MagicMock(side_effect=PffArchive.format_message)
         yield _mock
 
 
+def fake_entity(label):
+    entity = mock.Mock()
+    entity.label_ = label
+    return entity
+
+
+@pytest.fixture
+def spacy_model():
+    """A mock spaCy model that finds an entity for each all-caps word (e.g. "ORG").
+
+    The entity's label is the word itself, so texts name the labels they get.
+    """
+    model = mock.MagicMock()
+    model.pipe_names = ["tagger", "parser", "ner"]
+
+    def pipe(texts, **kwargs):
+        for text in texts:
+            document = mock.Mock()
+            document.ents = [fake_entity(w) for w in text.split() if w.isupper()]
+            yield document
+
+    model.pipe.side_effect = pipe
+    yield model
+
+
 @pytest.fixture()
-def pst_importer(account, local_file, test_archive):
+def pst_importer(account, local_file, test_archive, spacy_model):
     """PstImporter instance"""
-    importer = PstImporter(local_file, account, mock.MagicMock())
+    importer = PstImporter(local_file, account, spacy_model)
     importer.get_folder_abs_path = mock.MagicMock(return_value="/Important/Project/")
     yield importer
 
@@ -0,0 +1,100 @@
+from hashlib import sha256
+import os
+
+import pytest
+from unittest import mock
+
+from etl.providers.cache import ArchiveCache
+
+
+def fake_download(content):
+    def download(path):
+        with open(path, "wb") as fh:
+            fh.write(content)
+        return sha256(content).hexdigest()
+
+    return mock.Mock(side_effect=download)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    yield ArchiveCache(tmp_path / "cache", max_bytes=100)
+
+
+def test_open__miss_then_hit(cache):
+    download = fake_download(b"archive")
+    first = cache.open("psts", "inbox.pst", "etag1", download)
+    first.release()
+    second = cache.open("psts", "inbox.pst", "etag1", download)
+    second.release()
+    assert download.call_count == 1
+    assert not first.hit
+    assert second.hit
+    assert second.path == first.path
+    assert second.crypt_hash == sha256(b"archive").hexdigest()
+    assert open(second.path, "rb").read() == b"archive"
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_open__new_etag_downloads_again(cache):
+    download = fake_download(b"archive")
+    cache.open("psts", "inbox.pst", "etag1", download).release()
+    cache.open("psts", "inbox.pst", "etag2", download).release()
+    assert download.call_count == 2
+
+
+def test_open__failed_download_not_cached(cache):
+    download = mock.Mock(side_effect=IOError)
+    with pytest.raises(IOError):
+        cache.open("psts", "inbox.pst", "etag1", download)
+    assert cache.entries() == []
+    entry = cache.open("psts", "inbox.pst", "etag1", fake_download(b"archive"))
+    assert not entry.hit
+    entry.release()
+
+
+def test_evict__least_recently_used(cache):
+    """Entries are evicted oldest first until the cache fits its budget."""
+    old = cache.open("psts", "old.pst", "1", fake_download(b"o" * 60))
+    old.release()
+    os.utime(old.path, (0, 0))
+    cache.open("psts", "new.pst", "1", fake_download(b"n" * 60)).release()
+    assert not os.path.exists(old.path)
+    assert cache.size() == 60
+
+
+def test_evict__removes_lock_files(cache):
+    old = cache.open("psts", "old.pst", "1", fake_download(b"o" * 60))
+    old.release()
+    os.utime(old.path, (0, 0))
+    new = cache.open("psts", "new.pst", "1", fake_download(b"n" * 60))
+    new.release()
+    assert sorted(path.name for path in cache.directory.glob("*.*")) == sorted(
+        [
+            os.path.basename(new.path),
+            f"{os.path.splitext(os.path.basename(new.path))[0]}.sha256",
+            f"{os.path.splitext(os.path.basename(new.path))[0]}.lock",
+            "stats.json",
+            "stats.lock",
+        ]
+    )
+
+
+def test_open__doesnt_wait_for_other_imports(cache):
+    """An entry in use doesn't block another import of it from downloading."""
+    in_use = cache.open("psts", "inbox.pst", "1", fake_download(b"archive"))
+    os.unlink(in_use.path.replace(".pst", ".sha256"))
+    again = cache.open("psts", "inbox.pst", "1", fake_download(b"archive"))
+    assert not again.hit
+    in_use.release()
+    again.release()
+
+
+def test_evict__skips_entries_in_use(cache):
+    in_use = cache.open("psts", "old.pst", "1", fake_download(b"o" * 60))
+    os.utime(in_use.path, (0, 0))
+    cache.open("psts", "new.pst", "1", fake_download(b"n" * 60)).release()
+    assert os.path.exists(in_use.path)
+    in_use.release()
+    cache.evict()
+    assert not os.path.exists(in_use.path)
@@ -0,0 +1,87 @@
+from hashlib import sha256
+
+import pytest
+from unittest import mock
+
+from core import models as ratom
+from core.tests import factories
+from etl.importer import DuplicatePolicy, import_psts
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def imported_file(account_2):
+    """A completely imported ratom.File of the same archive as local_file."""
+    ratom_file = factories.FileFactory(
+        account=account_2,
+        sha256=sha256(b"CONTENT").hexdigest(),
+        import_status=ratom.File.COMPLETE,
+        unique_paths=["/Inbox"],
+    )
+    yield ratom_file
+
+
+def test_run__duplicate_skipped(pst_importer, imported_file):
+    pst_importer.duplicates = DuplicatePolicy.SKIP
+    pst_importer.run()
+    assert pst_importer.skipped
+    assert list(ratom.File.objects.all()) == [imported_file]
+
+
+def test_run__duplicate_skipped__partial_import(pst_importer, imported_file):
+    """A partially imported file is left FAILED, not IMPORTING."""
+    pst_importer.duplicates = DuplicatePolicy.SKIP
+    pst_importer.initializing_stage()
+    ratom_file = pst_importer.ratom_file
+    ratom_file.import_status = ratom.File.FAILED
+    ratom_file.save()
+    factories.MessageFactory(file=ratom_file, account=ratom_file.account)
+    pst_importer.run()
+    assert pst_importer.skipped
+    ratom_file.refresh_from_db()
+    assert ratom_file.import_status == ratom.File.FAILED
+    assert ratom_file.errors[-1]["name"] == "Duplicate archive skipped"
+
+
+def test_run__duplicate_forced(pst_importer, imported_file):
+    pst_importer.duplicates = DuplicatePolicy.FORCE
+    pst_importer.run()
+    assert not pst_importer.skipped
+    assert pst_importer.ratom_file.import_status == ratom.File.COMPLETE
+    assert pst_importer.ratom_file.message_set.count() == 1
+
+
+def test_run__duplicate_linked(pst_importer, imported_file):
+    """Messages are copied with their importer labels but not review decisions."""
+    org = factories.LabelFactory(name="ORG", type=ratom.Label.IMPORTER)
+    user_label = factories.LabelFactory(name="Keep", type=ratom.Label.USER)
+    message = factories.MessageFactory(
+        file=imported_file, account=imported_file.account
+    )
+    message.audit.labels.add(org, user_label)
+    message.audit.is_restricted = True
+    message.audit.save()
+    pst_importer.duplicates = DuplicatePolicy.LINK
+    pst_importer.run()
+    ratom_file = pst_importer.ratom_file
+    assert ratom_file.import_status == ratom.File.COMPLETE
+    assert ratom_file.unique_paths == ["/Inbox"]
+    copy = ratom_file.message_set.get()
+    assert copy.pk != message.pk
+    assert copy.source_id == str(message.source_id)
+    assert copy.account == pst_importer.account
+    assert list(copy.audit.labels.all()) == [org]
+    assert not copy.audit.is_restricted
+    assert imported_file.message_set.get() == message
+
+
+def test_import_psts__skip_removes_new_account(
+    test_archive, spacy_model, local_file, imported_file
+):
+    with mock.patch("etl.importer.load_nlp_model", return_value=spacy_model):
+        failed = import_psts(
+            [local_file.path], "New Account", clean=False, duplicates="skip"
+        )
+    assert failed == []
+    assert not ratom.Account.objects.filter(title="New Account").exists()
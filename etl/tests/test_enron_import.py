@@ -86,12 +86,15 @@ def enron_dataset_bill_rap() -> Path:
     os.getenv("TEST_ENRON_DATA_SET", "false") == "false",
     reason="TEST_ENRON_DATA_SET is not set to 'true'",
 )
-def test_import_enron_dataset_bill_rap(enron_dataset_bill_rap):
+# chunk_size=1 approximates the former one-message-at-a-time writes
+@pytest.mark.parametrize("chunk_size", [1, 500])
+def test_import_enron_dataset_bill_rap(enron_dataset_bill_rap, chunk_size):
     """Run full-stack test against Enron's Bill Rap account."""
     path = FilesystemProvider(
         file_path=enron_dataset_bill_rap / "bill_rapp_000_1_1.pst"
     )
-    import_psts([path.path], "bill_rap", clean=True)
+    # PstImporter logs its throughput (msgs/sec) when it finishes
+    import_psts([path.path], "bill_rap", clean=True, chunk_size=chunk_size)
     assert ratom.Account.objects.count() == 1
     assert ratom.File.objects.count() == 1
     bill_rap = ratom.File.objects.get()
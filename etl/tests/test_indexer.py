@@ -0,0 +1,191 @@
+import pytest
+from unittest import mock
+
+from django.core.cache import cache
+
+from core import models as ratom
+from etl.importer import PstImporter
+from etl.message.indexer import BulkIndexer
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Refresh suspensions are counted in the cache."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def document(mock_indexer_registry):
+    document = mock.MagicMock()
+    document._index._name = "message"
+    document._get_actions.side_effect = lambda messages, action: (
+        {"_op_type": action, "_id": message} for message in messages
+    )
+    connection = document._get_connection.return_value
+    connection.indices.get_settings.return_value = {
+        "message-v1": {"settings": {"index": {"refresh_interval": "5s"}}}
+    }
+    mock_indexer_registry.get_documents.return_value = [
+        mock.Mock(return_value=document)
+    ]
+    yield document
+
+
+@pytest.fixture
+def mock_streaming_bulk():
+    with mock.patch("etl.message.indexer.streaming_bulk") as mock_streaming_bulk:
+        mock_streaming_bulk.return_value = iter([])
+        yield mock_streaming_bulk
+
+
+def test_start__suspends_refresh(document, settings):
+    settings.ELASTICSEARCH_DSL_AUTOSYNC = True
+    indexer = BulkIndexer(threads=1)
+    indexer.start()
+    # Only the writer's own saves skip autosync
+    assert settings.ELASTICSEARCH_DSL_AUTOSYNC is True
+    document._get_connection.return_value.indices.put_settings.assert_called_once_with(
+        index="message", body={"index": {"refresh_interval": "-1"}}
+    )
+    indexer.stop()
+
+
+def test_stop__restores_refresh(document):
+    indexer = BulkIndexer(threads=1)
+    indexer.start()
+    indexer.stop()
+    indexer.stop()  # idempotent
+    indices = document._get_connection.return_value.indices
+    assert indices.put_settings.call_args_list[-1] == mock.call(
+        index="message", body={"index": {"refresh_interval": "5s"}}
+    )
+    indices.refresh.assert_called_once_with(index="message")
+    indices.forcemerge.assert_not_called()
+
+
+def test_stop__previously_suspended_refresh_restores_default(document):
+    """An import that started during another restores the default, not -1."""
+    indices = document._get_connection.return_value.indices
+    indices.get_settings.return_value = {
+        "message-v1": {"settings": {"index": {"refresh_interval": "-1"}}}
+    }
+    indexer = BulkIndexer(threads=1)
+    indexer.start()
+    indexer.stop()
+    assert indices.put_settings.call_args_list[-1] == mock.call(
+        index="message", body={"index": {"refresh_interval": None}}
+    )
+
+
+def test_stop__overlapping_imports(document):
+    """refresh_interval is restored once the last overlapping import stops."""
+    indices = document._get_connection.return_value.indices
+    first, second = BulkIndexer(threads=1), BulkIndexer(threads=1)
+    first.start()
+    second.start()
+    first.stop(force_merge=True)
+    assert indices.put_settings.call_args_list[-1] == mock.call(
+        index="message", body={"index": {"refresh_interval": "-1"}}
+    )
+    indices.forcemerge.assert_not_called()
+    second.stop(force_merge=True)
+    assert indices.put_settings.call_args_list[-1] == mock.call(
+        index="message", body={"index": {"refresh_interval": "5s"}}
+    )
+    indices.get_settings.assert_called_once()
+    indices.forcemerge.assert_called_once()
+
+
+def test_stop__force_merge(document):
+    indexer = BulkIndexer(threads=1)
+    indexer.start()
+    indexer.stop(force_merge=True)
+    document._get_connection.return_value.indices.forcemerge.assert_called_once_with(
+        index="message", max_num_segments=1
+    )
+
+
+def test_index__sends_bulk_actions(document, mock_streaming_bulk):
+    indexer = BulkIndexer(threads=2, max_retries=3)
+    indexer.start()
+    indexer.index([1, 2])
+    indexer.stop()
+    mock_streaming_bulk.assert_called_once()
+    args, kwargs = mock_streaming_bulk.call_args
+    assert args[0] is document._get_connection.return_value
+    assert [action["_id"] for action in args[1]] == [1, 2]
+    assert kwargs["max_retries"] == 3
+    assert kwargs["raise_on_error"] is False
+    assert indexer.indexed == 2
+
+
+def test_index__counts_failures(document, mock_streaming_bulk):
+    mock_streaming_bulk.return_value = iter([(False, {"index": {"_id": 2}})])
+    indexer = BulkIndexer(threads=1)
+    indexer.start()
+    indexer.index([1, 2])
+    indexer.stop()
+    assert indexer.failed == 1
+
+
+def test_index__not_running(document, mock_streaming_bulk):
+    indexer = BulkIndexer(threads=1)
+    indexer.index([1])
+    mock_streaming_bulk.assert_not_called()
+
+
+def test_shard_worker__leaves_refresh_to_parent(document, mock_streaming_bulk):
+    indexer = BulkIndexer(threads=1, suspend_refresh=False)
+    indexer.start()
+    indexer.index([1])
+    indexer.stop()
+    indices = document._get_connection.return_value.indices
+    indices.put_settings.assert_not_called()
+    indices.refresh.assert_not_called()
+    mock_streaming_bulk.assert_called_once()
+
+
+@pytest.mark.django_db
+def test_importer__bulk_indexes_messages(
+    account,
+    local_file,
+    test_archive,
+    spacy_model,
+    document,
+    mock_streaming_bulk,
+    settings,
+):
+    """Imported messages are bulk indexed and the index is force merged on success."""
+    settings.IMPORT_FORCE_MERGE = True
+    importer = PstImporter(local_file, account, spacy_model, bulk_index=True)
+    importer.run()
+    assert importer.ratom_file.import_status == ratom.File.COMPLETE
+    assert indexer_ids(mock_streaming_bulk) == [
+        str(message.pk) for message in importer.ratom_file.message_set.all()
+    ]
+    document._get_connection.return_value.indices.forcemerge.assert_called_once()
+    assert not importer.indexer.running
+
+
+def indexer_ids(mock_streaming_bulk):
+    return [
+        str(action["_id"].pk)
+        for call in mock_streaming_bulk.call_args_list
+        for action in call[0][1]
+    ]
+
+
+@pytest.mark.django_db
+def test_importer__index_restore_failure(
+    account, local_file, test_archive, spacy_model, document, mock_streaming_bulk
+):
+    """A failure restoring the index is recorded, the file is still COMPLETE."""
+    indices = document._get_connection.return_value.indices
+    indices.refresh.side_effect = ConnectionError("Elasticsearch is down")
+    importer = PstImporter(local_file, account, spacy_model, bulk_index=True)
+    importer.run()
+    ratom_file = ratom.File.objects.get()
+    assert ratom_file.import_status == ratom.File.COMPLETE
+    assert ratom_file.errors[-1]["name"] == "stop_indexing() failed"
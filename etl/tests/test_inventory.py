@@ -0,0 +1,60 @@
+import datetime as dt
+
+import pytest
+from unittest import mock
+
+from core.models import Blob
+from etl.inventory import refresh_blob_inventory
+
+pytestmark = pytest.mark.django_db
+
+
+def blob_properties(name, etag, size=100):
+    properties = mock.Mock()
+    properties.name = name
+    properties.etag = etag
+    properties.size = size
+    properties.last_modified = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+    return properties
+
+
+@pytest.fixture
+def provider():
+    provider = mock.Mock()
+    provider.container = "psts"
+    yield provider
+
+
+def test_refresh__creates_blobs(provider):
+    provider.list_blobs.return_value = [
+        blob_properties("a.pst", "1"),
+        blob_properties("b.pst", "1"),
+    ]
+    counts = refresh_blob_inventory(provider)
+    assert counts == {"created": 2, "updated": 0, "removed": 0}
+    assert list(Blob.objects.values_list("name", flat=True)) == ["a.pst", "b.pst"]
+
+
+def test_refresh__updates_and_removes(provider):
+    provider.list_blobs.return_value = [
+        blob_properties("a.pst", "1"),
+        blob_properties("b.pst", "1"),
+    ]
+    refresh_blob_inventory(provider)
+    provider.list_blobs.return_value = [
+        blob_properties("b.pst", "2", size=200),
+        blob_properties("c.pst", "1"),
+    ]
+    counts = refresh_blob_inventory(provider)
+    assert counts == {"created": 1, "updated": 1, "removed": 1}
+    assert Blob.objects.get(name="b.pst").size == 200
+    assert not Blob.objects.filter(name="a.pst").exists()
+
+
+def test_refresh__other_containers_untouched(provider):
+    Blob.objects.create(
+        container="other", name="a.pst", last_seen=dt.datetime.now(dt.timezone.utc)
+    )
+    provider.list_blobs.return_value = []
+    refresh_blob_inventory(provider)
+    assert Blob.objects.filter(container="other").exists()
@@ -1,9 +1,12 @@
 import pytest
 from unittest import mock
 
+from celery.exceptions import Retry
 from django.core.management import call_command
 from django.core.management.base import CommandError
 
+from etl.tasks import import_file_task
+
 
 @pytest.fixture(scope="function")
 def mock_import_psts():
@@ -13,7 +16,7 @@ def mock_import_psts():
 
 @pytest.fixture(scope="function")
 def mock_task_import_psts():
-    with mock.patch("etl.tasks.import_psts") as mock_import:
+    with mock.patch("etl.tasks.import_psts", return_value=[]) as mock_import:
         yield mock_import
 
 
@@ -47,3 +50,19 @@ def test_import_psts__detach(mock_task_import_psts, local_file):
     assert mock_task_import_psts.called
     assert mock_task_import_psts.call_args[1]["is_background"]
     assert mock_task_import_psts.call_args[1]["is_remote"]
+
+
+def test_import_psts__resume(mock_import_psts, local_file):
+    call_command("import_psts", local_file, resume=True, account=local_file.file_name)
+    assert mock_import_psts.call_args[1]["resume"]
+
+
+def test_import_file_task__retry_resumes(mock_task_import_psts):
+    """Failed paths are retried with resume=True."""
+    mock_task_import_psts.return_value = ["failed.pst"]
+    with mock.patch.object(import_file_task, "retry", side_effect=Retry) as retry:
+        with pytest.raises(Retry):
+            import_file_task(["ok.pst", "failed.pst"], "account", clean_file=True)
+    assert retry.call_args[1]["kwargs"]["paths"] == ["failed.pst"]
+    assert retry.call_args[1]["kwargs"]["resume"]
+    assert "clean_file" not in retry.call_args[1]["kwargs"]
@@ -0,0 +1,91 @@
+import pytest
+from unittest import mock
+
+from core import models as ratom
+from etl.importer import PstImporter, import_psts
+from etl.manifest import scan_archive, walk_folders
+
+pytestmark = pytest.mark.django_db
+
+
+def fake_folder(identifier, name, sub_folders=(), attachments=()):
+    folder = mock.Mock()
+    folder.identifier = identifier
+    folder.name = name
+    folder.sub_folders = list(sub_folders)
+    folder.sub_messages = [
+        mock.Mock(number_of_attachments=count) for count in attachments
+    ]
+    folder.get_number_of_sub_messages.return_value = len(attachments)
+    return folder
+
+
+@pytest.fixture
+def nested_archive():
+    """root > Top > (Inbox, Sent), listed breadth first like PffArchive.folders()."""
+    inbox = fake_folder(4, "Inbox", attachments=[0, 2, 1])
+    sent = fake_folder(5, "Sent", attachments=[0])
+    top = fake_folder(3, "Top", sub_folders=[inbox, sent])
+    root = fake_folder(2, "", sub_folders=[top])
+    archive = mock.Mock()
+    archive.folders.return_value = [root, top, inbox, sent]
+    yield archive
+
+
+def test_walk_folders__paths(nested_archive):
+    paths = {folder.identifier: path for folder, path in walk_folders(nested_archive)}
+    assert paths == {2: "", 3: "/Top", 4: "/Top/Inbox", 5: "/Top/Sent"}
+
+
+def test_scan_archive(nested_archive):
+    manifest = scan_archive(nested_archive, file_size=4000)
+    assert manifest["messages"] == 4
+    assert manifest["attachments"] == 3
+    assert manifest["estimated_bytes"] == 4000
+    inbox = manifest["folders"][2]
+    assert inbox == {
+        "id": 4,
+        "path": "/Top/Inbox",
+        "messages": 3,
+        "attachments": 3,
+        "estimated_bytes": 3000,
+    }
+
+
+def test_importing_stage__stores_manifest(
+    account, local_file, test_archive, spacy_model, archive_folder
+):
+    importer = PstImporter(local_file, account, spacy_model)
+    importer.initializing_stage()
+    importer.importing_stage()
+    manifest = ratom.File.objects.get().manifest
+    assert manifest["messages"] == 1
+    assert manifest["sha256"] == importer.ratom_file.sha256
+    assert importer.get_folder_abs_path(archive_folder) == "/Inbox"
+
+
+def test_scan_stage__reuses_manifest(pst_importer):
+    """An archive with the same hash isn't scanned again."""
+    pst_importer.initializing_stage()
+    pst_importer.importing_stage()
+    with mock.patch("etl.importer.scan_archive") as scan:
+        pst_importer.importing_stage()
+    assert not scan.called
+
+
+def test_run__uses_manifest_paths(account, local_file, test_archive, spacy_model):
+    importer = PstImporter(local_file, account, spacy_model)
+    importer.run()
+    ratom_file = ratom.File.objects.get()
+    assert ratom_file.unique_paths == ["/Inbox"]
+    assert ratom_file.message_set.get().directory == "/Inbox"
+    assert importer.messages_read == 1
+
+
+def test_import_psts__scan_only(test_archive, spacy_model, local_file, account):
+    with mock.patch("etl.importer.load_nlp_model", return_value=spacy_model):
+        import_psts([local_file.path], account.title, clean=False, scan_only=True)
+    ratom_file = ratom.File.objects.get()
+    assert ratom_file.manifest["messages"] == 1
+    assert ratom_file.import_status == ratom.File.CREATED
+    assert not ratom_file.message_set.exists()
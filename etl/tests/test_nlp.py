@@ -0,0 +1,46 @@
+import pytest
+
+from core.models import Label
+from etl.message.nlp import extract_labels, extract_labels_batch
+
+pytestmark = pytest.mark.django_db
+
+
+def test_extract_labels_batch__order(spacy_model):
+    """A list of labels is returned for each text, in order."""
+    labels = extract_labels_batch(["ORG here", "nothing", "DATE and ORG"], spacy_model)
+    assert [sorted(label.name for label in text) for text in labels] == [
+        ["ORG"],
+        [],
+        ["DATE", "ORG"],
+    ]
+    assert Label.objects.filter(type=Label.IMPORTER).count() == 2
+
+
+def test_extract_labels_batch__only_ner(spacy_model):
+    """Pipeline components other than NER are disabled."""
+    extract_labels_batch(["ORG"], spacy_model, batch_size=10, n_process=2)
+    kwargs = spacy_model.pipe.call_args[1]
+    assert kwargs["disable"] == ["tagger", "parser"]
+    assert kwargs["batch_size"] == 10
+    assert kwargs["n_process"] == 2
+
+
+def test_extract_labels_batch__max_length(settings, spacy_model):
+    """Texts are truncated to NLP_MAX_TEXT_LENGTH."""
+    settings.NLP_MAX_TEXT_LENGTH = 5
+    labels = extract_labels_batch(["word ORG"], spacy_model)
+    assert labels == [[]]
+
+
+def test_extract_labels(spacy_model):
+    labels = extract_labels("GPE", spacy_model)
+    assert [label.name for label in labels] == ["GPE"]
+
+
+def test_importer__labels_saved(pst_importer, archive_msg):
+    """Imported messages are labeled by batched entity extraction."""
+    archive_msg.plain_text_body = "Hello ORG"
+    pst_importer.run()
+    message = pst_importer.ratom_file.message_set.get()
+    assert set(message.audit.labels.values_list("name", flat=True)) == {"ORG"}
@@ -0,0 +1,145 @@
+from concurrent.futures import Future
+
+import pytest
+from unittest import mock
+
+from core import models as ratom
+from etl.importer import (
+    PstImporter,
+    import_folder_shard,
+    init_shard_worker,
+    shard_folders,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+class SerialExecutor:
+    """Stands in for ProcessPoolExecutor by running submissions in-process."""
+
+    def __init__(self, max_workers, initializer):
+        initializer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def submit(self, fn, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(**kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@pytest.fixture
+def shard_worker(test_archive, spacy_model):
+    with mock.patch("etl.importer.PffArchive", test_archive), mock.patch(
+        "etl.importer.load_nlp_model", return_value=spacy_model
+    ), mock.patch.object(
+        PstImporter, "get_folder_abs_path", return_value="/Important/Project/"
+    ):
+        yield
+
+
+def test_shard_folders__balanced():
+    folders = [(1, 100), (2, 60), (3, 50), (4, 10), (5, 0)]
+    shards = shard_folders(folders, workers=2)
+    assert sorted(map(sorted, shards)) == [[1, 5], [2, 3, 4]]
+
+
+def test_shard_folders__more_workers_than_folders():
+    assert shard_folders([(1, 10)], workers=4) == [[1]]
+
+
+def test_import_folder_shard(shard_worker, pst_importer, archive_folder):
+    """A worker imports its folders into the existing ratom.File."""
+    archive_folder.identifier = 42
+    pst_importer.initializing_stage()
+    pst_importer.importing_stage()
+    init_shard_worker()
+    result = import_folder_shard(
+        archive_path="/tmp/archive.pst",
+        ratom_file_pk=pst_importer.ratom_file.pk,
+        folder_ids=[42],
+        chunk_size=10,
+        is_background=True,
+    )
+    assert result == {
+        "errors": [],
+        "unique_paths": ["/Important/Project/"],
+        "total_saved": 1,
+    }
+    assert pst_importer.ratom_file.message_set.count() == 1
+
+
+def test_import_folder_shard__single_nlp_process(
+    shard_worker, pst_importer, archive_folder, spacy_model, settings
+):
+    """spaCy doesn't start processes from the (daemonic) shard workers."""
+    settings.NLP_N_PROCESS = 4
+    archive_folder.identifier = 42
+    pst_importer.initializing_stage()
+    pst_importer.importing_stage()
+    init_shard_worker()
+    import_folder_shard(
+        archive_path="/tmp/archive.pst",
+        ratom_file_pk=pst_importer.ratom_file.pk,
+        folder_ids=[42],
+        chunk_size=10,
+        is_background=True,
+    )
+    assert spacy_model.pipe.call_args[1]["n_process"] == 1
+
+
+def test_import_folder_shard__skips_other_folders(
+    shard_worker, pst_importer, archive_folder
+):
+    archive_folder.identifier = 42
+    pst_importer.initializing_stage()
+    pst_importer.importing_stage()
+    init_shard_worker()
+    result = import_folder_shard(
+        archive_path="/tmp/archive.pst",
+        ratom_file_pk=pst_importer.ratom_file.pk,
+        folder_ids=[1],
+        chunk_size=10,
+        is_background=True,
+    )
+    assert result["total_saved"] == 0
+    assert not pst_importer.ratom_file.message_set.exists()
+
+
+def test_run__workers(shard_worker, pst_importer, archive_folder):
+    """Shard results are merged into the single ratom.File."""
+    archive_folder.identifier = 42
+    pst_importer.workers = 2
+    with mock.patch("etl.importer.ProcessPoolExecutor", SerialExecutor), mock.patch(
+        "etl.importer.db"
+    ):
+        pst_importer.run()
+    ratom_file = ratom.File.objects.get()
+    assert ratom_file.import_status == ratom.File.COMPLETE
+    assert ratom_file.unique_paths == ["/Important/Project/"]
+    assert ratom_file.message_set.count() == 1
+    assert pst_importer.writer.total_saved == 1
+
+
+def test_run__failed_worker_fails_file(shard_worker, pst_importer, archive_folder):
+    """A file missing a worker's folders is left FAILED, to be resumed."""
+    pst_importer.workers = 2
+    with mock.patch("etl.importer.ProcessPoolExecutor", SerialExecutor), mock.patch(
+        "etl.importer.db"
+    ), mock.patch(
+        "etl.importer.import_folder_shard", side_effect=MemoryError("worker died")
+    ):
+        pst_importer.run()
+    ratom_file = ratom.File.objects.get()
+    assert ratom_file.import_status == ratom.File.FAILED
+    assert [error["name"] for error in ratom_file.errors] == [
+        "import_folder_shard() failed",
+        "Unrecoverable import error",
+    ]
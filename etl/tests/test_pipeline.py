@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+from unittest import mock
+
+from core import models as ratom
+from etl.pipeline import Stage, StagedPipeline
+
+
+def test_items_pass_through_stages_in_order():
+    results = []
+    stages = [
+        Stage("double", lambda batch: [i * 2 for i in batch]),
+        Stage("collect", lambda batch: results.extend(batch) or []),
+    ]
+    with StagedPipeline(stages, maxsize=2) as pipeline:
+        for i in range(10):
+            pipeline.put(i)
+    assert results == [i * 2 for i in range(10)]
+    assert [stage.processed for stage in stages] == [10, 10]
+
+
+def test_batch_size():
+    batches = []
+    stage = Stage("batch", lambda batch: batches.append(batch) or [], batch_size=3)
+    gate = threading.Event()
+    pipeline = StagedPipeline(
+        [Stage("gate", lambda batch: gate.wait() and batch), stage], maxsize=10
+    )
+    pipeline.start()
+    for i in range(7):
+        pipeline.put(i)
+    gate.set()
+    pipeline.close()
+    assert sum(batches, []) == list(range(7))
+    assert all(len(batch) <= 3 for batch in batches)
+
+
+def test_backpressure():
+    """A blocked stage stops the pipeline from buffering more than maxsize items."""
+    gate = threading.Event()
+    stage = Stage("slow", lambda batch: gate.wait() and [])
+    pipeline = StagedPipeline([stage], maxsize=2)
+    pipeline.start()
+    pipeline.put(1)
+    while pipeline.queue_depths()["slow"]:  # wait for the stage to block on it
+        time.sleep(0.01)
+    pipeline.put(2)
+    pipeline.put(3)
+    assert pipeline.queue_depths() == {"slow": 2}
+    gate.set()
+    pipeline.close()
+    assert stage.max_queue_depth <= 2
+
+
+def test_on_finish():
+    finished = []
+    stage = Stage("finish", lambda batch: [], on_finish=lambda: finished.append(True))
+    with StagedPipeline([stage]) as pipeline:
+        pipeline.put(1)
+    assert finished == [True]
+
+
+def test_stage_error_is_raised_on_close():
+    def fail(batch):
+        raise ValueError("bad item")
+
+    handled = []
+    stages = [Stage("fail", fail), Stage("after", lambda batch: handled.extend(batch))]
+    pipeline = StagedPipeline(stages, maxsize=1)
+    pipeline.start()
+    for i in range(5):
+        pipeline.put(i)
+    assert pipeline.failed.is_set()
+    with pytest.raises(ValueError):
+        pipeline.close()
+    assert not handled
+
+
+@pytest.mark.django_db(transaction=True)
+def test_importer__pipeline(pst_importer):
+    """Messages imported through the pipeline are saved by its writer thread."""
+    pst_importer.pipeline = True
+    pst_importer.run()
+    ratom_file = ratom.File.objects.get()
+    assert ratom_file.import_status == ratom.File.COMPLETE
+    assert ratom_file.message_set.count() == 1
+    assert ratom_file.unique_paths == ["/Important/Project/"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_importer__pipeline_failure_stops_reading(pst_importer, archive_folder):
+    """Once a stage fails, no more of the archive's folders are read."""
+    pipelines = []
+
+    def create_pipeline(*args, **kwargs):
+        pipelines.append(StagedPipeline(*args, **kwargs))
+        return pipelines[-1]
+
+    def folders():
+        for _ in range(3):
+            yield archive_folder, 1
+            pipelines[0].failed.wait(5)
+
+    pst_importer.initializing_stage()
+    pst_importer.importing_stage()
+    pst_importer.parse_messages = mock.Mock(side_effect=ValueError("parse failed"))
+    pst_importer.folder_messages = mock.Mock(return_value=archive_folder.sub_messages)
+    with mock.patch("etl.importer.StagedPipeline", side_effect=create_pipeline):
+        with pytest.raises(ValueError):
+            pst_importer.import_folders_with_pipeline(folders())
+    pst_importer.folder_messages.assert_called_once()
+    assert pst_importer.ratom_file.completed_folders == []
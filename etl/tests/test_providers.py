@@ -1,22 +1,57 @@
+from hashlib import md5, sha256
+from pathlib import Path
 import pytest
 from unittest import mock
 
+from azure.core.exceptions import ResourceNotFoundError
+
+from etl.providers.base import ImportProviderError
 from etl.providers.factory import import_provider_factory, ProviderTypes
 
 
 @pytest.fixture
-def pst_blob():
+def blob_content():
+    yield bytes(range(256)) * 4
+
+
+@pytest.fixture
+def pst_blob(blob_content):
     blob = mock.Mock()
     blob.name = "inbox.pst"
-    blob.size = 100
+    blob.size = len(blob_content)
+    blob.etag = '"0x8D7"'
+    blob.content_settings.content_md5 = None
     yield blob
 
 
+def local_download(blob_content):
+    """Stands in for ContainerClient.download_blob(), serving blob_content."""
+
+    def download_blob(blob, offset=None, length=None, **kwargs):
+        end = offset + length
+        downloader = mock.Mock()
+        downloader.readall.return_value = blob_content[offset:end]
+        return downloader
+
+    return download_blob
+
+
 @pytest.fixture
-def container_client(pst_blob):
+def container_client(pst_blob, blob_content):
     client = mock.Mock()
     client.primary_endpoint = "https://blob.windows.net"
     client.list_blobs.return_value = [pst_blob]
+    client.download_blob.side_effect = local_download(blob_content)
+
+    def get_blob_client(name):
+        blob_client = mock.Mock()
+        if name == pst_blob.name:
+            blob_client.get_blob_properties.return_value = pst_blob
+        else:
+            blob_client.get_blob_properties.side_effect = ResourceNotFoundError
+        return blob_client
+
+    client.get_blob_client.side_effect = get_blob_client
     yield client
 
 
@@ -61,13 +96,87 @@ def test_azure_blob__size_not_exists(cloud_provider, pst_blob):
     assert not cloud_provider.file_size
 
 
-def test_azure_blob__open(cloud_provider, tmp_path):
+def test_azure_blob__open(cloud_provider):
     with mock.patch("etl.providers.base.PffArchive") as archive_mock:
-        pst_file = tmp_path / "name.pst"
-        pst_file.write_bytes(b"Binary file contents")
-        cloud_provider._client.download_blob = mock.Mock()
-        cloud_provider._client.download_blob.return_value.readall.return_value = (
-            pst_file.read_bytes()
-        )
         cloud_provider.open()
         assert archive_mock.called_once
+
+
+def test_azure_blob__close_deletes_download(cloud_provider):
+    """The downloaded archive is kept until the import is finished."""
+    with mock.patch("etl.providers.base.PffArchive"):
+        cloud_provider.open()
+    downloaded = Path(cloud_provider.archive_path)
+    assert downloaded.exists()
+    cloud_provider.close()
+    assert not downloaded.exists()
+
+
+def test_azure_blob__ranged_download(cloud_provider, blob_content, settings):
+    """The blob is fetched in ranges and hashed without re-reading the file."""
+    settings.AZURE_DOWNLOAD_CHUNK_SIZE = 100
+    settings.AZURE_DOWNLOAD_CONCURRENCY = 3
+    with mock.patch("etl.providers.base.PffArchive"), mock.patch.object(
+        cloud_provider, "hash_file"
+    ) as hash_file:
+        cloud_provider.open()
+    assert Path(cloud_provider.archive_path).read_bytes() == blob_content
+    assert cloud_provider.crypt_hash == sha256(blob_content).hexdigest()
+    assert not hash_file.called
+    ranges = sorted(
+        (call[1]["offset"], call[1]["length"])
+        for call in cloud_provider._client.download_blob.call_args_list
+    )
+    assert len(ranges) == 11
+    assert ranges[-1] == (1000, 24)
+    cloud_provider.close()
+
+
+def test_azure_blob__content_md5_validated(cloud_provider, pst_blob, blob_content):
+    pst_blob.content_settings.content_md5 = bytearray(md5(blob_content).digest())
+    with mock.patch("etl.providers.base.PffArchive"):
+        cloud_provider.open()
+    cloud_provider.close()
+
+
+def test_azure_blob__content_md5_mismatch(cloud_provider, pst_blob):
+    pst_blob.content_settings.content_md5 = bytearray(md5(b"other").digest())
+    with pytest.raises(ImportProviderError):
+        cloud_provider.open()
+    cloud_provider.close()
+
+
+def test_azure_blob__short_download(cloud_provider, pst_blob, blob_content):
+    """A blob that is smaller than reported fails the download."""
+    pst_blob.size = len(blob_content) + 10
+    with pytest.raises(ImportProviderError):
+        cloud_provider.open()
+    cloud_provider.close()
+
+
+def test_azure_blob__exists_without_listing(cloud_provider, container_client):
+    """A single blob is looked up by name rather than listing the container."""
+    assert cloud_provider.exists
+    container_client.get_blob_client.assert_called_once_with("inbox.pst")
+    assert not container_client.list_blobs.called
+
+
+def test_azure_blob__cached_download(
+    cloud_provider, container_client, blob_content, settings, tmp_path
+):
+    """A second open of the same blob version reuses the cached archive."""
+    settings.ARCHIVE_CACHE_DIR = str(tmp_path / "cache")
+    settings.ARCHIVE_CACHE_MAX_BYTES = 10 ** 6
+    with mock.patch("etl.providers.base.PffArchive"):
+        cloud_provider.open()
+        cloud_provider.close()
+        downloads = container_client.download_blob.call_count
+        Provider = import_provider_factory(provider=ProviderTypes.AZURE)
+        retry = Provider(file_path="inbox.pst")
+        retry._client = container_client
+        retry.open()
+        retry.close()
+    assert container_client.download_blob.call_count == downloads
+    assert retry.archive_path == cloud_provider.archive_path
+    assert Path(retry.archive_path).read_bytes() == blob_content
+    assert retry.crypt_hash == sha256(blob_content).hexdigest()
@@ -0,0 +1,80 @@
+import pytest
+
+from core import models as ratom
+from core.tests import factories
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def interrupted_file(pst_importer):
+    """The ratom.File of an import that failed part of the way through."""
+    pst_importer.initializing_stage()
+    ratom_file = pst_importer.ratom_file
+    ratom_file.import_status = ratom.File.FAILED
+    ratom_file.save()
+    yield ratom_file
+
+
+def test_run__checkpoints_folders(pst_importer, archive_folder):
+    pst_importer.run()
+    ratom_file = ratom.File.objects.get()
+    assert ratom_file.completed_folders == [archive_folder.identifier]
+    assert ratom_file.message_set.count() == 1
+
+
+def test_run__resume_skips_saved_messages(pst_importer, interrupted_file, archive_msg):
+    """Messages saved before the failure are not imported twice."""
+    factories.MessageFactory(
+        file=interrupted_file,
+        account=interrupted_file.account,
+        source_id=str(archive_msg.identifier),
+    )
+    pst_importer.resume = True
+    pst_importer.run()
+    interrupted_file.refresh_from_db()
+    assert interrupted_file.import_status == ratom.File.COMPLETE
+    assert interrupted_file.message_set.count() == 1
+    assert pst_importer.writer.total_saved == 0
+
+
+def test_run__resume_skips_completed_folders(
+    pst_importer, interrupted_file, archive_folder
+):
+    interrupted_file.completed_folders = [archive_folder.identifier]
+    interrupted_file.save()
+    pst_importer.resume = True
+    pst_importer.run()
+    interrupted_file.refresh_from_db()
+    assert interrupted_file.import_status == ratom.File.COMPLETE
+    assert not interrupted_file.message_set.exists()
+    assert interrupted_file.unique_paths == ["/Important/Project/"]
+
+
+def test_run__resume_keeps_previous_errors(pst_importer, interrupted_file):
+    interrupted_file.errors = [{"name": "Unrecoverable import error", "context": ""}]
+    interrupted_file.save()
+    pst_importer.resume = True
+    pst_importer.run()
+    interrupted_file.refresh_from_db()
+    assert interrupted_file.errors[0]["name"] == "Unrecoverable import error"
+
+
+def test_run__resume_complete_file(pst_importer, interrupted_file):
+    """Resuming a file that finished importing does nothing."""
+    interrupted_file.import_status = ratom.File.COMPLETE
+    interrupted_file.save()
+    pst_importer.resume = True
+    pst_importer.run()
+    assert not interrupted_file.message_set.exists()
+
+
+def test_run__without_resume_clears_checkpoint(
+    pst_importer, interrupted_file, archive_folder
+):
+    interrupted_file.completed_folders = [archive_folder.identifier]
+    interrupted_file.save()
+    pst_importer.run()
+    interrupted_file.refresh_from_db()
+    assert interrupted_file.message_set.count() == 1
+    assert interrupted_file.completed_folders == [archive_folder.identifier]
@@ -0,0 +1,125 @@
+import pytest
+from unittest import mock
+
+from core import models as ratom
+from core.tests import factories
+from etl.message.writer import MessageWriter
+
+pytestmark = pytest.mark.django_db
+
+
+def build_message(ratom_file, source_id):
+    return ratom.Message(
+        source_id=source_id,
+        file=ratom_file,
+        account=ratom_file.account,
+        subject=f"Subject {source_id}",
+        body="Hello, World!",
+    )
+
+
+def test_add__flushes_full_chunk(ratom_file):
+    """Messages are saved once chunk_size messages are queued."""
+    writer = MessageWriter(chunk_size=2)
+    writer.add(build_message(ratom_file, "1"), [])
+    assert not ratom.Message.objects.exists()
+    writer.add(build_message(ratom_file, "2"), [])
+    assert ratom.Message.objects.count() == 2
+    assert writer.total_saved == 2
+    assert not writer.pending
+
+
+def test_flush__saves_partial_chunk(ratom_file):
+    writer = MessageWriter(chunk_size=10)
+    writer.add(build_message(ratom_file, "1"), [])
+    writer.flush()
+    assert ratom.Message.objects.count() == 1
+
+
+def test_flush__audit_labels_and_history(ratom_file):
+    """Each message gets its own audit, labels and creation history record."""
+    org = factories.LabelFactory(name="ORG")
+    date = factories.LabelFactory(name="DATE")
+    writer = MessageWriter(chunk_size=10)
+    writer.add(build_message(ratom_file, "1"), [org, date])
+    writer.add(build_message(ratom_file, "2"), [org])
+    writer.flush()
+    m1 = ratom.Message.objects.get(source_id="1")
+    m2 = ratom.Message.objects.get(source_id="2")
+    assert m1.audit != m2.audit
+    assert set(m1.audit.labels.all()) == {org, date}
+    assert list(m2.audit.labels.all()) == [org]
+    assert m1.audit.history.get().history_type == "+"
+
+
+def test_flush__indexes_chunk(ratom_file, mock_etl_registry):
+    document = mock.MagicMock()
+    mock_etl_registry.get_documents.return_value = [document]
+    writer = MessageWriter(chunk_size=10)
+    message = build_message(ratom_file, "1")
+    writer.add(message, [])
+    writer.flush()
+    document.return_value.update.assert_called_once_with([message])
+
+
+def test_flush__failed_chunk_saved_individually(ratom_file):
+    """A bad message only loses itself when its chunk fails."""
+    on_error = mock.MagicMock()
+    writer = MessageWriter(chunk_size=10, on_error=on_error)
+    bad_message = build_message(ratom_file, "x" * 300)  # too long for source_id
+    writer.add(build_message(ratom_file, "1"), [])
+    writer.add(bad_message, [])
+    writer.add(build_message(ratom_file, "3"), [])
+    writer.flush()
+    assert set(ratom.Message.objects.values_list("source_id", flat=True)) == {
+        "1",
+        "3",
+    }
+    assert writer.total_saved == 2
+    on_error.assert_called_once()
+    assert on_error.call_args[0][0] is bad_message
+
+
+def test_flush__hands_saved_messages_to_indexer(ratom_file, mock_etl_registry):
+    """With a BulkIndexer, both bulk and individually saved messages are queued."""
+    indexer = mock.MagicMock()
+    writer = MessageWriter(chunk_size=10, indexer=indexer)
+    writer.add(build_message(ratom_file, "1"), [])
+    writer.flush()
+    writer.add(build_message(ratom_file, "x" * 300), [])
+    writer.add(build_message(ratom_file, "3"), [])
+    writer.flush()
+    assert [
+        [message.source_id for message in call[0][0]]
+        for call in indexer.index.call_args_list
+    ] == [["1"], ["3"]]
+    mock_etl_registry.get_documents.assert_not_called()
+
+
+def test_flush__individual_saves_skip_autosync(ratom_file, settings):
+    """Messages the indexer is given aren't also indexed by post_save."""
+    settings.ELASTICSEARCH_DSL_AUTOSYNC = True
+    indexer = mock.MagicMock()
+    writer = MessageWriter(chunk_size=10, indexer=indexer)
+    with mock.patch.object(
+        MessageWriter, "_bulk_save", side_effect=Exception
+    ), mock.patch("django_elasticsearch_dsl.signals.registry") as registry:
+        writer.add(build_message(ratom_file, "1"), [])
+        writer.flush()
+        registry.update.assert_not_called()
+        ratom.Message.objects.get().save()
+    indexer.index.assert_called_once()
+    registry.update.assert_called_once()
+
+
+def test_importer__message_error_recorded(pst_importer, archive_msg):
+    """Messages that fail to save are reported as file errors."""
+    with mock.patch.object(
+        MessageWriter, "_bulk_save", side_effect=Exception
+    ), mock.patch.object(ratom.Message, "save", side_effect=Exception("boom")):
+        pst_importer.run()
+    assert pst_importer.ratom_file.import_status == ratom.File.COMPLETE
+    assert pst_importer.ratom_file_errors[0]["name"] == "save_message() failed"
+    assert pst_importer.ratom_file_errors[0]["msg_identifier"] == str(
+        archive_msg.identifier
+    )
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from etl.providers.factory import ProviderTypes
 
@@ -68,6 +69,8 @@ ELASTICSEARCH_INDEX_NAMES = {
     "api.documents.message": "message",
 }
 ELASTICSEARCH_LOG_QUERIES = os.getenv("ELASTICSEARCH_LOG_QUERIES", "false") == "true"
+# Indexes saves like the default, except inside core.signals.suspend_autosync()
+ELASTICSEARCH_DSL_SIGNAL_PROCESSOR = "core.signals.SignalProcessor"
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(
@@ -246,8 +249,76 @@ CLOUD_SERVICE_PROVIDER = os.getenv("CLOUD_SERVICE_PROVIDER", ProviderTypes.AZURE
 AZURE_BLOB_KEY = os.getenv("AZURE_BLOB_KEY")
 AZURE_URL = os.getenv("AZURE_URL")
 AZURE_CONTAINER = os.getenv("AZURE_CONTAINER")
+# Blobs are downloaded in ranges of AZURE_DOWNLOAD_CHUNK_SIZE bytes, this many at once.
+# Each download holds up to CHUNK_SIZE * CONCURRENCY * 2 bytes (64MiB) in memory
+AZURE_DOWNLOAD_CHUNK_SIZE = int(os.getenv("AZURE_DOWNLOAD_CHUNK_SIZE", 8 * 2 ** 20))
+AZURE_DOWNLOAD_CONCURRENCY = int(os.getenv("AZURE_DOWNLOAD_CONCURRENCY", 4))
+# Downloaded archives are kept for retries and re-imports in an LRU disk cache of up
+# to ARCHIVE_CACHE_MAX_BYTES (0 disables it)
+ARCHIVE_CACHE_DIR = os.getenv(
+    "ARCHIVE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ratom-archives")
+)
+ARCHIVE_CACHE_MAX_BYTES = int(os.getenv("ARCHIVE_CACHE_MAX_BYTES", 0))
+# The container's blobs are listed into core.Blob every BLOB_INVENTORY_REFRESH seconds
+BLOB_INVENTORY_REFRESH = int(os.getenv("BLOB_INVENTORY_REFRESH", 15 * 60))
+BLOB_INVENTORY_PAGE_SIZE = int(os.getenv("BLOB_INVENTORY_PAGE_SIZE", 5000))
+# With SEARCH_INDEX_OUTBOX, audit changes are queued in core.IndexOutbox and applied
+# to the search index by a Celery task after each commit, and every
+# INDEX_OUTBOX_DRAIN_INTERVAL seconds by beat. Off unless deployed (see deploy.py)
+SEARCH_INDEX_OUTBOX = os.getenv("SEARCH_INDEX_OUTBOX", "false") == "true"
+INDEX_OUTBOX_BATCH_SIZE = int(os.getenv("INDEX_OUTBOX_BATCH_SIZE", 500))
+INDEX_OUTBOX_DRAIN_INTERVAL = int(os.getenv("INDEX_OUTBOX_DRAIN_INTERVAL", 60))
+# Longest a ?wait_for_index=true review request waits for its update to be applied
+INDEX_OUTBOX_WAIT_TIMEOUT = float(os.getenv("INDEX_OUTBOX_WAIT_TIMEOUT", 5))
+# Seconds search results and facets are cached for, unless the messages they can
+# match change first. Off (0) unless the cache is shared (e.g. memcached) with the
+# Celery workers, which invalidate it; deploy.py enables it
+SEARCH_CACHE_TIMEOUT = int(os.getenv("SEARCH_CACHE_TIMEOUT", 0))
+FACET_CACHE_TIMEOUT = int(os.getenv("FACET_CACHE_TIMEOUT", 0))
+CELERY_BEAT_SCHEDULE = {
+    "refresh-blob-inventory": {
+        "task": "etl.tasks.refresh_blob_inventory_task",
+        "schedule": BLOB_INVENTORY_REFRESH,
+    },
+    "drain-index-outbox": {
+        "task": "core.tasks.drain_index_outbox_task",
+        "schedule": INDEX_OUTBOX_DRAIN_INTERVAL,
+    },
+}
 
 # Sample data
 RATOM_SAMPLE_DATA_ENABLED = os.getenv("RATOM_SAMPLE_DATA_ENABLED", "false") == "true"
 
 BULK_ACTION_MESSAGE_LIMIT = 50
+# Audits a query-based bulk action updates per transaction
+BULK_ACTION_CHUNK_SIZE = int(os.getenv("BULK_ACTION_CHUNK_SIZE", 1000))
+# Messages an export job reads from Postgres per query
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+
+# Number of messages PstImporter saves (and indexes) per bulk write
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 500))
+# Number of processes PstImporter splits an archive's folders across
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", 1))
+# Overlap reading, parsing, NLP and saving in threads connected by bounded queues
+IMPORT_PIPELINE = os.getenv("IMPORT_PIPELINE", "false") == "true"
+IMPORT_PIPELINE_QUEUE_SIZE = int(os.getenv("IMPORT_PIPELINE_QUEUE_SIZE", 200))
+# skip, link or force the import of archives with the SHA-256 of an imported File
+IMPORT_DUPLICATE_POLICY = os.getenv("IMPORT_DUPLICATE_POLICY", "force")
+# import_file_task retries failed files, resuming from their checkpoint
+IMPORT_TASK_MAX_RETRIES = int(os.getenv("IMPORT_TASK_MAX_RETRIES", 3))
+IMPORT_TASK_RETRY_DELAY = int(os.getenv("IMPORT_TASK_RETRY_DELAY", 60))
+# Bulk index imported messages from threads, with refreshes suspended during imports
+IMPORT_BULK_INDEX = os.getenv("IMPORT_BULK_INDEX", "false") == "true"
+IMPORT_INDEX_THREADS = int(os.getenv("IMPORT_INDEX_THREADS", 2))
+# Retries of bulk requests Elasticsearch rejects with a 429
+IMPORT_INDEX_MAX_RETRIES = int(os.getenv("IMPORT_INDEX_MAX_RETRIES", 5))
+# Force merge the message index to one segment after each bulk indexed import
+IMPORT_FORCE_MERGE = os.getenv("IMPORT_FORCE_MERGE", "false") == "true"
+
+# spaCy named entity recognition
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", 50))
+# Processes nlp.pipe() uses. Shard workers of parallel imports (IMPORT_WORKERS > 1)
+# always use 1, as they can't start child processes
+NLP_N_PROCESS = int(os.getenv("NLP_N_PROCESS", 1))
+# Longer subject + body texts are truncated before entity extraction
+NLP_MAX_TEXT_LENGTH = int(os.getenv("NLP_MAX_TEXT_LENGTH", 100000))
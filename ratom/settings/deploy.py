@@ -67,6 +67,11 @@ CACHES = {
         "LOCATION": "%(CACHE_HOST)s" % os.environ,
     }
 }
+# Audit changes are indexed through the outbox, drained by Celery workers and beat
+SEARCH_INDEX_OUTBOX = os.getenv("SEARCH_INDEX_OUTBOX", "true") == "true"
+# Shared by web and Celery processes, so index changes invalidate cached searches
+SEARCH_CACHE_TIMEOUT = int(os.getenv("SEARCH_CACHE_TIMEOUT", 300))
+FACET_CACHE_TIMEOUT = int(os.getenv("FACET_CACHE_TIMEOUT", 300))
 
 EMAIL_HOST = os.environ.get("EMAIL_HOST", "localhost")
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")